@@ -3,15 +3,19 @@
 """
 from datetime import datetime, timedelta
 from typing import Optional
-from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
 import os
+import uuid
 from dotenv import load_dotenv
 
-from database import get_db
+from ttl_cache import TTLCache
+from replicas import get_read_db
 from models import User
+import revocation
 
 load_dotenv()
 
@@ -23,6 +27,49 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 дней
 # Security схема для Bearer токенов
 security = HTTPBearer()
 
+# Кэш состояния пользователей для get_current_user: user_id -> колонки User.
+# Кэш свой у каждого воркера, поэтому изменение пользователя в другом процессе
+# (или UPDATE в обход ORM) видно не позже чем через USER_CACHE_TTL секунд
+USER_CACHE_COLUMNS = ("id", "phone", "is_active", "created_at", "updated_at")
+user_cache = TTLCache(
+    maxsize=int(os.getenv("USER_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("USER_CACHE_TTL", "30")),
+)
+
+
+def cache_user(user: User):
+    """Сохраняет состояние пользователя в кэш (после чтения из базы или входа)"""
+    user_cache.set(user.id, {column: getattr(user, column) for column in USER_CACHE_COLUMNS})
+
+
+def get_cached_user(user_id: int) -> Optional[User]:
+    """Пользователь из кэша: новый объект без сессии, чтобы запросы не делили один экземпляр"""
+    state = user_cache.get(user_id)
+    return User(**state) if state is not None else None
+
+
+def invalidate_user(user_id: int):
+    """Удаляет пользователя из кэша (при деактивации, изменении, удалении)"""
+    user_cache.delete(user_id)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_user_on_change(mapper, connection, target):
+    # Любое изменение пользователя через ORM в этом процессе сбрасывает его из кэша.
+    # Сброс повторяется после commit: иначе параллельный запрос мог бы между
+    # flush и commit снова положить в кэш старое состояние
+    invalidate_user(target.id)
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("changed_users", set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_users_after_commit(session):
+    for user_id in session.info.pop("changed_users", ()):
+        invalidate_user(user_id)
+
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """
@@ -42,7 +89,10 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     
-    to_encode.update({"exp": expire})
+    # jti - идентификатор токена для отзыва (POST /auth/logout)
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
+    # python-jose (и cryptography) загружается при первом токене, а не при запуске
+    from jose import jwt
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     
     return encoded_jwt
@@ -58,6 +108,8 @@ def decode_access_token(token: str) -> Optional[dict]:
     Returns:
         Данные из токена или None если токен невалиден
     """
+    from jose import JWTError, jwt
+    
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         return payload
@@ -65,9 +117,9 @@ def decode_access_token(token: str) -> Optional[dict]:
         return None
 
 
-def get_current_user(
+async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ) -> User:
     """
     Получает текущего авторизованного пользователя из JWT токена
@@ -95,16 +147,26 @@ def get_current_user(
     if payload is None:
         raise credentials_exception
     
+    # Отозванный токен (проверка по словарю в памяти, без запроса к базе).
+    # Токены без jti выданы до появления отзыва и отозвать их нельзя
+    jti = payload.get("jti")
+    if jti is None or revocation.is_revoked(jti):
+        raise credentials_exception
+    
     # Получаем user_id из токена
     user_id: int = payload.get("user_id")
     if user_id is None:
         raise credentials_exception
     
-    # Ищем пользователя в базе
-    user = db.query(User).filter(User.id == user_id).first()
-    
+    # Ищем пользователя в кэше, при промахе - в базе
+    user = get_cached_user(user_id)
     if user is None:
-        raise credentials_exception
+        user = await db.get(User, user_id)
+        
+        if user is None:
+            raise credentials_exception
+        
+        cache_user(user)
     
     if not user.is_active:
         raise HTTPException(
@@ -115,9 +177,9 @@ def get_current_user(
     return user
 
 
-def get_optional_current_user(
+async def get_optional_current_user(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ) -> Optional[User]:
     """
     Получает текущего пользователя, если токен предоставлен
@@ -134,6 +196,6 @@ def get_optional_current_user(
         return None
     
     try:
-        return get_current_user(credentials, db)
+        return await get_current_user(credentials, db)
     except HTTPException:
         return None
@@ -0,0 +1,159 @@
+"""
+Нагрузочный бенчмарк API при большом числе одновременных соединений
+
+Держит --concurrency одновременных keep-alive соединений с запущенным
+сервером (каждое повторяет запросы по кругу) и печатает пропускную
+способность и перцентили задержки. С --write-every N каждый N-й запрос -
+--write-method (PUT) --write-path с телом --write-body, чтение и запись
+считаются отдельно.
+HTTP/1.1 клиент минимальный, на asyncio streams: httpx на сотнях соединений
+сам тратит процессора больше, чем сервер, и бенчмарк измерял бы клиента.
+Сервер нужно запустить отдельно, например:
+
+    uvicorn main:app --port 8000 --log-level warning
+
+Запуск:
+    python bench_concurrency.py --concurrency 500 --requests 20000
+    python bench_concurrency.py --path /products/1 --path /vacancies
+    python bench_concurrency.py --write-every 10 --write-path /products/1
+"""
+import argparse
+import asyncio
+import time
+from collections import Counter, defaultdict
+from typing import List, Optional
+from urllib.parse import urlsplit
+
+DEFAULT_PATHS = ["/products", "/products/1", "/vacancies", "/employees/1"]
+DEFAULT_WRITE_BODY = '{"price": 850}'
+
+
+async def read_response(reader: asyncio.StreamReader) -> int:
+    """Читает ответ целиком (Content-Length или chunked), возвращает статус"""
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split(" ", 2)[1])
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+    if headers.get("transfer-encoding") == "chunked":
+        while True:
+            size = int((await reader.readuntil(b"\r\n")).strip(), 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    else:
+        await reader.readexactly(int(headers.get("content-length", 0)))
+    return status
+
+
+def build_request(host: str, method: str, path: str, body: bytes = b"") -> bytes:
+    head = f"{method} {path} HTTP/1.1\r\nHost: {host}\r\n"
+    if body:
+        head += f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+    return head.encode() + b"\r\n" + body
+
+
+async def worker(host: str, port: int, plan: list, timeout: float, queue: asyncio.Queue,
+                 latencies: dict, statuses: dict):
+    writer = None
+    while True:
+        try:
+            index = queue.get_nowait()
+        except asyncio.QueueEmpty:
+            break
+        kind, request = plan[index % len(plan)]
+        started = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            writer.write(request)
+            statuses[kind][await asyncio.wait_for(read_response(reader), timeout)] += 1
+        except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError) as e:
+            statuses[kind][type(e).__name__] += 1
+            if writer is not None:
+                writer.close()
+            writer = None
+        latencies[kind].append(time.perf_counter() - started)
+    if writer is not None:
+        writer.close()
+
+
+def percentile(values: List[float], p: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def make_plan(host: str, paths: List[str], write_every: int = 0,
+              write_path: Optional[str] = None, write_body: str = DEFAULT_WRITE_BODY,
+              write_method: str = "PUT") -> list:
+    """Круг запросов: чтения по paths, каждый write_every-й - запись"""
+    reads = [("чтение", build_request(host, "GET", path)) for path in paths]
+    if not write_every:
+        return reads
+    write = ("запись", build_request(host, write_method, write_path, write_body.encode()))
+    return [write if i % write_every == 0 else reads[i % len(reads)] for i in range(write_every * len(reads))]
+
+
+async def run(url: str, plan_args: dict, concurrency: int, requests: int, timeout: float) -> dict:
+    """Выполняет нагрузку и возвращает время и результаты по видам запросов"""
+    address = urlsplit(url)
+    host, port = address.hostname, address.port or 80
+    plan = make_plan(host, **plan_args)
+    queue = asyncio.Queue()
+    for index in range(requests):
+        queue.put_nowait(index)
+    latencies, statuses = defaultdict(list), defaultdict(Counter)
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        worker(host, port, plan, timeout, queue, latencies, statuses) for _ in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - started
+    return {
+        "elapsed": elapsed,
+        "kinds": {
+            kind: {
+                "rps": len(values) / elapsed,
+                "latency_ms": {p: percentile(sorted(values), p) * 1000 for p in (50, 90, 99)},
+                "statuses": dict(statuses[kind]),
+            }
+            for kind, values in latencies.items()
+        },
+    }
+
+
+def print_results(results: dict, concurrency: int, requests: int):
+    print(f"Соединений: {concurrency}, запросов: {requests}, время: {results['elapsed']:.2f} с")
+    print(f"Пропускная способность: {requests / results['elapsed']:,.0f} запросов/с")
+    for kind, result in results["kinds"].items():
+        latency = ", ".join(f"p{p}={ms:.1f}" for p, ms in result["latency_ms"].items())
+        statuses = ", ".join(f"{status}: {count}" for status, count in sorted(result["statuses"].items(), key=str))
+        print(f"  {kind}: {result['rps']:,.0f} запросов/с, задержка, мс: {latency}; ответы: {statuses}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный бенчмарк API")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="Адрес сервера")
+    parser.add_argument("--concurrency", type=int, default=500, help="Одновременных запросов")
+    parser.add_argument("--requests", type=int, default=20000, help="Всего запросов")
+    parser.add_argument("--timeout", type=float, default=30, help="Таймаут ответа, с")
+    parser.add_argument("--path", action="append", dest="paths", help="Путь запроса (можно несколько)")
+    parser.add_argument("--write-every", type=int, default=0, help="Каждый N-й запрос - запись (0 - без записи)")
+    parser.add_argument("--write-path", default="/products/1", help="Путь запроса записи")
+    parser.add_argument("--write-method", default="PUT", help="Метод запроса записи")
+    parser.add_argument("--write-body", default=DEFAULT_WRITE_BODY, help="JSON тело запроса записи")
+    args = parser.parse_args()
+    plan_args = {
+        "paths": args.paths or DEFAULT_PATHS,
+        "write_every": args.write_every,
+        "write_path": args.write_path,
+        "write_body": args.write_body,
+        "write_method": args.write_method,
+    }
+    results = asyncio.run(run(args.url, plan_args, args.concurrency, args.requests, args.timeout))
+    print_results(results, args.concurrency, args.requests)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Микробенчмарк сериализации страницы товаров
+
+Сравнивает стоимость ответа GET /products на странице из 1000 товаров:
+- до: convert_product_response -> валидация по List[ProductResponse] -> json.dumps
+  (то, что делает FastAPI при возврате словарей из endpoint'а с response_model)
+- после: convert_product_response -> orjson (serialization.dumps)
+
+Запуск:
+    python bench_serialization.py
+"""
+import json
+import timeit
+from datetime import datetime
+from typing import List
+
+from pydantic import TypeAdapter
+
+from main import convert_product_response
+from models import Product
+from schemas import ProductResponse
+from serialization import dumps
+
+PAGE_SIZE = 1000
+REPEATS = 5
+NUMBER = 20
+
+
+def make_products(count: int) -> List[Product]:
+    """Создает товары в памяти (без базы данных)"""
+    now = datetime.utcnow()
+    return [
+        Product(
+            id=i,
+            name=f"Мёд липовый №{i}",
+            images=[f"/uploads/honey{i}.jpg", f"/uploads/honey{i}_2.jpg"],
+            price=850.0 + i,
+            product_type="мёд",
+            long_description="Натуральный липовый мёд, собранный в экологически чистых районах. " * 3,
+            seller_id=1 + i % 3,
+            vitamins=["B1", "B2", "B6", "C", "E"],
+            minerals=["Калий", "Кальций", "Магний", "Железо"],
+            antioxidants=["Флавоноиды", "Фенольные кислоты"],
+            energy_value="304 ккал на 100г",
+            shelf_life="24 месяца",
+            created_at=now,
+            updated_at=now,
+        )
+        for i in range(count)
+    ]
+
+
+def main():
+    products = make_products(PAGE_SIZE)
+    adapter = TypeAdapter(List[ProductResponse])
+
+    def before():
+        payload = [convert_product_response(p) for p in products]
+        validated = adapter.validate_python(payload)
+        content = adapter.dump_python(validated, mode="json")
+        return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def after():
+        return dumps([convert_product_response(p) for p in products])
+
+    def convert_only():
+        return [convert_product_response(p) for p in products]
+
+    assert json.loads(before()) == json.loads(after()), "Результаты сериализации различаются"
+
+    print("=" * 60)
+    print(f"СЕРИАЛИЗАЦИЯ СТРАНИЦЫ ИЗ {PAGE_SIZE} ТОВАРОВ")
+    print("=" * 60)
+
+    results = {}
+    for title, func in [
+        ("ORM -> dict (общая часть)", convert_only),
+        ("До: валидация + json.dumps", before),
+        ("После: orjson без валидации", after),
+    ]:
+        best = min(timeit.repeat(func, number=NUMBER, repeat=REPEATS)) / NUMBER
+        results[title] = best
+        print(f"{title:<32} {best * 1000:8.2f} мс/страница  {best / PAGE_SIZE * 1e6:6.2f} мкс/строка")
+
+    speedup = results["До: валидация + json.dumps"] / results["После: orjson без валидации"]
+    print("-" * 60)
+    print(f"Ускорение: x{speedup:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Сравнение смешанной нагрузки (чтение + запись) на SQLite: обычный режим и
+SQLITE_PROFILE=production (WAL, настройки соединений, один пишущий)
+
+Для каждого режима запускает uvicorn на копии базы, дает нагрузку из
+bench_concurrency.py (каждый --write-every-й запрос - PUT) и печатает
+пропускную способность, задержки и ответы с ошибками ("database is locked"
+отдается как 500).
+
+Запуск:
+    python bench_sqlite.py
+    python bench_sqlite.py --workers 4 --concurrency 200 --write-every 5
+"""
+import argparse
+import asyncio
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_concurrency import DEFAULT_PATHS, print_results, run
+
+PROFILES = {"обычный": "", "production": "production"}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_ready(port: int, process: subprocess.Popen, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Сервер завершился при запуске")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("Сервер не запустился")
+
+
+def bench_profile(profile: str, args) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        database = os.path.join(directory, "bench.db")
+        # backup() корректно копирует и базу в режиме WAL; режим журнала
+        # у файла постоянный, поэтому обычный режим возвращается явно
+        with sqlite3.connect(args.db) as source, sqlite3.connect(database) as target:
+            source.backup(target)
+            target.execute("PRAGMA journal_mode = DELETE")
+        port = free_port()
+        env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite:///{database}",
+            "SQLITE_PROFILE": profile,
+            "DB_ECHO": "false",
+            "SNAPSHOT_DIR": "",
+        }
+        env.pop("ASYNC_DATABASE_URL", None)
+        env.pop("DATABASE_REPLICA_URLS", None)
+        process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port),
+             "--workers", str(args.workers), "--log-level", "critical", "--no-access-log"],
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            wait_ready(port, process)
+            plan_args = {
+                "paths": DEFAULT_PATHS,
+                "write_every": args.write_every,
+                "write_path": args.write_path,
+                "write_body": '{"price": 850}',
+            }
+            return asyncio.run(run(f"http://127.0.0.1:{port}", plan_args, args.concurrency, args.requests, args.timeout))
+        finally:
+            process.terminate()
+            process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Смешанная нагрузка на SQLite: обычный и рабочий режим")
+    parser.add_argument("--db", default="forest_bar.db", help="База, копия которой используется")
+    parser.add_argument("--workers", type=int, default=2, help="Процессов uvicorn")
+    parser.add_argument("--concurrency", type=int, default=100, help="Одновременных запросов")
+    parser.add_argument("--requests", type=int, default=5000, help="Запросов на режим")
+    parser.add_argument("--write-every", type=int, default=5, help="Каждый N-й запрос - запись")
+    parser.add_argument("--write-path", default="/products/1", help="Путь PUT запроса")
+    parser.add_argument("--timeout", type=float, default=30, help="Таймаут ответа, с")
+    args = parser.parse_args()
+
+    for name, profile in PROFILES.items():
+        print(f"== Режим: {name}")
+        print_results(bench_profile(profile, args), args.concurrency, args.requests)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Пакетные изменения сущностей каталога в одной транзакции
+
+Вместо commit/refresh на каждый объект пакет применяется несколькими
+executemany запросами: одна проверка существования id, один INSERT на все
+создания, UPDATE по первичному ключу на все изменения и один DELETE.
+"""
+from datetime import datetime
+from typing import List
+
+from sqlalchemy import delete, insert, update
+from sqlalchemy.orm import Session
+
+import search
+import stats
+from versions import bump_version
+
+
+def apply_bulk(db: Session, model, table: str, bulk) -> dict:
+    """
+    Применяет пакет create/update/delete (без commit)
+
+    Args:
+        db: Сессия базы данных
+        model: Модель SQLAlchemy
+        table: Имя таблицы (для поискового индекса и версии)
+        bulk: Запрос с полями create, update и delete
+
+    Returns:
+        Словарь для BulkResponse. Элементы update/delete с несуществующим
+        id получают статус not_found, повторы id внутри update или delete -
+        duplicate (применяется первое вхождение), остальные применяются.
+    """
+    results: List[dict] = []
+    now = datetime.utcnow()
+
+    requested_ids = {patch.id for patch in bulk.update} | set(bulk.delete)
+    existing = set()
+    if requested_ids:
+        existing = {row[0] for row in db.query(model.id).filter(model.id.in_(requested_ids))}
+
+    # Старые группы статистики изменяемых и удаляемых строк (до изменений)
+    stat_ids = {patch.id for patch in bulk.update} | set(bulk.delete)
+    removed_stat_keys = stats.keys_for_ids(db, table, stat_ids & existing)
+
+    created_ids = []
+    if bulk.create:
+        rows = [item.dict() for item in bulk.create]
+        # Автоинкрементные id выдаются в порядке строк VALUES, поэтому
+        # отсортированные id совпадают с порядком create. sort_by_parameter_order
+        # не используется: на SQLite он переключает вставку на построчную
+        created_ids = sorted(db.scalars(insert(model).returning(model.id), rows))
+        for index, row_id in enumerate(created_ids):
+            results.append({"action": "create", "index": index, "id": row_id, "status": "ok"})
+
+    updated_ids = []
+    patches = []
+    seen = set()
+    for index, patch in enumerate(bulk.update):
+        if patch.id not in existing:
+            results.append({"action": "update", "index": index, "id": patch.id, "status": "not_found"})
+            continue
+        if patch.id in seen:
+            results.append({"action": "update", "index": index, "id": patch.id, "status": "duplicate"})
+            continue
+        seen.add(patch.id)
+        patches.append({**patch.dict(exclude_unset=True), "updated_at": now})
+        updated_ids.append(patch.id)
+        results.append({"action": "update", "index": index, "id": patch.id, "status": "ok"})
+    if patches:
+        db.execute(update(model), patches)
+
+    deleted_ids = []
+    seen = set()
+    for index, row_id in enumerate(bulk.delete):
+        if row_id not in existing:
+            results.append({"action": "delete", "index": index, "id": row_id, "status": "not_found"})
+            continue
+        if row_id in seen:
+            results.append({"action": "delete", "index": index, "id": row_id, "status": "duplicate"})
+            continue
+        seen.add(row_id)
+        deleted_ids.append(row_id)
+        results.append({"action": "delete", "index": index, "id": row_id, "status": "ok"})
+    if deleted_ids:
+        db.execute(delete(model).where(model.id.in_(deleted_ids)))
+
+    if table in search.SEARCH_FIELDS:
+        search.index_ids(db, table, created_ids + updated_ids)
+        search.remove_ids(db, table, deleted_ids)
+
+    stats.update(db, removed=removed_stat_keys, added=stats.keys_for_ids(db, table, created_ids + updated_ids))
+
+    if created_ids or updated_ids or deleted_ids:
+        bump_version(db, table)
+
+    return {
+        "created": len(created_ids),
+        "updated": len(updated_ids),
+        "deleted": len(deleted_ids),
+        "failed": sum(1 for r in results if r["status"] != "ok"),
+        "results": results,
+    }
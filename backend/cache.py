@@ -0,0 +1,70 @@
+"""
+In-process кэш ответов каталога (LRU + TTL)
+
+Ключи - кортежи вида (namespace, "list", *параметры запроса, версии) или
+(namespace, "detail", id, версии). Хранится уже закодированное JSON тело, так что
+попадание в кэш не тратит время ни на базу, ни на сериализацию.
+Обработчики записи в main.py после commit сбрасывают списки своей сущности
+и конкретный объект через invalidate().
+Кэш живет в памяти процесса: у каждого воркера свой. Версии таблиц из
+table_versions (versions.check_not_modified) в конце ключа не дают отдать
+старое тело после записи в другом воркере или вне приложения: ключ
+меняется вместе с ETag, а старые записи вытесняются LRU или по TTL.
+"""
+import os
+from typing import Awaitable, Callable, Optional
+
+from fastapi import Response
+
+from pagination import NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER
+from serialization import dumps, json_response
+from ttl_cache import TTLCache
+from versions import forget_versions
+
+# Заголовки ответа, которые сохраняются вместе с телом
+CACHED_HEADERS = (NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER)
+
+
+response_cache = TTLCache(
+    maxsize=int(os.getenv("RESPONSE_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("RESPONSE_CACHE_TTL", "300")),
+)
+
+
+async def cached_response(key: tuple, response: Response, loader: Callable[[], Awaitable]) -> Response:
+    """
+    Возвращает JSON ответ из кэша или вызывает loader и кэширует результат
+
+    loader - корутина, возвращающая словарь или список словарей; результат
+    кодируется один раз.
+    Заголовки пагинации, выставленные loader'ом, сохраняются вместе с телом
+    и восстанавливаются при попадании в кэш.
+    """
+    cached = response_cache.get(key)
+    if cached is not None:
+        body, headers = cached
+        for name, value in headers.items():
+            response.headers[name] = value
+        return json_response(body, response)
+
+    body = dumps(await loader())
+    headers = {name: response.headers[name] for name in CACHED_HEADERS if name in response.headers}
+    response_cache.set(key, (body, headers))
+    return json_response(body, response)
+
+
+# Списки других сущностей, в которые встраиваются объекты сущности (?include=)
+DEPENDENT_LISTS = {
+    "employees": [("products", "list", ("seller",))],
+}
+
+
+def invalidate(namespace: str, item_id: Optional[int] = None):
+    """Сбрасывает закэшированные списки сущности и, если указан, сам объект (после commit)"""
+    # Версия таблицы изменилась: следующий запрос этого воркера прочитает ее из базы
+    forget_versions(namespace)
+    response_cache.invalidate((namespace, "list"))
+    if item_id is not None:
+        response_cache.invalidate((namespace, "detail", item_id))
+    for prefix in DEPENDENT_LISTS.get(namespace, ()):
+        response_cache.invalidate(prefix)
@@ -1,32 +1,204 @@
-from sqlalchemy import create_engine
+import asyncio
+import threading
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from sqlalchemy.util import await_only
 import os
 from dotenv import load_dotenv
 
+from pool_metrics import PoolMetrics, instrument, timed_pool_class
+
 # Загружаем переменные окружения
 load_dotenv()
 
 # Настройки базы данных
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./forest_bar.db")
 
-# Для SQLite используем специальные настройки
-if DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(
-        DATABASE_URL,
-        connect_args={"check_same_thread": False},
-        echo=True  # Показывать SQL запросы в консоли (для разработки)
+# Пул соединений (на каждый процесс-воркер и отдельно для sync и async движков)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Проверка соединения перед выдачей (лишний запрос, но переживает рестарт базы)
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "false").lower() == "true"
+# Пересоздавать соединения старше N секунд (-1 = никогда)
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+# Логирование всех SQL запросов (только для разработки: заметно замедляет под нагрузкой)
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() == "true"
+
+# Рабочий режим SQLite (SQLITE_PROFILE=production): WAL и настройки ниже на
+# каждом соединении, отдельные движки чтения и один пишущий
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "")
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    # Отрицательное значение - размер в КиБ
+    "cache_size": -int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536")),
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "temp_store": "MEMORY",
+}
+
+# Метрики пулов для GET /metrics/db
+pool_metrics = {"sync": PoolMetrics("sync"), "async": PoolMetrics("async")}
+
+
+def is_sqlite_file(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database not in (None, "", ":memory:")
+
+
+def engine_options(url: str, pool_class, metrics: PoolMetrics, pool_size: int = None, max_overflow: int = None) -> dict:
+    """Параметры движка: пул из настроек окружения (кроме SQLite в памяти)"""
+    parsed = make_url(url)
+    options = {"echo": DB_ECHO, "pool_pre_ping": DB_POOL_PRE_PING}
+    if parsed.get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+        if not is_sqlite_file(url):
+            # База в памяти живет в одном соединении: очередь пула к ней не применима
+            return options
+    options.update(
+        poolclass=timed_pool_class(pool_class, metrics),
+        pool_size=DB_POOL_SIZE if pool_size is None else pool_size,
+        max_overflow=DB_MAX_OVERFLOW if max_overflow is None else max_overflow,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
     )
-else:
-    # Для PostgreSQL и других баз данных
-    engine = create_engine(DATABASE_URL, echo=True)
+    return options
+
+
+def apply_sqlite_profile(engine, writer: bool):
+    """
+    Настраивает соединения SQLite рабочего режима
+
+    Транзакции открываются явно: пишущие - BEGIN IMMEDIATE, чтобы блокировка
+    записи бралась сразу и ожидалась по busy_timeout (отложенная транзакция,
+    начатая чтением, при записи получает "database is locked" без ожидания).
+    Соединения чтения работают с query_only и в WAL не ждут пишущих.
+    """
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        if not writer:
+            cursor.execute("PRAGMA query_only = ON")
+        cursor.close()
+
+    @event.listens_for(engine, "begin")
+    def on_begin(connection):
+        connection.exec_driver_sql("BEGIN IMMEDIATE" if writer else "BEGIN")
+
+
+# Единственный писатель процесса в рабочем режиме SQLite: пишущее соединение
+# синхронного движка (импорт, скрипты, фоновые задачи) и асинхронного
+# (endpoint'ы) берут эту блокировку на все время, пока соединение выдано из пула
+sqlite_writer_lock = threading.Lock()
+# Как часто асинхронный писатель проверяет блокировку, не занимая цикл событий
+WRITER_LOCK_POLL = 0.002
+
+
+async def _acquire_writer_lock_async():
+    # Опрос, а не ожидание в потоке: отмененная задача не оставит блокировку захваченной
+    while not sqlite_writer_lock.acquire(blocking=False):
+        await asyncio.sleep(WRITER_LOCK_POLL)
+
+
+def share_writer_lock(engine, is_async: bool):
+    """Пишущее соединение движка выдается из пула только под sqlite_writer_lock"""
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        if is_async:
+            # Выдача соединения асинхронного движка идет в greenlet'е SQLAlchemy
+            await_only(_acquire_writer_lock_async())
+        else:
+            sqlite_writer_lock.acquire()
+        connection_record.info["writer_lock"] = True
+
+    @event.listens_for(engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        if connection_record.info.pop("writer_lock", False):
+            sqlite_writer_lock.release()
+
+
+SQLITE_PRODUCTION = SQLITE_PROFILE == "production" and is_sqlite_file(DATABASE_URL)
+
+# Один писатель на процесс в рабочем режиме SQLite (см. sqlite_writer_lock)
+SQLITE_WRITER_POOL = {"pool_size": 1, "max_overflow": 0} if SQLITE_PRODUCTION else {}
+
+engine = create_engine(
+    DATABASE_URL, **engine_options(DATABASE_URL, QueuePool, pool_metrics["sync"], **SQLITE_WRITER_POOL)
+)
+instrument(engine, pool_metrics["sync"])
+
+# Движок чтения для фонового кода (выгрузка, снимки). В рабочем режиме SQLite -
+# отдельные соединения, которые не берут блокировку записи
+read_engine = engine
+if SQLITE_PRODUCTION:
+    apply_sqlite_profile(engine, writer=True)
+    share_writer_lock(engine, is_async=False)
+    pool_metrics["sync_read"] = PoolMetrics("sync_read")
+    read_engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL, QueuePool, pool_metrics["sync_read"]))
+    instrument(read_engine, pool_metrics["sync_read"])
+    apply_sqlite_profile(read_engine, writer=False)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Асинхронный драйвер для той же базы: aiosqlite для SQLite, asyncpg для PostgreSQL
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+
+def get_async_url(url: str) -> str:
+    """URL базы с асинхронным драйвером (ASYNC_DATABASE_URL переопределяет)"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"Нет асинхронного драйвера для базы {backend}")
+    return parsed.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or get_async_url(DATABASE_URL)
+
+# Движок для endpoint'ов: запросы не занимают потоки из пула Starlette.
+# Синхронный engine остается для запуска, скриптов и фоновых задач
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    # В рабочем режиме SQLite пишет одно соединение: остальные запросы на запись
+    # ждут его в очереди пула и блокировки писателя, а не в busy_timeout внутри SQLite
+    **engine_options(ASYNC_DATABASE_URL, AsyncAdaptedQueuePool, pool_metrics["async"], **SQLITE_WRITER_POOL)
+)
+instrument(async_engine.sync_engine, pool_metrics["async"])
+
+# Движок endpoint'ов чтения (когда нет реплик)
+async_read_engine = async_engine
+if SQLITE_PRODUCTION:
+    apply_sqlite_profile(async_engine.sync_engine, writer=True)
+    share_writer_lock(async_engine.sync_engine, is_async=True)
+    pool_metrics["async_read"] = PoolMetrics("async_read")
+    async_read_engine = create_async_engine(
+        ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL, AsyncAdaptedQueuePool, pool_metrics["async_read"])
+    )
+    instrument(async_read_engine.sync_engine, pool_metrics["async_read"])
+    apply_sqlite_profile(async_read_engine.sync_engine, writer=False)
+
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
 def get_db():
-    """Dependency для получения сессии базы данных"""
+    """Сессия базы данных для синхронного кода (скрипты, фоновые задачи)"""
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    """Dependency для получения асинхронной сессии базы данных"""
+    async with AsyncSessionLocal() as db:
+        yield db
\ No newline at end of file
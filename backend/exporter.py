@@ -0,0 +1,85 @@
+"""
+Потоковая выгрузка каталога товаров (NDJSON / CSV)
+
+Все товары читаются одним запросом с сортировкой по id через серверный
+курсор (yield_per): в памяти находится только текущая пачка строк, а база
+не пересматривает пропущенные строки, как при постраничном skip/limit.
+Строки кодируются пачками и отдаются генератором в StreamingResponse,
+при необходимости через потоковое сжатие gzip.
+
+CSV совместим с импортом (importer.py): списки записываются JSON массивами.
+"""
+import csv
+import io
+import zlib
+from typing import Iterator
+
+import orjson
+from sqlalchemy import select
+
+from replicas import ReadSessionLocal
+from models import Product
+from schemas import ProductResponse
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+# Сколько строк читается из курсора и кодируется за раз
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_COLUMNS = [getattr(Product, name) for name in ProductResponse.model_fields]
+
+
+def _encode_ndjson(rows) -> bytes:
+    return b"".join(orjson.dumps(row._asdict()) + b"\n" for row in rows)
+
+
+def _csv_value(value):
+    if isinstance(value, (list, dict)):
+        return orjson.dumps(value).decode()
+    if value is None:
+        return ""
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+def _csv_lines(rows) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([_csv_value(value) for value in row] for row in rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+def iter_products(fmt: str) -> Iterator[bytes]:
+    """
+    Генерирует выгрузку всех товаров пачками байт
+
+    Использует собственную сессию (с реплики, если они заданы): генератор
+    StreamingResponse работает уже после выхода из endpoint'а.
+    """
+    db = ReadSessionLocal()
+    try:
+        if fmt == "csv":
+            yield _csv_lines([list(ProductResponse.model_fields)])
+        result = db.execute(
+            select(*EXPORT_COLUMNS)
+            .order_by(Product.id)
+            .execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        encode = _csv_lines if fmt == "csv" else _encode_ndjson
+        for rows in result.partitions():
+            yield encode(rows)
+    finally:
+        db.close()
+
+
+def gzip_stream(chunks: Iterator[bytes], level: int = 6) -> Iterator[bytes]:
+    """Сжимает поток пачек в формат gzip, не собирая его целиком в памяти"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
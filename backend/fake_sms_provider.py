@@ -0,0 +1,103 @@
+"""
+Локальный фейковый SMS провайдер для нагрузочных тестов без сети
+
+Отвечает в формате SMS.RU (GET /sms/send) и SMSC.RU (GET /sys/send.php) с
+задержкой --latency секунд (равномерно от половины до полутора), а долю
+--error-rate запросов завершает ошибкой провайдера (--error-status 200 -
+ошибка в теле ответа, как у настоящего API, иначе HTTP ошибка). Сообщения
+никуда не отправляются; GET /stats - сколько запросов принято и отклонено.
+
+Запуск провайдера и backend'а, который шлет SMS в него:
+
+    python fake_sms_provider.py --port 9100 --latency 0.5 --error-rate 0.1
+    SMS_TEST_MODE=false SMSRU_API_ID=fake \\
+        SMSRU_API_URL=http://127.0.0.1:9100/sms/send \\
+        SMSC_LOGIN=fake SMSC_PASSWORD=fake \\
+        SMSC_API_URL=http://127.0.0.1:9100/sys/send.php \\
+        uvicorn main:app --port 8001
+
+Переключение между провайдерами удобно проверять двумя экземплярами на разных
+портах: SMSRU_API_URL - на сбойный (--error-rate 1) или медленный, SMSC_API_URL -
+на исправный.
+
+Нагрузка на отправку кодов:
+
+    python bench_concurrency.py --url http://127.0.0.1:8001 --path /health \\
+        --write-every 1 --write-method POST --write-path /auth/send-code \\
+        --write-body '{"phone": "+79990000000"}'
+"""
+import argparse
+import asyncio
+import itertools
+import random
+from collections import Counter
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+app = FastAPI(title="Fake SMS provider")
+app.state.latency = 0.5
+app.state.error_rate = 0.0
+app.state.error_status = 200
+counters = Counter()
+_sms_ids = itertools.count(1)
+
+
+async def simulate() -> bool:
+    """Задержка провайдера; False - этот запрос завершится ошибкой"""
+    await asyncio.sleep(app.state.latency * random.uniform(0.5, 1.5))
+    failed = random.random() < app.state.error_rate
+    counters["failed" if failed else "accepted"] += 1
+    return not failed
+
+
+def error_response(body: dict):
+    if app.state.error_status == 200:
+        return body
+    return JSONResponse(body, status_code=app.state.error_status)
+
+
+@app.get("/sms/send")
+async def smsru_send(to: str, msg: str = "", api_id: str = "", json: int = 1):
+    """Формат ответа SMS.RU"""
+    if not await simulate():
+        return error_response({"status": "ERROR", "status_code": 220, "status_text": "Сервис временно недоступен"})
+    return {
+        "status": "OK",
+        "status_code": 100,
+        "sms": {to: {"status": "OK", "status_code": 100, "sms_id": f"fake-{next(_sms_ids)}"}},
+    }
+
+
+@app.get("/sys/send.php")
+async def smsc_send(phones: str, mes: str = "", login: str = "", psw: str = "", fmt: int = 3):
+    """Формат ответа SMSC.RU"""
+    if not await simulate():
+        return error_response({"error": "service unavailable", "error_code": 9})
+    return {"id": next(_sms_ids), "cnt": 1}
+
+
+@app.get("/stats")
+async def stats():
+    return dict(counters)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Фейковый SMS провайдер")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", type=float, default=0.5, help="Средняя задержка ответа, с")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Доля ответов с ошибкой (0..1)")
+    parser.add_argument("--error-status", type=int, default=200, help="HTTP статус ошибки (200 - ошибка в теле)")
+    args = parser.parse_args()
+
+    app.state.latency = args.latency
+    app.state.error_rate = args.error_rate
+    app.state.error_status = args.error_status
+
+    import uvicorn
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
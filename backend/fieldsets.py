@@ -0,0 +1,78 @@
+"""
+Выборочные поля (?fields=) и встраивание связанных объектов (?include=)
+
+fields=id,name,price сужает и SQL запрос (load_only), и ответ: остальные
+колонки не читаются из базы и не попадают в JSON. id возвращается всегда.
+
+include=seller добавляет в ответ связанные объекты. Endpoint'ы загружают их
+через selectinload, то есть одним дополнительным запросом на всю страницу.
+"""
+from typing import Iterable, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy.orm import load_only
+
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str]) -> Optional[Tuple[str, ...]]:
+    """
+    Разбирает параметр fields
+
+    Args:
+        fields: Список полей через запятую
+        allowed: Поля схемы ответа
+
+    Returns:
+        Кортеж полей (id первым) или None, если параметр не передан
+
+    Raises:
+        HTTPException: Если запрошено неизвестное поле
+    """
+    if not fields:
+        return None
+
+    requested = [name.strip() for name in fields.split(",") if name.strip()]
+    allowed = set(allowed)
+    unknown = [name for name in requested if name not in allowed]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Неизвестные поля: {', '.join(unknown)}. Допустимые: {', '.join(sorted(allowed))}"
+        )
+    return tuple(dict.fromkeys(["id", *requested]))
+
+
+def load_only_fields(model, fields: Tuple[str, ...], extra_columns: Iterable = ()):
+    """
+    Опция запроса, загружающая только выбранные колонки
+
+    extra_columns - колонки, нужные серверу помимо ответа (например, ключ пагинации)
+    """
+    return load_only(*[getattr(model, name) for name in fields], *extra_columns)
+
+
+def pick_fields(row, fields: Tuple[str, ...]) -> dict:
+    """Собирает словарь ответа только из выбранных полей"""
+    return {name: getattr(row, name) for name in fields}
+
+
+def parse_include(include: Optional[str], allowed: Iterable[str]) -> Tuple[str, ...]:
+    """
+    Разбирает параметр include
+
+    Returns:
+        Отсортированный кортеж связей (пустой, если параметр не передан)
+
+    Raises:
+        HTTPException: Если запрошена неизвестная связь
+    """
+    if not include:
+        return ()
+
+    requested = {name.strip() for name in include.split(",") if name.strip()}
+    unknown = requested - set(allowed)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Неизвестные связи: {', '.join(sorted(unknown))}. Допустимые: {', '.join(allowed)}"
+        )
+    return tuple(sorted(requested))
@@ -0,0 +1,56 @@
+"""
+Потоковый импорт товаров и сотрудников из CSV / NDJSON файла
+
+Запуск:
+    python import_data.py employees employees.csv
+    python import_data.py products products.ndjson --format ndjson
+
+Формат по умолчанию определяется по расширению файла (.csv / .ndjson / .jsonl).
+Кэш ответов запущенного сервера не сбрасывается, но версии таблиц
+обновляются, поэтому ETag каталога меняется сразу. Снимки каталога
+(SNAPSHOT_DIR) перезаписываются по окончании импорта.
+"""
+import argparse
+import sys
+import time
+
+import search
+import snapshots
+from database import SessionLocal, engine
+from importer import IMPORT_ENTITIES, IMPORT_FORMATS, import_records
+
+
+def detect_format(path: str) -> str:
+    """Формат по расширению файла"""
+    return "csv" if path.lower().endswith(".csv") else "ndjson"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Импорт товаров и сотрудников из CSV / NDJSON")
+    parser.add_argument("entity", choices=sorted(IMPORT_ENTITIES))
+    parser.add_argument("path", help="Путь к файлу")
+    parser.add_argument("--format", choices=IMPORT_FORMATS, help="Формат файла")
+    args = parser.parse_args()
+
+    search.init_search(engine)
+
+    db = SessionLocal()
+    started = time.perf_counter()
+    try:
+        with open(args.path, "rb") as stream:
+            report = import_records(db, args.entity, stream, args.format or detect_format(args.path))
+    finally:
+        db.close()
+    elapsed = time.perf_counter() - started
+    snapshots.write_snapshots([args.entity])
+
+    for error in report["errors"]:
+        print(f"  строка {error['row']}: {'; '.join(error['errors'])}")
+    rate = report["inserted"] / elapsed if elapsed else 0
+    print(f"Добавлено: {report['inserted']}, с ошибками: {report['failed']}, "
+          f"время: {elapsed:.2f} с ({rate:,.0f} строк/с)")
+    return 1 if report["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,236 @@
+"""
+Потоковый импорт товаров и сотрудников из CSV / NDJSON
+
+Файл читается построчно и обрабатывается блоками по IMPORT_CHUNK_SIZE строк:
+каждая строка проверяется по ProductCreate / EmployeeCreate, валидные строки
+блока вставляются одним пакетным запросом (COPY на PostgreSQL с psycopg2,
+executemany драйвера на SQLite), и блок коммитится. В памяти одновременно
+находится только один блок, поэтому потребление памяти не зависит от
+размера файла. Ошибочные строки пропускаются и попадают в отчет.
+
+Используется endpoint'ами POST /products/import, POST /employees/import
+и командой import_data.py.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+from typing import IO, Iterator, Tuple
+
+import orjson
+from pydantic import ValidationError
+from sqlalchemy import JSON, insert
+from sqlalchemy.orm import Session
+
+import search
+import stats
+from models import Employee, Product
+from schemas import EmployeeCreate, ProductCreate
+from versions import bump_version
+
+IMPORT_CHUNK_SIZE = 5000
+
+# Сколько ошибок возвращать в отчете (остальные только считаются)
+MAX_REPORTED_ERRORS = 1000
+
+IMPORT_FORMATS = ("csv", "ndjson")
+
+# Сущность -> (модель, схема валидации, поля-списки)
+IMPORT_ENTITIES = {
+    "products": (Product, ProductCreate, ("images", "vitamins", "minerals", "antioxidants")),
+    "employees": (Employee, EmployeeCreate, ()),
+}
+
+
+def _parse_csv_list(value: str):
+    # Список в ячейке CSV: JSON массив или значения через "|"
+    if value.startswith("["):
+        return json.loads(value)
+    return [item.strip() for item in value.split("|") if item.strip()]
+
+
+def iter_records(stream: IO[bytes], fmt: str, list_fields=()) -> Iterator[Tuple[int, dict, str]]:
+    """
+    Построчно читает записи из бинарного потока
+
+    Yields:
+        (номер записи с 1, словарь полей или None, текст ошибки разбора или None)
+    """
+    text_stream = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        for number, row in enumerate(csv.DictReader(text_stream), start=1):
+            record = {key: (value if value != "" else None) for key, value in row.items() if key}
+            try:
+                for field in list_fields:
+                    if record.get(field) is not None:
+                        record[field] = _parse_csv_list(record[field])
+            except json.JSONDecodeError as e:
+                yield number, None, f"Неверный JSON в списке: {e}"
+                continue
+            yield number, record, None
+    else:
+        number = 0
+        for line in text_stream:
+            if not line.strip():
+                continue
+            number += 1
+            try:
+                record = orjson.loads(line)
+            except orjson.JSONDecodeError as e:
+                yield number, None, f"Неверный JSON: {e}"
+                continue
+            if not isinstance(record, dict):
+                yield number, None, "Строка должна быть JSON объектом"
+                continue
+            yield number, record, None
+
+
+def _column_converters(model, columns: list) -> list:
+    """Для каждой колонки функция приведения значения к виду, который драйвер примет как есть"""
+    json_columns = {c.name for c in model.__table__.columns if isinstance(c.type, JSON)}
+    return [
+        (lambda value: None if value is None else orjson.dumps(value).decode()) if c in json_columns else None
+        for c in columns
+    ]
+
+
+def _plain_rows(model, rows: list, now: datetime):
+    """
+    Колонки и кортежи значений для вставки драйвером
+
+    created_at / updated_at одинаковы для всего блока и добавляются в конец.
+    Формат времени совпадает с тем, в котором SQLAlchemy хранит DateTime в SQLite.
+    """
+    columns = list(rows[0])
+    converters = _column_converters(model, columns)
+    timestamps = (now.strftime("%Y-%m-%d %H:%M:%S.%f"),) * 2
+    values = [
+        tuple(convert(row[c]) if convert else row[c] for c, convert in zip(columns, converters)) + timestamps
+        for row in rows
+    ]
+    return columns + ["created_at", "updated_at"], values
+
+
+def _copy_rows(db: Session, model, rows: list, now: datetime):
+    """Вставляет строки через COPY FROM STDIN (PostgreSQL + psycopg2)"""
+    columns, values = _plain_rows(model, rows, now)
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(values)
+    buffer.seek(0)
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {model.__tablename__} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+            buffer
+        )
+    finally:
+        cursor.close()
+
+
+def _executemany_rows(db: Session, model, table: str, rows: list, now: datetime):
+    """
+    Вставляет строки одним executemany драйвера (SQLite)
+
+    Обработка параметров SQLAlchemy (DateTime, JSON) на каждую строку стоит
+    дороже самой вставки, поэтому значения готовятся заранее.
+    """
+    columns, values = _plain_rows(model, rows, now)
+    conn = db.connection()
+    conn.exec_driver_sql(
+        f"INSERT INTO {model.__tablename__} ({', '.join(columns)}) "
+        f"VALUES ({', '.join('?' * len(columns))})",
+        values
+    )
+    if table in search.SEARCH_FIELDS:
+        # Транзакция держит блокировку записи SQLite, поэтому id вставленных
+        # строк идут подряд и заканчиваются на last_insert_rowid()
+        first_id = conn.exec_driver_sql("SELECT last_insert_rowid()").scalar() - len(rows) + 1
+        _, (title, description) = search.SEARCH_FIELDS[table]
+        search.index_rows(db, table, [
+            (first_id + offset, row[title], row[description]) for offset, row in enumerate(rows)
+        ])
+
+
+def _insert_chunk(db: Session, model, table: str, rows: list, now: datetime):
+    """Вставляет блок строк пакетным запросом и обновляет поисковый индекс (без commit)"""
+    dialect = db.get_bind().dialect
+    if dialect.name == "postgresql" and dialect.driver == "psycopg2":
+        # search_vector в PostgreSQL - генерируемая колонка, индекс обновит сама база
+        _copy_rows(db, model, rows, now)
+    elif dialect.name == "sqlite":
+        _executemany_rows(db, model, table, rows, now)
+    else:
+        db.execute(insert(model.__table__), [{**row, "created_at": now, "updated_at": now} for row in rows])
+
+
+def _check_sellers(db: Session, chunk: list, errors: list) -> list:
+    """Отбрасывает товары с несуществующим продавцом"""
+    seller_ids = {row["seller_id"] for _, row in chunk}
+    known = {row[0] for row in db.query(Employee.id).filter(Employee.id.in_(seller_ids))}
+    valid = []
+    for number, row in chunk:
+        if row["seller_id"] in known:
+            valid.append((number, row))
+        else:
+            errors.append((number, [f"seller_id: продавец {row['seller_id']} не найден"]))
+    return valid
+
+
+def import_records(db: Session, entity: str, stream: IO[bytes], fmt: str) -> dict:
+    """
+    Импортирует записи из потока блоками, коммитя каждый блок
+
+    Args:
+        db: Сессия базы данных
+        entity: products или employees
+        stream: Бинарный поток с данными
+        fmt: csv или ndjson
+
+    Returns:
+        Словарь для ImportReport
+    """
+    model, schema, list_fields = IMPORT_ENTITIES[entity]
+    inserted = 0
+    failed = 0
+    reported = []
+
+    def flush(chunk):
+        nonlocal inserted, failed
+        chunk_errors = []
+        if entity == "products":
+            chunk = _check_sellers(db, chunk, chunk_errors)
+        if chunk:
+            rows = [row for _, row in chunk]
+            _insert_chunk(db, model, entity, rows, datetime.utcnow())
+            stats.update(db, added=[key for row in rows for key in stats.keys_of(entity, row)])
+            bump_version(db, entity)
+            db.commit()
+            inserted += len(rows)
+        failed += len(chunk_errors)
+        add_errors(chunk_errors)
+
+    def add_errors(new_errors):
+        room = MAX_REPORTED_ERRORS - len(reported)
+        reported.extend({"row": number, "errors": messages} for number, messages in new_errors[:room])
+
+    chunk = []
+    for number, record, parse_error in iter_records(stream, fmt, list_fields):
+        if parse_error:
+            failed += 1
+            add_errors([(number, [parse_error])])
+            continue
+        try:
+            chunk.append((number, schema(**record).model_dump()))
+        except ValidationError as e:
+            failed += 1
+            add_errors([(number, [
+                f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()
+            ])])
+            continue
+        if len(chunk) >= IMPORT_CHUNK_SIZE:
+            flush(chunk)
+            chunk = []
+    if chunk:
+        flush(chunk)
+
+    return {"inserted": inserted, "failed": failed, "errors": reported}
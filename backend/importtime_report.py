@@ -0,0 +1,116 @@
+"""
+Время холодного импорта приложения (python -X importtime)
+
+Несколько раз запускает новый интерпретатор с `python -X importtime -c
+"import main"`, берет медиану времени импорта main и печатает, какие прямые
+импорты main сколько стоят. Импорт main не трогает базу (инициализация - в
+lifespan), поэтому это время каждый воркер uvicorn и каждый тест платит до
+первого запроса. С --budget-ms скрипт завершается с кодом 1, если медиана
+превышает бюджет.
+
+Запуск:
+    python importtime_report.py
+    python importtime_report.py --runs 7 --output IMPORT_TIME.md
+    python importtime_report.py --budget-ms 1500
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BUDGET_MS = 1500
+
+
+def measure(module: str) -> Tuple[float, Dict[str, float]]:
+    """Один запуск: время импорта модуля и его прямых импортов, мс"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+    )
+    children, total = {}, None
+    pending: Dict[str, float] = {}
+    # Вывод в порядке завершения импорта: сначала вложенные модули, потом родитель
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        name = name.strip()
+        milliseconds = int(cumulative) / 1000
+        if depth == 1:
+            pending[name] = milliseconds
+        elif depth == 0:
+            if name == module:
+                total, children = milliseconds, pending
+            pending = {}
+    if total is None:
+        raise RuntimeError(f"В выводе -X importtime нет модуля {module}")
+    return total, children
+
+
+def collect(module: str, runs: int) -> Tuple[float, List[Tuple[str, float]]]:
+    """Медианы по runs запускам: общее время и прямые импорты по убыванию"""
+    totals, children = [], {}
+    for _ in range(runs):
+        total, run_children = measure(module)
+        totals.append(total)
+        for name, milliseconds in run_children.items():
+            children.setdefault(name, []).append(milliseconds)
+    ranked = sorted(
+        ((name, statistics.median(values)) for name, values in children.items()),
+        key=lambda item: item[1], reverse=True,
+    )
+    return statistics.median(totals), ranked
+
+
+def render_markdown(module: str, runs: int, total: float, ranked: list, budget: float, top: int) -> str:
+    status = "в бюджете" if total <= budget else "превышает бюджет"
+    lines = [
+        "# Время холодного импорта приложения",
+        "",
+        f"Сгенерировано `python importtime_report.py --output IMPORT_TIME.md` "
+        f"(Python {sys.version.split()[0]}, медиана {runs} запусков).",
+        "",
+        f"`import {module}`: **{total:.0f} мс** (бюджет {budget:.0f} мс, {status}).",
+        "",
+        "Тяжелые модули, нужные не каждому запросу, загружаются при первом",
+        "использовании: alembic (проверка схемы в lifespan), passlib / bcrypt",
+        "(пароли профилей), python-jose (токены), httpx (реальная отправка SMS).",
+        "",
+        f"| Прямой импорт {module} | мс |",
+        "|---|---:|",
+    ]
+    lines += [f"| `{name}` | {milliseconds:.1f} |" for name, milliseconds in ranked[:top]]
+    lines.append("")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Время холодного импорта приложения")
+    parser.add_argument("--module", default="main", help="Импортируемый модуль")
+    parser.add_argument("--runs", type=int, default=5, help="Число запусков (берется медиана)")
+    parser.add_argument("--top", type=int, default=20, help="Сколько прямых импортов показать")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="Бюджет на импорт, мс")
+    parser.add_argument("--output", help="Записать отчет в markdown файл")
+    args = parser.parse_args()
+
+    total, ranked = collect(args.module, args.runs)
+    report = render_markdown(args.module, args.runs, total, ranked, args.budget_ms, args.top)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(report)
+        print(f"Отчет записан в {args.output}")
+    else:
+        print(report)
+    if total > args.budget_ms:
+        print(f"Импорт {args.module} занимает {total:.0f} мс, бюджет {args.budget_ms:.0f} мс", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,16 +3,17 @@
 """
 from sqlalchemy.orm import Session
 from database import SessionLocal, engine
-from models import Base, Employee, Product, Vacancy, Profile
-from utils import list_to_json, hash_password
+from models import Employee, Product, Vacancy, Profile
+from utils import hash_password
+import migrate
 from datetime import datetime
 import json
 
 def init_database():
     """Создает таблицы и заполняет их тестовыми данными"""
     
-    # Создаем все таблицы
-    Base.metadata.create_all(bind=engine)
+    # Создаем таблицы миграциями
+    migrate.upgrade()
     
     # Создаем сессию
     db = SessionLocal()
@@ -3,15 +3,19 @@
 """
 from sqlalchemy.orm import Session
 from database import SessionLocal, engine
-from models import Base, Employee, Product, Vacancy, Profile
-from utils import list_to_json, hash_password
+from models import Employee, Product, Vacancy, Profile
+from utils import hash_password
+import migrate
+from versions import bump_version
+import search
+import stats
 from datetime import datetime
 
 def init_database():
     """Создает таблицы и заполняет их тестовыми данными"""
     
-    # Создаем все таблицы
-    Base.metadata.create_all(bind=engine)
+    # Создаем таблицы миграциями
+    migrate.upgrade()
     
     # Создаем сессию
     db = SessionLocal()
@@ -83,12 +87,12 @@ def init_database():
                 "city": "Москва",
                 "schedule": "5/2, с 10:00 до 19:00",
                 "salary": "от 50 000 руб",
-                "additional_conditions": list_to_json([
+                "additional_conditions": [
                     "Бесплатное обучение",
                     "Официальное трудоустройство",
                     "Скидки на продукцию",
                     "Дружный коллектив"
-                ]),
+                ],
                 "long_description": "Требуется продавец в магазин натуральных продуктов. Опыт работы приветствуется, но не обязателен. Мы обучим всему необходимому. Работа с натуральными продуктами: мёд, чай, ягоды."
             },
             {
@@ -96,12 +100,12 @@ def init_database():
                 "city": "Санкт-Петербург",
                 "schedule": "Полный день",
                 "salary": "от 70 000 руб + бонусы",
-                "additional_conditions": list_to_json([
+                "additional_conditions": [
                     "Высокий процент от продаж",
                     "Карьерный рост",
                     "Корпоративное обучение",
                     "ДМС после испытательного срока"
-                ]),
+                ],
                 "long_description": "Ищем активного менеджера по продажам для работы с оптовыми клиентами. Требуется опыт работы от 1 года, знание техник продаж, коммуникабельность."
             },
             {
@@ -109,12 +113,12 @@ def init_database():
                 "city": "Екатеринбург",
                 "schedule": "Сменный график",
                 "salary": "от 45 000 руб",
-                "additional_conditions": list_to_json([
+                "additional_conditions": [
                     "Своевременная оплата",
                     "Спецодежда",
                     "Питание",
                     "Развозка"
-                ]),
+                ],
                 "long_description": "Требуется сборщик заказов на склад. Обязанности: комплектация заказов, упаковка продукции, поддержание порядка на складе. График работы обсуждается индивидуально."
             }
         ]
@@ -131,79 +135,79 @@ def init_database():
         products_data = [
             {
                 "name": "Мёд липовый",
-                "images": list_to_json(["/uploads/honey1.jpg", "/uploads/honey1_2.jpg"]),
+                "images": ["/uploads/honey1.jpg", "/uploads/honey1_2.jpg"],
                 "price": 850.0,
                 "product_type": "мёд",
                 "long_description": "Натуральный липовый мёд собран в экологически чистых районах. Обладает нежным ароматом липы и приятным вкусом. Идеален для чаепития и укрепления иммунитета.",
                 "seller_id": 1,
-                "vitamins": list_to_json(["B1", "B2", "B6", "C", "E"]),
-                "minerals": list_to_json(["Калий", "Кальций", "Магний", "Железо"]),
-                "antioxidants": list_to_json(["Флавоноиды", "Фенольные кислоты"]),
+                "vitamins": ["B1", "B2", "B6", "C", "E"],
+                "minerals": ["Калий", "Кальций", "Магний", "Железо"],
+                "antioxidants": ["Флавоноиды", "Фенольные кислоты"],
                 "energy_value": "328 ккал на 100г",
                 "shelf_life": "24 месяца"
             },
             {
                 "name": "Чай Иван-чай ферментированный",
-                "images": list_to_json(["/uploads/tea1.jpg"]),
+                "images": ["/uploads/tea1.jpg"],
                 "price": 450.0,
                 "product_type": "чай",
                 "long_description": "Традиционный русский чай из кипрея узколистного. Собран вручную, ферментирован по классической технологии. Не содержит кофеина, обладает успокаивающим действием.",
                 "seller_id": 1,
-                "vitamins": list_to_json(["C", "A", "B"]),
-                "minerals": list_to_json(["Железо", "Медь", "Марганец"]),
-                "antioxidants": list_to_json(["Танины", "Флавоноиды"]),
+                "vitamins": ["C", "A", "B"],
+                "minerals": ["Железо", "Медь", "Марганец"],
+                "antioxidants": ["Танины", "Флавоноиды"],
                 "energy_value": "15 ккал на 100г",
                 "shelf_life": "12 месяцев"
             },
             {
                 "name": "Клюква сушеная",
-                "images": list_to_json(["/uploads/berry1.jpg", "/uploads/berry1_2.jpg", "/uploads/berry1_3.jpg"]),
+                "images": ["/uploads/berry1.jpg", "/uploads/berry1_2.jpg", "/uploads/berry1_3.jpg"],
                 "price": 650.0,
                 "product_type": "ягода",
                 "long_description": "Сушеная клюква без добавления сахара. Сохраняет все полезные свойства свежей ягоды. Отличный источник витамина C и антиоксидантов. Можно добавлять в чай, выпечку или есть как перекус.",
                 "seller_id": 2,
-                "vitamins": list_to_json(["C", "K", "E"]),
-                "minerals": list_to_json(["Марганец", "Медь"]),
-                "antioxidants": list_to_json(["Проантоцианидины", "Кверцетин"]),
+                "vitamins": ["C", "K", "E"],
+                "minerals": ["Марганец", "Медь"],
+                "antioxidants": ["Проантоцианидины", "Кверцетин"],
                 "energy_value": "308 ккал на 100г",
                 "shelf_life": "18 месяцев"
             },
             {
                 "name": "Ягодный сбор 'Лесная поляна'",
-                "images": list_to_json(["/uploads/mix1.jpg"]),
+                "images": ["/uploads/mix1.jpg"],
                 "price": 720.0,
                 "product_type": "ягодный сбор",
                 "long_description": "Смесь сушеных лесных ягод: черника, брусника, малина, земляника. Идеален для приготовления компотов, морсов и чая. Богат витаминами и природными антиоксидантами.",
                 "seller_id": 2,
-                "vitamins": list_to_json(["C", "A", "E", "K"]),
-                "minerals": list_to_json(["Калий", "Магний", "Железо"]),
-                "antioxidants": list_to_json(["Антоцианы", "Флавоноиды", "Танины"]),
+                "vitamins": ["C", "A", "E", "K"],
+                "minerals": ["Калий", "Магний", "Железо"],
+                "antioxidants": ["Антоцианы", "Флавоноиды", "Танины"],
                 "energy_value": "280 ккал на 100г",
                 "shelf_life": "12 месяцев"
             },
             {
                 "name": "Мёд гречишный",
-                "images": list_to_json(["/uploads/honey2.jpg"]),
+                "images": ["/uploads/honey2.jpg"],
                 "price": 900.0,
                 "product_type": "мёд",
                 "long_description": "Тёмный гречишный мёд с насыщенным вкусом и ароматом. Содержит больше железа и белка, чем светлые сорта мёда. Рекомендуется при анемии и для укрепления сосудов.",
                 "seller_id": 3,
-                "vitamins": list_to_json(["B1", "B2", "B6", "C", "PP"]),
-                "minerals": list_to_json(["Железо", "Медь", "Цинк", "Магний"]),
-                "antioxidants": list_to_json(["Полифенолы", "Флавоноиды"]),
+                "vitamins": ["B1", "B2", "B6", "C", "PP"],
+                "minerals": ["Железо", "Медь", "Цинк", "Магний"],
+                "antioxidants": ["Полифенолы", "Флавоноиды"],
                 "energy_value": "309 ккал на 100г",
                 "shelf_life": "24 месяца"
             },
             {
                 "name": "Облепиха сушеная",
-                "images": list_to_json(["/uploads/berry2.jpg"]),
+                "images": ["/uploads/berry2.jpg"],
                 "price": 580.0,
                 "product_type": "ягода",
                 "long_description": "Сушеная облепиха - настоящий кладезь витаминов. Особенно богата витамином C и каротиноидами. Укрепляет иммунитет, улучшает состояние кожи и зрения.",
                 "seller_id": 3,
-                "vitamins": list_to_json(["C", "A", "E", "K", "B"]),
-                "minerals": list_to_json(["Калий", "Кальций", "Магний", "Железо"]),
-                "antioxidants": list_to_json(["Каротиноиды", "Флавоноиды", "Токоферолы"]),
+                "vitamins": ["C", "A", "E", "K", "B"],
+                "minerals": ["Калий", "Кальций", "Магний", "Железо"],
+                "antioxidants": ["Каротиноиды", "Флавоноиды", "Токоферолы"],
                 "energy_value": "295 ккал на 100г",
                 "shelf_life": "18 месяцев"
             }
@@ -246,6 +250,13 @@ def init_database():
         db.commit()
         print(f"✓ Создано профилей: {len(profiles_data)}")
         
+        # Данные каталога заменены целиком: сбрасываем ETag, статистику и поисковый индекс
+        for table in ("employees", "vacancies", "products"):
+            bump_version(db, table)
+        stats.recompute(db)
+        db.commit()
+        search.rebuild_search(engine)
+        
         print("\n" + "="*50)
         print("✅ База данных успешно инициализирована!")
         print("="*50)
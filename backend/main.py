@@ -1,110 +1,203 @@
-from fastapi import FastAPI, HTTPException, Depends, UploadFile, File
+from fastapi import APIRouter, FastAPI, HTTPException, Depends, UploadFile, File, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from sqlalchemy.orm import Session
-from sqlalchemy.exc import SQLAlchemyError, OperationalError
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlalchemy.exc import SQLAlchemyError, OperationalError, IntegrityError
 from typing import List, Optional
 import os
-import shutil
+import aiofiles
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
 
-from database import get_db, engine
-from models import Base, Employee, Product, User, SMSCode, Vacancy, Profile
+from database import get_async_db, engine, SessionLocal, pool_metrics, async_engine, async_read_engine
+from replicas import get_read_db
+import replicas
+from models import Employee, Product, User, SMSCode, Vacancy, Profile
 from schemas import (
     EmployeeCreate, EmployeeUpdate, EmployeeResponse,
     ProductCreate, ProductUpdate, ProductResponse,
     VacancyCreate, VacancyUpdate, VacancyResponse,
     ProfileCreate, ProfileUpdate, ProfileResponse,
-    PhoneRequest, VerifyCodeRequest, AuthResponse, UserResponse
+    PhoneRequest, VerifyCodeRequest, AuthResponse, UserResponse,
+    SearchResponse, CatalogStatsResponse,
+    EmployeeBulkRequest, ProductBulkRequest, VacancyBulkRequest, BulkResponse, ImportReport
 )
 from sms_service import sms_service
-from auth_utils import create_access_token, get_current_user
-from utils import list_to_json, json_to_list, hash_password, verify_password
+from fastapi.security import HTTPAuthorizationCredentials
+from auth_utils import (
+    create_access_token, decode_access_token, get_current_user, cache_user, user_cache, security
+)
+import revocation
+import sms_queue
+from utils import hash_password, verify_password
+from pagination import paginate, count_cache, NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER
+import search
+import stats
+import cache
+import snapshots
+import query_stats
+from query_stats import QueryStatsMiddleware
+from cache import cached_response, response_cache
+from serialization import dumps, json_response
+from versions import init_versions, bump_version, check_not_modified
+from fieldsets import parse_fields, parse_include, load_only_fields, pick_fields
+from bulk import apply_bulk
+from importer import import_records, IMPORT_FORMATS
+from exporter import EXPORT_FORMATS, iter_products, gzip_stream
 
-# Создаем таблицы в базе данных
-Base.metadata.create_all(bind=engine)
+# Папка для загружаемых файлов (создается при запуске приложения)
+UPLOAD_DIR = "uploads"
 
-app = FastAPI(
-    title="Forest Bar API",
-    description="API для управления сотрудниками и каталогом товаров",
-    version="1.0.0"
-)
+router = APIRouter()
 
-# Настройка CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=[
-        "http://localhost:3000",
-        "http://localhost:5173",
-        "http://178.72.139.21",
-        "http://37.230.113.150",
-        "https://37.230.113.150",
-        "http://178.72.129.218",
-        "https://178.72.129.218",
-    ],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
 
-# Создаем папку для загрузки файлов
-UPLOAD_DIR = "uploads"
-if not os.path.exists(UPLOAD_DIR):
-    os.makedirs(UPLOAD_DIR)
+def init_app_state():
+    """
+    Проверки и инициализация при запуске (синхронные, с запросами к базе)
+
+    Выполняются в lifespan, а не при импорте модуля: импорт main не трогает
+    базу и файловую систему.
+    """
+    # alembic тяжелый и нужен только здесь
+    import migrate
+
+    # Схема создается миграциями (python migrate.py) до запуска сервера
+    if not migrate.is_up_to_date():
+        raise RuntimeError("Схема базы не на последней версии: выполните python migrate.py")
+
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+
+    # Пустые поисковые индексы SQLite заполняются (таблицы создает миграция)
+    search.init_search(engine)
+
+    # Версии таблиц каталога для ETag / Last-Modified
+    init_versions(engine)
+
+    # Счетчики статистики каталога (GET /stats)
+    stats.init_stats(engine)
+
+    # Статические снимки каталога для nginx (если задан SNAPSHOT_DIR)
+    snapshots.schedule(*snapshots.SNAPSHOT_TABLES)
+
+    # Проверка доступности реплик для чтения (если задан DATABASE_REPLICA_URLS)
+    replicas.start_health_checks()
+
+    # Отозванные токены в память и их синхронизация между воркерами
+    revocation.start()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await run_in_threadpool(init_app_state)
+    # Фоновая отправка SMS кодов
+    await sms_queue.dispatcher.start()
+    yield
+    await sms_queue.dispatcher.stop()
+    await sms_service.aclose()
+    await async_engine.dispose()
+    await async_read_engine.dispose()
+
+
+def create_app() -> FastAPI:
+    """Создает приложение; инициализация с базой выполняется в lifespan"""
+    app = FastAPI(
+        title="Forest Bar API",
+        description="API для управления сотрудниками и каталогом товаров",
+        version="1.0.0",
+        lifespan=lifespan,
+    )
+
+    # Настройка CORS
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=[
+            "http://localhost:3000",
+            "http://localhost:5173",
+            "http://178.72.139.21",
+            "http://37.230.113.150",
+            "https://37.230.113.150",
+            "http://178.72.129.218",
+            "https://178.72.129.218",
+        ],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=[NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER],
+    )
+
+    # Число и время запросов к базе на каждый HTTP запрос (Server-Timing, /metrics/queries)
+    app.add_middleware(QueryStatsMiddleware)
+
+    # Чтение после записи с основной базы для писавшего клиента (при DATABASE_REPLICA_URLS)
+    app.add_middleware(replicas.ReadAfterWriteMiddleware)
 
-# Подключаем статические файлы
-app.mount("/uploads", StaticFiles(directory=UPLOAD_DIR), name="uploads")
+    app.include_router(router)
+
+    # Подключаем статические файлы (папка проверяется при запросе: ее создает lifespan)
+    app.mount("/uploads", StaticFiles(directory=UPLOAD_DIR, check_dir=False), name="uploads")
+    return app
 
 # ========== AUTH ENDPOINTS ==========
 
-@app.post("/auth/send-code")
-def send_sms_code(request: PhoneRequest, db: Session = Depends(get_db)):
+@router.post("/auth/send-code")
+async def send_sms_code(request: PhoneRequest, db: AsyncSession = Depends(get_async_db)):
     """
     Отправить SMS код на указанный номер телефона
     
     - Создает пользователя если его нет
-    - Генерирует и отправляет 6-значный код
+    - Генерирует 6-значный код и ставит его в очередь отправки (ответ не ждет провайдера)
     - Код действителен 5 минут
     """
     phone = request.phone
     
     # Ищем или создаем пользователя
-    user = db.query(User).filter(User.phone == phone).first()
+    user = await db.scalar(select(User).where(User.phone == phone))
     
     if not user:
         user = User(phone=phone)
         db.add(user)
-        db.commit()
-        db.refresh(user)
-    
-    # Генерируем и отправляем код
-    code = sms_service.send_code(phone)
+        try:
+            await db.commit()
+            await db.refresh(user)
+        except IntegrityError:
+            # Пользователя с этим номером только что создал параллельный запрос
+            await db.rollback()
+            user = await db.scalar(select(User).where(User.phone == phone))
     
-    if code is None:
+    if sms_queue.dispatcher.is_full():
         raise HTTPException(
-            status_code=500,
-            detail="Не удалось отправить SMS. Попробуйте позже."
+            status_code=503,
+            detail="Слишком много запросов на отправку SMS. Попробуйте позже."
         )
     
-    # Сохраняем код в базе данных
+    # Сохраняем код в базе данных; отправляет его фоновая очередь (sms_queue.py)
+    code = sms_service.generate_code()
     expires_at = datetime.utcnow() + timedelta(minutes=5)
     sms_code = SMSCode(
         user_id=user.id,
         code=code,
-        expires_at=expires_at
+        expires_at=expires_at,
+        delivery_status="queued"
     )
     db.add(sms_code)
-    db.commit()
+    await db.commit()
+    
+    sms_queue.dispatcher.enqueue(sms_code.id, phone, code)
     
     return {
         "message": "SMS код отправлен",
         "phone": phone,
-        "expires_in_seconds": 300
+        "expires_in_seconds": 300,
+        "delivery_status": "queued"
     }
 
 
-@app.post("/auth/verify-code", response_model=AuthResponse)
-def verify_sms_code(request: VerifyCodeRequest, db: Session = Depends(get_db)):
+@router.post("/auth/verify-code", response_model=AuthResponse)
+async def verify_sms_code(request: VerifyCodeRequest, db: AsyncSession = Depends(get_async_db)):
     """
     Проверить SMS код и авторизовать пользователя
     
@@ -115,7 +208,7 @@ def verify_sms_code(request: VerifyCodeRequest, db: Session = Depends(get_db)):
     code = request.code
     
     # Ищем пользователя
-    user = db.query(User).filter(User.phone == phone).first()
+    user = await db.scalar(select(User).where(User.phone == phone))
     
     if not user:
         raise HTTPException(
@@ -124,12 +217,12 @@ def verify_sms_code(request: VerifyCodeRequest, db: Session = Depends(get_db)):
         )
     
     # Ищем неиспользованный код
-    sms_code = db.query(SMSCode).filter(
+    sms_code = await db.scalar(select(SMSCode).where(
         SMSCode.user_id == user.id,
         SMSCode.code == code,
         SMSCode.is_used == False,
         SMSCode.expires_at > datetime.utcnow()
-    ).first()
+    ).limit(1))
     
     if not sms_code:
         raise HTTPException(
@@ -139,7 +232,10 @@ def verify_sms_code(request: VerifyCodeRequest, db: Session = Depends(get_db)):
     
     # Помечаем код как использованный
     sms_code.is_used = True
-    db.commit()
+    await db.commit()
+    
+    # Следующие запросы с токеном получат пользователя без обращения к базе
+    cache_user(user)
     
     # Создаем JWT токен
     access_token = create_access_token(
@@ -154,8 +250,8 @@ def verify_sms_code(request: VerifyCodeRequest, db: Session = Depends(get_db)):
     )
 
 
-@app.get("/auth/me", response_model=UserResponse)
-def get_current_user_info(current_user: User = Depends(get_current_user)):
+@router.get("/auth/me", response_model=UserResponse)
+async def get_current_user_info(current_user: User = Depends(get_current_user)):
     """
     Получить информацию о текущем авторизованном пользователе
     
@@ -164,58 +260,198 @@ def get_current_user_info(current_user: User = Depends(get_current_user)):
     return current_user
 
 
-@app.post("/auth/logout")
-def logout(current_user: User = Depends(get_current_user)):
+@router.post("/auth/logout")
+async def logout(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
     """
     Выход из системы
     
-    На клиенте нужно удалить JWT токен
+    Отзывает текущий JWT токен: дальше он не принимается ни одним воркером
+    (в других воркерах - через REVOCATION_SYNC_INTERVAL секунд)
     """
+    payload = decode_access_token(credentials.credentials)
+    await revocation.revoke(
+        db, payload["jti"], current_user.id, datetime.utcfromtimestamp(payload["exp"])
+    )
     return {"message": "Успешный выход из системы"}
 
 # ========== HELPER FUNCTIONS ==========
 
 def convert_product_response(product: Product) -> dict:
-    """Преобразует Product с JSON полями в словарь для ответа"""
+    """Преобразует Product в словарь для ответа"""
     return {
         "id": product.id,
         "name": product.name,
-        "images": json_to_list(product.images),
+        "images": product.images,
         "price": product.price,
         "product_type": product.product_type,
         "long_description": product.long_description,
         "seller_id": product.seller_id,
-        "vitamins": json_to_list(product.vitamins),
-        "minerals": json_to_list(product.minerals),
-        "antioxidants": json_to_list(product.antioxidants),
+        "vitamins": product.vitamins,
+        "minerals": product.minerals,
+        "antioxidants": product.antioxidants,
         "energy_value": product.energy_value,
         "shelf_life": product.shelf_life,
         "created_at": product.created_at,
         "updated_at": product.updated_at
     }
 
+def convert_employee_response(employee: Employee) -> dict:
+    """Преобразует Employee в словарь для ответа"""
+    return {
+        "id": employee.id,
+        "first_name": employee.first_name,
+        "last_name": employee.last_name,
+        "middle_name": employee.middle_name,
+        "city": employee.city,
+        "region": employee.region,
+        "email": employee.email,
+        "phone": employee.phone,
+        "referral_link": employee.referral_link,
+        "address": employee.address,
+        "work_hours": employee.work_hours,
+        "photo_url": employee.photo_url,
+        "created_at": employee.created_at,
+        "updated_at": employee.updated_at
+    }
+
 def convert_vacancy_response(vacancy: Vacancy) -> dict:
-    """Преобразует Vacancy с JSON полями в словарь для ответа"""
+    """Преобразует Vacancy в словарь для ответа"""
     return {
         "id": vacancy.id,
         "title": vacancy.title,
         "city": vacancy.city,
         "schedule": vacancy.schedule,
         "salary": vacancy.salary,
-        "additional_conditions": json_to_list(vacancy.additional_conditions),
+        "additional_conditions": vacancy.additional_conditions,
         "long_description": vacancy.long_description,
         "created_at": vacancy.created_at,
         "updated_at": vacancy.updated_at
     }
 
+# Допустимые сортировки каталога: колонки ключа и направление
+PRODUCT_SORTS = {
+    "id": ([Product.id], False),
+    "price": ([Product.price, Product.id], False),
+    "-price": ([Product.price, Product.id], True),
+    "created_at": ([Product.created_at, Product.id], False),
+}
+
+def starts_with(column, prefix: str):
+    """
+    Условие "column начинается с prefix", которое обслуживается индексом по column
+
+    SQLite не использует индекс для LIKE (он регистронезависим для ASCII, а
+    ESCAPE отключает оптимизацию), поэтому префикс ищется диапазоном
+    [prefix, prefix с увеличенным последним символом) - для бинарного
+    сравнения строк это те же строки. В PostgreSQL LIKE 'prefix%' обслуживает
+    индекс с text_pattern_ops (диапазон зависел бы от collation базы).
+    """
+    if engine.dialect.name != "sqlite":
+        return column.startswith(prefix, autoescape=True)
+    head = prefix.rstrip(chr(0x10FFFF))
+    if not head:
+        return column >= prefix
+    return and_(column >= prefix, column < head[:-1] + chr(ord(head[-1]) + 1))
+
+# Размер блока при записи загруженного файла на диск
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+async def save_upload(file: UploadFile, file_path: str):
+    """Сохраняет загруженный файл блоками, не блокируя event loop"""
+    async with aiofiles.open(file_path, "wb") as buffer:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            await buffer.write(chunk)
+
+async def run_bulk(db: AsyncSession, model, table: str, bulk) -> dict:
+    """Применяет пакет изменений одной транзакцией и сбрасывает кэш"""
+    try:
+        result = await db.run_sync(apply_bulk, model, table, bulk)
+        await db.commit()
+    except IntegrityError as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=400,
+            detail=f"Пакет отклонен, изменения не применены: {str(e.orig)}"
+        )
+    
+    cache.invalidate(table)
+    snapshots.schedule(table)
+    for item in result["results"]:
+        if item["action"] != "create" and item["status"] == "ok":
+            cache.invalidate(table, item["id"])
+    return result
+
+def import_file(table: str, file: UploadFile, format: str) -> dict:
+    """Импорт в пуле потоков: чтение файла и пакетные вставки занимают процессор надолго"""
+    db = SessionLocal()
+    try:
+        return import_records(db, table, file.file, format)
+    finally:
+        db.close()
+
+async def run_import(table: str, file: UploadFile, format: str) -> dict:
+    """Потоково импортирует загруженный файл и сбрасывает кэш"""
+    if format not in IMPORT_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Неизвестный формат: {format}. Допустимые: {', '.join(IMPORT_FORMATS)}"
+        )
+    try:
+        report = await run_in_threadpool(import_file, table, file, format)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Файл должен быть в кодировке UTF-8")
+    finally:
+        # Блоки, закоммиченные до ошибки, уже в базе
+        cache.invalidate(table)
+        snapshots.schedule(table)
+    return report
+
 # ========== EMPLOYEE ENDPOINTS ==========
 
-@app.get("/employees", response_model=List[EmployeeResponse])
-def get_employees(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """Получить список всех сотрудников"""
+@router.get("/employees", response_model=List[EmployeeResponse])
+async def get_employees(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    with_total: bool = False,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Получить список всех сотрудников
+
+    - cursor: курсор из заголовка X-Next-Cursor предыдущей страницы (вместо skip)
+    - with_total: вернуть приблизительное общее количество в X-Total-Count
+    - fields: вернуть только перечисленные через запятую поля (id возвращается всегда)
+    """
+    selected = parse_fields(fields, EmployeeResponse.model_fields)
+    
+    not_modified, versions = await check_not_modified(request, response, db, "employees")
+    if not_modified:
+        return not_modified
+    
+    async def load():
+        stmt = select(Employee)
+        if selected:
+            stmt = stmt.options(load_only_fields(Employee, selected))
+        employees = await paginate(
+            db, stmt, response, [Employee.id],
+            skip=skip, limit=limit, cursor=cursor,
+            count_key="employees" if with_total else None
+        )
+        if selected:
+            return [pick_fields(e, selected) for e in employees]
+        return [convert_employee_response(e) for e in employees]
+    
+    cache_key = ("employees", "list", skip, limit, cursor, with_total, selected, versions)
     try:
-        employees = db.query(Employee).offset(skip).limit(limit).all()
-        return employees
+        return await cached_response(cache_key, response, load)
     except OperationalError as e:
         raise HTTPException(
             status_code=500, 
@@ -227,27 +463,57 @@ def get_employees(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)
             detail=f"Ошибка базы данных: {str(e)}"
         )
 
-@app.get("/employees/{employee_id}", response_model=EmployeeResponse)
-def get_employee(employee_id: int, db: Session = Depends(get_db)):
-    """Получить сотрудника по ID"""
-    employee = db.query(Employee).filter(Employee.id == employee_id).first()
+@router.get("/employees/{employee_id}", response_model=EmployeeResponse)
+async def get_employee(
+    employee_id: int,
+    request: Request,
+    response: Response,
+    include: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Получить сотрудника по ID
+
+    - include=products: добавить в ответ товары сотрудника (одним дополнительным запросом)
+    """
+    includes = parse_include(include, ["products"])
+    
+    not_modified, _ = await check_not_modified(
+        request, response, db, "employees", *(["products"] if includes else [])
+    )
+    if not_modified:
+        return not_modified
+    
+    stmt = select(Employee).where(Employee.id == employee_id)
+    if "products" in includes:
+        stmt = stmt.options(selectinload(Employee.products))
+    employee = await db.scalar(stmt)
     if not employee:
         raise HTTPException(status_code=404, detail="Сотрудник не найден")
-    return employee
+    
+    if not includes:
+        return employee
+    
+    payload = convert_employee_response(employee)
+    payload["products"] = [convert_product_response(p) for p in employee.products]
+    return json_response(dumps(payload), response)
 
-@app.post("/employees", response_model=EmployeeResponse)
-def create_employee(employee: EmployeeCreate, db: Session = Depends(get_db)):
+@router.post("/employees", response_model=EmployeeResponse)
+async def create_employee(employee: EmployeeCreate, db: AsyncSession = Depends(get_async_db)):
     """Создать нового сотрудника"""
     db_employee = Employee(**employee.dict())
     db.add(db_employee)
-    db.commit()
-    db.refresh(db_employee)
+    await db.run_sync(bump_version, "employees")
+    await db.commit()
+    cache.invalidate("employees")
+    snapshots.schedule("employees")
+    await db.refresh(db_employee)
     return db_employee
 
-@app.put("/employees/{employee_id}", response_model=EmployeeResponse)
-def update_employee(employee_id: int, employee: EmployeeUpdate, db: Session = Depends(get_db)):
+@router.put("/employees/{employee_id}", response_model=EmployeeResponse)
+async def update_employee(employee_id: int, employee: EmployeeUpdate, db: AsyncSession = Depends(get_async_db)):
     """Обновить данные сотрудника"""
-    db_employee = db.query(Employee).filter(Employee.id == employee_id).first()
+    db_employee = await db.get(Employee, employee_id)
     if not db_employee:
         raise HTTPException(status_code=404, detail="Сотрудник не найден")
     
@@ -255,29 +521,136 @@ def update_employee(employee_id: int, employee: EmployeeUpdate, db: Session = De
     for field, value in update_data.items():
         setattr(db_employee, field, value)
     
-    db.commit()
-    db.refresh(db_employee)
+    await db.run_sync(bump_version, "employees")
+    await db.commit()
+    cache.invalidate("employees", employee_id)
+    snapshots.schedule("employees")
+    await db.refresh(db_employee)
     return db_employee
 
-@app.delete("/employees/{employee_id}")
-def delete_employee(employee_id: int, db: Session = Depends(get_db)):
+@router.post("/employees/bulk", response_model=BulkResponse)
+async def bulk_employees(bulk: EmployeeBulkRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    Пакетно создать, изменить и удалить сотрудников
+
+    Все операции применяются в одной транзакции. Для каждого элемента
+    возвращается результат; несуществующие id получают статус not_found,
+    повторы id - duplicate.
+    """
+    return await run_bulk(db, Employee, "employees", bulk)
+
+@router.post("/employees/import", response_model=ImportReport)
+async def import_employees(format: str = "csv", file: UploadFile = File(...)):
+    """
+    Импортировать сотрудников из CSV или NDJSON файла
+
+    Строки проверяются по схеме EmployeeCreate и вставляются блоками.
+    Ошибочные строки пропускаются и перечисляются в отчете.
+    """
+    return await run_import("employees", file, format)
+
+@router.delete("/employees/{employee_id}")
+async def delete_employee(employee_id: int, db: AsyncSession = Depends(get_async_db)):
     """Удалить сотрудника"""
-    db_employee = db.query(Employee).filter(Employee.id == employee_id).first()
+    db_employee = await db.get(Employee, employee_id)
     if not db_employee:
         raise HTTPException(status_code=404, detail="Сотрудник не найден")
     
-    db.delete(db_employee)
-    db.commit()
+    await db.delete(db_employee)
+    await db.run_sync(bump_version, "employees")
+    await db.commit()
+    cache.invalidate("employees", employee_id)
+    snapshots.schedule("employees")
     return {"message": "Сотрудник удален"}
 
 # ========== PRODUCT ENDPOINTS ==========
 
-@app.get("/products", response_model=List[ProductResponse])
-def get_products(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """Получить список всех товаров"""
+@router.get("/products", response_model=List[ProductResponse])
+async def get_products(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    with_total: bool = False,
+    fields: Optional[str] = None,
+    include: Optional[str] = None,
+    product_type: Optional[str] = None,
+    seller_id: Optional[int] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    name_prefix: Optional[str] = None,
+    sort: str = "id",
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Получить список всех товаров
+
+    - cursor: курсор из заголовка X-Next-Cursor предыдущей страницы (вместо skip)
+    - with_total: вернуть приблизительное общее количество в X-Total-Count
+    - fields: вернуть только перечисленные через запятую поля (id возвращается всегда)
+    - include=seller: добавить в каждый товар продавца (одним дополнительным запросом)
+    - product_type, seller_id, min_price, max_price, name_prefix: фильтры
+    - sort: id, price, -price или created_at
+    """
+    if sort not in PRODUCT_SORTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Неверная сортировка. Допустимые значения: {', '.join(PRODUCT_SORTS)}"
+        )
+    key_columns, descending = PRODUCT_SORTS[sort]
+    selected = parse_fields(fields, ProductResponse.model_fields)
+    includes = parse_include(include, ["seller"])
+    
+    stmt = select(Product)
+    if selected:
+        stmt = stmt.options(load_only_fields(Product, selected, [*key_columns, Product.seller_id]))
+    if "seller" in includes:
+        stmt = stmt.options(selectinload(Product.seller))
+    if product_type is not None:
+        stmt = stmt.where(Product.product_type == product_type)
+    if seller_id is not None:
+        stmt = stmt.where(Product.seller_id == seller_id)
+    if min_price is not None:
+        stmt = stmt.where(Product.price >= min_price)
+    if max_price is not None:
+        stmt = stmt.where(Product.price <= max_price)
+    if name_prefix:
+        stmt = stmt.where(starts_with(Product.name, name_prefix))
+    
+    not_modified, versions = await check_not_modified(
+        request, response, db, "products", *(["employees"] if includes else [])
+    )
+    if not_modified:
+        return not_modified
+    
+    count_key = None
+    if with_total:
+        count_key = f"products:{product_type}:{seller_id}:{min_price}:{max_price}:{name_prefix}"
+    
+    async def load():
+        products = await paginate(
+            db, stmt, response, key_columns,
+            skip=skip, limit=limit, cursor=cursor,
+            sort=sort, descending=descending,
+            count_key=count_key
+        )
+        items = []
+        for p in products:
+            item = pick_fields(p, selected) if selected else convert_product_response(p)
+            if "seller" in includes:
+                item["seller"] = convert_employee_response(p.seller) if p.seller else None
+            items.append(item)
+        return items
+    
+    # includes идет сразу после "list": по этому префиксу списки сбрасываются
+    # при изменении встроенных сотрудников (cache.DEPENDENT_LISTS)
+    cache_key = (
+        "products", "list", includes, skip, limit, cursor, with_total,
+        product_type, seller_id, min_price, max_price, name_prefix, sort, selected, versions
+    )
     try:
-        products = db.query(Product).offset(skip).limit(limit).all()
-        return [convert_product_response(p) for p in products]
+        return await cached_response(cache_key, response, load)
     except OperationalError as e:
         raise HTTPException(
             status_code=500, 
@@ -289,80 +662,131 @@ def get_products(skip: int = 0, limit: int = 100, db: Session = Depends(get_db))
             detail=f"Ошибка базы данных: {str(e)}"
         )
 
-@app.get("/products/{product_id}", response_model=ProductResponse)
-def get_product(product_id: int, db: Session = Depends(get_db)):
-    """Получить товар по ID"""
-    product = db.query(Product).filter(Product.id == product_id).first()
-    if not product:
-        raise HTTPException(status_code=404, detail="Товар не найден")
-    return convert_product_response(product)
+@router.get("/products/export")
+async def export_products(format: str = "ndjson", gzip: bool = False):
+    """
+    Выгрузить весь каталог товаров потоком
 
-@app.post("/products", response_model=ProductResponse)
-def create_product(product: ProductCreate, db: Session = Depends(get_db)):
-    """Создать новый товар"""
-    product_data = product.dict()
+    - format: ndjson (объект на строку) или csv
+    - gzip: сжимать ответ (Content-Encoding: gzip)
+
+    Строки читаются одним запросом через серверный курсор и отдаются
+    по мере чтения, поэтому размер каталога не влияет на память.
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Неизвестный формат: {format}. Допустимые: {', '.join(EXPORT_FORMATS)}"
+        )
     
-    # Преобразуем списки в JSON
-    product_data['images'] = list_to_json(product_data.get('images'))
-    product_data['vitamins'] = list_to_json(product_data.get('vitamins'))
-    product_data['minerals'] = list_to_json(product_data.get('minerals'))
-    product_data['antioxidants'] = list_to_json(product_data.get('antioxidants'))
+    body = iter_products(format)
+    headers = {"Content-Disposition": f'attachment; filename="products.{format}"'}
+    if gzip:
+        body = gzip_stream(body)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(body, media_type=EXPORT_FORMATS[format], headers=headers)
+
+@router.get("/products/{product_id}", response_model=ProductResponse)
+async def get_product(product_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_read_db)):
+    """Получить товар по ID"""
+    not_modified, versions = await check_not_modified(request, response, db, "products")
+    if not_modified:
+        return not_modified
     
-    db_product = Product(**product_data)
-    db.add(db_product)
-    db.commit()
-    db.refresh(db_product)
+    async def load():
+        product = await db.get(Product, product_id)
+        if not product:
+            raise HTTPException(status_code=404, detail="Товар не найден")
+        return convert_product_response(product)
     
-    # Преобразуем JSON обратно в списки для ответа
+    return await cached_response(("products", "detail", product_id, versions), response, load)
+
+@router.post("/products", response_model=ProductResponse)
+async def create_product(product: ProductCreate, db: AsyncSession = Depends(get_async_db)):
+    """Создать новый товар"""
+    db_product = Product(**product.dict())
+    db.add(db_product)
+    await db.flush()
+    await db.run_sync(search.index_product, db_product)
+    await db.run_sync(stats.update, added=stats.keys_of("products", db_product))
+    await db.run_sync(bump_version, "products")
+    await db.commit()
+    cache.invalidate("products", db_product.id)
+    snapshots.schedule("products")
+    await db.refresh(db_product)
     return convert_product_response(db_product)
 
-@app.put("/products/{product_id}", response_model=ProductResponse)
-def update_product(product_id: int, product: ProductUpdate, db: Session = Depends(get_db)):
+@router.put("/products/{product_id}", response_model=ProductResponse)
+async def update_product(product_id: int, product: ProductUpdate, db: AsyncSession = Depends(get_async_db)):
     """Обновить данные товара"""
-    db_product = db.query(Product).filter(Product.id == product_id).first()
+    db_product = await db.get(Product, product_id)
     if not db_product:
         raise HTTPException(status_code=404, detail="Товар не найден")
     
+    old_stat_keys = stats.keys_of("products", db_product)
     update_data = product.dict(exclude_unset=True)
-    
-    # Преобразуем списки в JSON
-    if 'images' in update_data:
-        update_data['images'] = list_to_json(update_data['images'])
-    if 'vitamins' in update_data:
-        update_data['vitamins'] = list_to_json(update_data['vitamins'])
-    if 'minerals' in update_data:
-        update_data['minerals'] = list_to_json(update_data['minerals'])
-    if 'antioxidants' in update_data:
-        update_data['antioxidants'] = list_to_json(update_data['antioxidants'])
-    
     for field, value in update_data.items():
         setattr(db_product, field, value)
     
-    db.commit()
-    db.refresh(db_product)
+    await db.run_sync(search.index_product, db_product)
+    await db.run_sync(stats.update, removed=old_stat_keys, added=stats.keys_of("products", db_product))
+    await db.run_sync(bump_version, "products")
+    await db.commit()
+    cache.invalidate("products", db_product.id)
+    snapshots.schedule("products")
+    await db.refresh(db_product)
     return convert_product_response(db_product)
 
-@app.delete("/products/{product_id}")
-def delete_product(product_id: int, db: Session = Depends(get_db)):
+@router.post("/products/bulk", response_model=BulkResponse)
+async def bulk_products(bulk: ProductBulkRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    Пакетно создать, изменить и удалить товары
+
+    Все операции применяются в одной транзакции. Для каждого элемента
+    возвращается результат; несуществующие id получают статус not_found,
+    повторы id - duplicate.
+    """
+    return await run_bulk(db, Product, "products", bulk)
+
+@router.post("/products/import", response_model=ImportReport)
+async def import_products(format: str = "csv", file: UploadFile = File(...)):
+    """
+    Импортировать товары из CSV или NDJSON файла
+
+    Строки проверяются по схеме ProductCreate и вставляются блоками.
+    Списки в CSV - JSON массив или значения через "|".
+    Строки с несуществующим seller_id пропускаются.
+    """
+    return await run_import("products", file, format)
+
+@router.delete("/products/{product_id}")
+async def delete_product(product_id: int, db: AsyncSession = Depends(get_async_db)):
     """Удалить товар"""
-    db_product = db.query(Product).filter(Product.id == product_id).first()
+    db_product = await db.get(Product, product_id)
     if not db_product:
         raise HTTPException(status_code=404, detail="Товар не найден")
     
-    db.delete(db_product)
-    db.commit()
+    await db.delete(db_product)
+    await db.run_sync(search.remove_product, product_id)
+    await db.run_sync(stats.update, removed=stats.keys_of("products", db_product))
+    await db.run_sync(bump_version, "products")
+    await db.commit()
+    cache.invalidate("products", product_id)
+    snapshots.schedule("products")
     return {"message": "Товар удален"}
 
-@app.post("/products/{product_id}/upload-image")
-def upload_product_image(
+@router.post("/products/{product_id}/upload-image")
+async def upload_product_image(
     product_id: int,
     file: UploadFile = File(...),
-    db: Session = Depends(get_db)
+    read_db: AsyncSession = Depends(get_read_db),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Загрузить изображение для товара"""
-    product = db.query(Product).filter(Product.id == product_id).first()
-    if not product:
+    if not await read_db.get(Product, product_id):
         raise HTTPException(status_code=404, detail="Товар не найден")
+    # Соединение чтения тоже не держится, пока пишется файл
+    await read_db.close()
     
     if not file.content_type.startswith('image/'):
         raise HTTPException(status_code=400, detail="Файл должен быть изображением")
@@ -371,28 +795,38 @@ def upload_product_image(
     filename = f"product_{product_id}_{timestamp}_{file.filename}"
     file_path = os.path.join(UPLOAD_DIR, filename)
     
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    # Файл пишется до транзакции: пишущее соединение (в рабочем режиме SQLite
+    # единственное) не занято, пока идет запись на диск
+    await save_upload(file, file_path)
+    
+    product = await db.get(Product, product_id)
+    if not product:
+        # Товар удалили, пока сохранялся файл
+        os.remove(file_path)
+        raise HTTPException(status_code=404, detail="Товар не найден")
     
     # Добавляем изображение в список
     image_url = f"/uploads/{filename}"
-    current_images = json_to_list(product.images) or []
-    current_images.append(image_url)
-    product.images = list_to_json(current_images)
-    db.commit()
+    # Присваиваем новый список: изменения внутри JSON колонки не отслеживаются
+    product.images = (product.images or []) + [image_url]
+    await db.run_sync(bump_version, "products")
+    await db.commit()
+    cache.invalidate("products", product_id)
+    snapshots.schedule("products")
     
     return {"message": "Изображение загружено", "image_url": image_url}
 
-@app.post("/employees/{employee_id}/upload-photo")
-def upload_employee_photo(
+@router.post("/employees/{employee_id}/upload-photo")
+async def upload_employee_photo(
     employee_id: int,
     file: UploadFile = File(...),
-    db: Session = Depends(get_db)
+    read_db: AsyncSession = Depends(get_read_db),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Загрузить фотографию сотрудника"""
-    employee = db.query(Employee).filter(Employee.id == employee_id).first()
-    if not employee:
+    if not await read_db.get(Employee, employee_id):
         raise HTTPException(status_code=404, detail="Сотрудник не найден")
+    await read_db.close()
     
     if not file.content_type.startswith('image/'):
         raise HTTPException(status_code=400, detail="Файл должен быть изображением")
@@ -401,147 +835,321 @@ def upload_employee_photo(
     filename = f"employee_{employee_id}_{timestamp}_{file.filename}"
     file_path = os.path.join(UPLOAD_DIR, filename)
     
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    # Файл пишется до транзакции (см. upload_product_image)
+    await save_upload(file, file_path)
+    
+    employee = await db.get(Employee, employee_id)
+    if not employee:
+        os.remove(file_path)
+        raise HTTPException(status_code=404, detail="Сотрудник не найден")
     
     employee.photo_url = f"/uploads/{filename}"
-    db.commit()
+    await db.run_sync(bump_version, "employees")
+    await db.commit()
+    cache.invalidate("employees", employee_id)
+    snapshots.schedule("employees")
     
     return {"message": "Фотография загружена", "photo_url": employee.photo_url}
 
 # ========== VACANCY ENDPOINTS ==========
 
-@app.get("/vacancies", response_model=List[VacancyResponse])
-def get_vacancies(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """Получить список всех вакансий"""
-    vacancies = db.query(Vacancy).offset(skip).limit(limit).all()
-    return [convert_vacancy_response(v) for v in vacancies]
+@router.get("/vacancies", response_model=List[VacancyResponse])
+async def get_vacancies(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    with_total: bool = False,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Получить список всех вакансий
+
+    - cursor: курсор из заголовка X-Next-Cursor предыдущей страницы (вместо skip)
+    - with_total: вернуть приблизительное общее количество в X-Total-Count
+    - fields: вернуть только перечисленные через запятую поля (id возвращается всегда)
+    """
+    selected = parse_fields(fields, VacancyResponse.model_fields)
+    
+    not_modified, versions = await check_not_modified(request, response, db, "vacancies")
+    if not_modified:
+        return not_modified
+    
+    async def load():
+        stmt = select(Vacancy)
+        if selected:
+            stmt = stmt.options(load_only_fields(Vacancy, selected))
+        vacancies = await paginate(
+            db, stmt, response, [Vacancy.id],
+            skip=skip, limit=limit, cursor=cursor,
+            count_key="vacancies" if with_total else None
+        )
+        if selected:
+            return [pick_fields(v, selected) for v in vacancies]
+        return [convert_vacancy_response(v) for v in vacancies]
+    
+    cache_key = ("vacancies", "list", skip, limit, cursor, with_total, selected, versions)
+    return await cached_response(cache_key, response, load)
 
-@app.get("/vacancies/{vacancy_id}", response_model=VacancyResponse)
-def get_vacancy(vacancy_id: int, db: Session = Depends(get_db)):
+@router.get("/vacancies/{vacancy_id}", response_model=VacancyResponse)
+async def get_vacancy(vacancy_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_read_db)):
     """Получить вакансию по ID"""
-    vacancy = db.query(Vacancy).filter(Vacancy.id == vacancy_id).first()
+    not_modified, _ = await check_not_modified(request, response, db, "vacancies")
+    if not_modified:
+        return not_modified
+    
+    vacancy = await db.get(Vacancy, vacancy_id)
     if not vacancy:
         raise HTTPException(status_code=404, detail="Вакансия не найдена")
     return convert_vacancy_response(vacancy)
 
-@app.post("/vacancies", response_model=VacancyResponse)
-def create_vacancy(vacancy: VacancyCreate, db: Session = Depends(get_db)):
+@router.post("/vacancies", response_model=VacancyResponse)
+async def create_vacancy(vacancy: VacancyCreate, db: AsyncSession = Depends(get_async_db)):
     """Создать новую вакансию"""
-    vacancy_data = vacancy.dict()
-    vacancy_data['additional_conditions'] = list_to_json(vacancy_data.get('additional_conditions'))
-    
-    db_vacancy = Vacancy(**vacancy_data)
+    db_vacancy = Vacancy(**vacancy.dict())
     db.add(db_vacancy)
-    db.commit()
-    db.refresh(db_vacancy)
+    await db.flush()
+    await db.run_sync(search.index_vacancy, db_vacancy)
+    await db.run_sync(stats.update, added=stats.keys_of("vacancies", db_vacancy))
+    await db.run_sync(bump_version, "vacancies")
+    await db.commit()
+    cache.invalidate("vacancies")
+    snapshots.schedule("vacancies")
+    await db.refresh(db_vacancy)
     return convert_vacancy_response(db_vacancy)
 
-@app.put("/vacancies/{vacancy_id}", response_model=VacancyResponse)
-def update_vacancy(vacancy_id: int, vacancy: VacancyUpdate, db: Session = Depends(get_db)):
+@router.put("/vacancies/{vacancy_id}", response_model=VacancyResponse)
+async def update_vacancy(vacancy_id: int, vacancy: VacancyUpdate, db: AsyncSession = Depends(get_async_db)):
     """Обновить данные вакансии"""
-    db_vacancy = db.query(Vacancy).filter(Vacancy.id == vacancy_id).first()
+    db_vacancy = await db.get(Vacancy, vacancy_id)
     if not db_vacancy:
         raise HTTPException(status_code=404, detail="Вакансия не найдена")
     
+    old_stat_keys = stats.keys_of("vacancies", db_vacancy)
     update_data = vacancy.dict(exclude_unset=True)
-    if 'additional_conditions' in update_data:
-        update_data['additional_conditions'] = list_to_json(update_data['additional_conditions'])
-    
     for field, value in update_data.items():
         setattr(db_vacancy, field, value)
     
-    db.commit()
-    db.refresh(db_vacancy)
+    await db.run_sync(search.index_vacancy, db_vacancy)
+    await db.run_sync(stats.update, removed=old_stat_keys, added=stats.keys_of("vacancies", db_vacancy))
+    await db.run_sync(bump_version, "vacancies")
+    await db.commit()
+    cache.invalidate("vacancies")
+    snapshots.schedule("vacancies")
+    await db.refresh(db_vacancy)
     return convert_vacancy_response(db_vacancy)
 
-@app.delete("/vacancies/{vacancy_id}")
-def delete_vacancy(vacancy_id: int, db: Session = Depends(get_db)):
+@router.post("/vacancies/bulk", response_model=BulkResponse)
+async def bulk_vacancies(bulk: VacancyBulkRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    Пакетно создать, изменить и удалить вакансии
+
+    Все операции применяются в одной транзакции. Для каждого элемента
+    возвращается результат; несуществующие id получают статус not_found,
+    повторы id - duplicate.
+    """
+    return await run_bulk(db, Vacancy, "vacancies", bulk)
+
+@router.delete("/vacancies/{vacancy_id}")
+async def delete_vacancy(vacancy_id: int, db: AsyncSession = Depends(get_async_db)):
     """Удалить вакансию"""
-    db_vacancy = db.query(Vacancy).filter(Vacancy.id == vacancy_id).first()
+    db_vacancy = await db.get(Vacancy, vacancy_id)
     if not db_vacancy:
         raise HTTPException(status_code=404, detail="Вакансия не найдена")
     
-    db.delete(db_vacancy)
-    db.commit()
+    await db.delete(db_vacancy)
+    await db.run_sync(search.remove_vacancy, vacancy_id)
+    await db.run_sync(stats.update, removed=stats.keys_of("vacancies", db_vacancy))
+    await db.run_sync(bump_version, "vacancies")
+    await db.commit()
+    cache.invalidate("vacancies")
+    snapshots.schedule("vacancies")
     return {"message": "Вакансия удалена"}
 
+# ========== SEARCH ENDPOINTS ==========
+
+@router.get("/search", response_model=SearchResponse)
+async def search_catalog(q: str, limit: int = 20, db: AsyncSession = Depends(get_read_db)):
+    """
+    Полнотекстовый поиск по товарам и вакансиям
+
+    Учитывает словоформы русского языка, результаты отсортированы по релевантности
+    (совпадения в названии важнее совпадений в описании).
+    """
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Пустой поисковый запрос")
+    
+    products = await db.run_sync(search.search, "products", q, limit)
+    vacancies = await db.run_sync(search.search, "vacancies", q, limit)
+    return {
+        "products": [convert_product_response(p) for p in products],
+        "vacancies": [convert_vacancy_response(v) for v in vacancies]
+    }
+
+# ========== STATS ENDPOINTS ==========
+
+@router.get("/stats", response_model=CatalogStatsResponse)
+async def get_catalog_stats(request: Request, response: Response, db: AsyncSession = Depends(get_read_db)):
+    """
+    Статистика каталога для админ-панели
+
+    Товары по типам и продавцам, цены (min, max, оценки перцентилей)
+    и вакансии по городам. Читается из заранее подсчитанных счетчиков,
+    а не GROUP BY по таблицам.
+    """
+    not_modified, _ = await check_not_modified(request, response, db, "products", "vacancies", "employees")
+    if not_modified:
+        return not_modified
+    return json_response(dumps(await db.run_sync(stats.read_stats)), response)
+
 # ========== PROFILE ENDPOINTS ==========
 
-@app.get("/profiles", response_model=List[ProfileResponse])
-def get_profiles(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """Получить список всех профилей"""
-    profiles = db.query(Profile).offset(skip).limit(limit).all()
+@router.get("/profiles", response_model=List[ProfileResponse])
+async def get_profiles(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    with_total: bool = False,
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Получить список всех профилей
+
+    - cursor: курсор из заголовка X-Next-Cursor предыдущей страницы (вместо skip)
+    - with_total: вернуть приблизительное общее количество в X-Total-Count
+    """
+    profiles = await paginate(
+        db, select(Profile), response, [Profile.id],
+        skip=skip, limit=limit, cursor=cursor,
+        count_key="profiles" if with_total else None
+    )
     return profiles
 
-@app.get("/profiles/{profile_id}", response_model=ProfileResponse)
-def get_profile(profile_id: int, db: Session = Depends(get_db)):
+@router.get("/profiles/{profile_id}", response_model=ProfileResponse)
+async def get_profile(profile_id: int, db: AsyncSession = Depends(get_read_db)):
     """Получить профиль по ID"""
-    profile = db.query(Profile).filter(Profile.id == profile_id).first()
+    profile = await db.get(Profile, profile_id)
     if not profile:
         raise HTTPException(status_code=404, detail="Профиль не найден")
     return profile
 
-@app.post("/profiles", response_model=ProfileResponse)
-def create_profile(profile: ProfileCreate, db: Session = Depends(get_db)):
+@router.post("/profiles", response_model=ProfileResponse)
+async def create_profile(profile: ProfileCreate, db: AsyncSession = Depends(get_async_db)):
     """Создать новый профиль"""
+    profile_data = profile.dict()
+    password = profile_data.pop('password')
+    # bcrypt занимает CPU на десятки миллисекунд - не в event loop и до первого
+    # запроса к основной базе: иначе сессия держала бы единственного писателя SQLite
+    profile_data['password_hash'] = await run_in_threadpool(hash_password, password)
+    
     # Проверяем, что телефон уникален
-    existing = db.query(Profile).filter(Profile.phone == profile.phone).first()
+    existing = await db.scalar(select(Profile).where(Profile.phone == profile.phone))
     if existing:
         raise HTTPException(status_code=400, detail="Профиль с таким телефоном уже существует")
     
-    profile_data = profile.dict()
-    password = profile_data.pop('password')
-    profile_data['password_hash'] = hash_password(password)
-    
     db_profile = Profile(**profile_data)
     db.add(db_profile)
-    db.commit()
-    db.refresh(db_profile)
+    await db.commit()
+    await db.refresh(db_profile)
     return db_profile
 
-@app.put("/profiles/{profile_id}", response_model=ProfileResponse)
-def update_profile(profile_id: int, profile: ProfileUpdate, db: Session = Depends(get_db)):
+@router.put("/profiles/{profile_id}", response_model=ProfileResponse)
+async def update_profile(profile_id: int, profile: ProfileUpdate, db: AsyncSession = Depends(get_async_db)):
     """Обновить данные профиля"""
-    db_profile = db.query(Profile).filter(Profile.id == profile_id).first()
-    if not db_profile:
-        raise HTTPException(status_code=404, detail="Профиль не найден")
-    
     update_data = profile.dict(exclude_unset=True)
     
-    # Если обновляется пароль, хешируем его
+    # Если обновляется пароль, хешируем его до запросов к основной базе (см. create_profile)
     if 'password' in update_data:
         password = update_data.pop('password')
-        update_data['password_hash'] = hash_password(password)
+        update_data['password_hash'] = await run_in_threadpool(hash_password, password)
+    
+    db_profile = await db.get(Profile, profile_id)
+    if not db_profile:
+        raise HTTPException(status_code=404, detail="Профиль не найден")
     
     for field, value in update_data.items():
         setattr(db_profile, field, value)
     
-    db.commit()
-    db.refresh(db_profile)
+    await db.commit()
+    await db.refresh(db_profile)
     return db_profile
 
-@app.delete("/profiles/{profile_id}")
-def delete_profile(profile_id: int, db: Session = Depends(get_db)):
+@router.delete("/profiles/{profile_id}")
+async def delete_profile(profile_id: int, db: AsyncSession = Depends(get_async_db)):
     """Удалить профиль"""
-    db_profile = db.query(Profile).filter(Profile.id == profile_id).first()
+    db_profile = await db.get(Profile, profile_id)
     if not db_profile:
         raise HTTPException(status_code=404, detail="Профиль не найден")
     
-    db.delete(db_profile)
-    db.commit()
+    await db.delete(db_profile)
+    await db.commit()
     return {"message": "Профиль удален"}
 
+# ========== METRICS ==========
+
+@router.get("/metrics/cache")
+async def cache_metrics():
+    """
+    Счетчики кэша ответов каталога (попадания, промахи, вытеснения)
+
+    В users - кэш пользователей для авторизованных запросов, в counts -
+    количества строк для X-Total-Count, в revoked_tokens - отозванные токены
+    в памяти воркера.
+    """
+    return {
+        **response_cache.stats(),
+        "users": user_cache.stats(),
+        "counts": count_cache.stats(),
+        "revoked_tokens": revocation.status(),
+    }
+
+@router.get("/metrics/db")
+async def db_metrics():
+    """
+    Пулы соединений с базой этого воркера
+
+    Выданные / свободные / overflow соединения, события пула и время
+    ожидания соединения - по ним подбираются DB_POOL_SIZE и DB_MAX_OVERFLOW.
+    В replicas - доступность реплик для чтения.
+    """
+    return {
+        **{name: metrics.stats() for name, metrics in pool_metrics.items()},
+        "replicas": replicas.status(),
+    }
+
+@router.get("/metrics/queries")
+async def query_metrics():
+    """
+    Запросы к базе по маршрутам этого воркера
+
+    Для каждого endpoint'а: число HTTP запросов, сколько SQL запросов и
+    времени базы они потратили (всего, в среднем и максимум за запрос).
+    """
+    return query_stats.route_stats.stats()
+
+@router.get("/metrics/sms")
+async def sms_metrics():
+    """
+    Отправка SMS этого воркера: очередь (размер, отправленные, повторы, ошибки)
+    и провайдеры (состояние предохранителя, задержки p50 / p95, ошибки, переключения)
+    """
+    return {**sms_queue.dispatcher.stats(), **sms_service.stats()}
+
 # ========== HEALTH CHECK ==========
 
-@app.get("/")
-def root():
+@router.get("/")
+async def root():
     return {"message": "Forest Bar API работает!"}
 
-@app.get("/health")
-def health_check():
+@router.get("/health")
+async def health_check():
     return {"status": "healthy", "timestamp": datetime.now().isoformat()}
 
+app = create_app()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,73 @@
+"""
+Миграции схемы базы (Alembic)
+
+Схема меняется только миграциями из migrations/versions, приложение при
+старте таблицы не создает. Миграции применяются отдельным шагом перед
+запуском сервера (так делает Dockerfile):
+
+    python migrate.py                 # до последней версии
+    python migrate.py --sql           # SQL скрипт без подключения к базе
+    python migrate.py --revision 0001
+    python migrate.py --check         # код 1, если база не на последней версии
+
+Новая миграция после изменения models.py:
+
+    alembic revision --autogenerate -m "описание"
+"""
+import argparse
+import os
+import sys
+from typing import Optional
+
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+
+from database import engine
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini")
+
+
+def get_config(configure_logger: bool = True) -> Config:
+    config = Config(ALEMBIC_INI)
+    # Логирование настраивает приложение, если миграции вызваны из него
+    config.attributes["configure_logger"] = configure_logger
+    return config
+
+
+def upgrade(revision: str = "head", sql: bool = False, configure_logger: bool = True):
+    """Применяет миграции до revision"""
+    command.upgrade(get_config(configure_logger), revision, sql=sql)
+
+
+def current_revision() -> Optional[str]:
+    """Версия схемы, записанная в базе (None - миграции не применялись)"""
+    with engine.connect() as connection:
+        return MigrationContext.configure(connection).get_current_revision()
+
+
+def head_revision() -> str:
+    return ScriptDirectory.from_config(get_config()).get_current_head()
+
+
+def is_up_to_date() -> bool:
+    return current_revision() == head_revision()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Миграции схемы базы")
+    parser.add_argument("--revision", default="head", help="Целевая версия схемы")
+    parser.add_argument("--sql", action="store_true", help="Печатать SQL вместо выполнения")
+    parser.add_argument("--check", action="store_true", help="Только проверить, что база на последней версии")
+    args = parser.parse_args()
+
+    if args.check:
+        current, head = current_revision(), head_revision()
+        print(f"Версия базы: {current}, последняя: {head}")
+        sys.exit(0 if current == head else 1)
+    upgrade(args.revision, sql=args.sql)
+
+
+if __name__ == "__main__":
+    main()
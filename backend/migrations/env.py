@@ -0,0 +1,59 @@
+"""
+Окружение Alembic: база из DATABASE_URL, схема из models.Base.metadata
+"""
+from logging.config import fileConfig
+
+from alembic import context
+
+from database import engine
+from models import Base
+
+config = context.config
+
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = Base.metadata
+
+# Колонка и индексы полнотекстового поиска PostgreSQL (миграция 0005), которых нет в models.py
+SEARCH_OBJECTS = {"search_vector", "ix_products_search", "ix_vacancies_search"}
+
+
+def include_name(name, type_, parent_names):
+    # Поисковые объекты (миграция 0005: FTS5 таблицы SQLite, search_vector и GIN
+    # индексы PostgreSQL) не описаны в models.py, autogenerate их не трогает
+    if type_ == "table":
+        return name in target_metadata.tables
+    return name not in SEARCH_OBJECTS
+
+
+def run_migrations_offline():
+    """SQL скрипт миграций без подключения к базе (alembic upgrade --sql)"""
+    context.configure(
+        url=engine.url,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        include_name=include_name,
+        render_as_batch=engine.dialect.name == "sqlite",
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    with engine.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            include_name=include_name,
+            # SQLite не умеет большинство ALTER TABLE: изменения через копию таблицы
+            render_as_batch=connection.dialect.name == "sqlite",
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
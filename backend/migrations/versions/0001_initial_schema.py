@@ -0,0 +1,165 @@
+"""Начальная схема и индексы под частые запросы
+
+Создает таблицы, если их нет, поэтому применяется и к пустой базе, и к базе,
+созданной раньше через Base.metadata.create_all: в ней добавляются только
+недостающие индексы.
+
+Индексы под частые запросы:
+- ix_sms_codes_lookup (user_id, code, is_used, expires_at) - verify_sms_code
+- ix_products_seller_price (seller_id, price, id) - фильтр по продавцу и
+  внешний ключ products.seller_id
+- ix_products_type_price (product_type, price, id) - фильтр по типу с
+  сортировкой по цене
+- ix_vacancies_city (city) - группировка вакансий по городам
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 17:20:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+JSONType = sa.JSON(none_as_null=True).with_variant(postgresql.JSONB(none_as_null=True), "postgresql")
+
+# Таблица -> индексы (имя, колонки, параметры)
+INDEXES = {
+    "users": [
+        ("ix_users_id", ["id"], {}),
+        ("ix_users_phone", ["phone"], {"unique": True}),
+    ],
+    "sms_codes": [
+        ("ix_sms_codes_id", ["id"], {}),
+        ("ix_sms_codes_lookup", ["user_id", "code", "is_used", "expires_at"], {}),
+    ],
+    "employees": [
+        ("ix_employees_id", ["id"], {}),
+    ],
+    "vacancies": [
+        ("ix_vacancies_id", ["id"], {}),
+        ("ix_vacancies_city", ["city"], {}),
+    ],
+    "products": [
+        ("ix_products_id", ["id"], {}),
+        ("ix_products_type_price", ["product_type", "price", "id"], {}),
+        ("ix_products_seller_price", ["seller_id", "price", "id"], {}),
+        ("ix_products_price", ["price", "id"], {}),
+        ("ix_products_created_at", ["created_at", "id"], {}),
+        ("ix_products_name", ["name"], {"postgresql_ops": {"name": "text_pattern_ops"}}),
+    ],
+    "profiles": [
+        ("ix_profiles_id", ["id"], {}),
+        ("ix_profiles_phone", ["phone"], {"unique": True}),
+    ],
+}
+
+
+def _timestamps():
+    return [sa.Column("created_at", sa.DateTime()), sa.Column("updated_at", sa.DateTime())]
+
+
+def _tables():
+    return {
+        "users": [
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("phone", sa.String(20), nullable=False, comment="Номер телефона"),
+            sa.Column("is_active", sa.Boolean(), comment="Активен ли пользователь"),
+            *_timestamps(),
+        ],
+        "sms_codes": [
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("code", sa.String(6), nullable=False, comment="6-значный код"),
+            sa.Column("is_used", sa.Boolean(), comment="Использован ли код"),
+            sa.Column("expires_at", sa.DateTime(), nullable=False, comment="Время истечения кода"),
+            sa.Column("created_at", sa.DateTime()),
+        ],
+        "employees": [
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("first_name", sa.String(100), nullable=False, comment="Имя"),
+            sa.Column("last_name", sa.String(100), nullable=False, comment="Фамилия"),
+            sa.Column("middle_name", sa.String(100), comment="Отчество"),
+            sa.Column("city", sa.String(100), nullable=False, comment="Город"),
+            sa.Column("region", sa.String(100), nullable=False, comment="Область"),
+            sa.Column("email", sa.String(255), comment="Электронная почта"),
+            sa.Column("phone", sa.String(20), nullable=False, comment="Номер телефона"),
+            sa.Column("referral_link", sa.String(500), comment="Реферальная ссылка"),
+            sa.Column("address", sa.String(255), nullable=False, comment="Адрес"),
+            sa.Column("work_hours", sa.String(100), nullable=False, comment="Часы работы"),
+            sa.Column("photo_url", sa.String(500), comment="URL фотографии"),
+            *_timestamps(),
+        ],
+        "vacancies": [
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("title", sa.String(255), nullable=False, comment="Название вакансии"),
+            sa.Column("city", sa.String(100), nullable=False, comment="Город"),
+            sa.Column("schedule", sa.String(100), nullable=False, comment="График работы"),
+            sa.Column("salary", sa.String(100), nullable=False, comment="Зарплата"),
+            sa.Column("additional_conditions", JSONType, comment="Дополнительные условия (JSON список)"),
+            sa.Column("long_description", sa.Text(), nullable=False, comment="Длинное описание"),
+            *_timestamps(),
+        ],
+        "products": [
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("name", sa.String(255), nullable=False, comment="Название товара"),
+            sa.Column("images", JSONType, comment="Список изображений (JSON)"),
+            sa.Column("price", sa.Float(), nullable=False, comment="Цена"),
+            sa.Column("product_type", sa.String(100), nullable=False, comment="Тип (мёд, чай, ягода, ягодный сбор и тд)"),
+            sa.Column("long_description", sa.Text(), nullable=False, comment="Длинное описание"),
+            sa.Column("seller_id", sa.Integer(), sa.ForeignKey("employees.id"), nullable=False, comment="ID продавца"),
+            sa.Column("vitamins", JSONType, comment="Витамины (JSON)"),
+            sa.Column("minerals", JSONType, comment="Минералы (JSON)"),
+            sa.Column("antioxidants", JSONType, comment="Антиоксиданты (JSON)"),
+            sa.Column("energy_value", sa.String(100), comment="Энергетическая ценность"),
+            sa.Column("shelf_life", sa.String(100), comment="Срок годности"),
+            *_timestamps(),
+        ],
+        "profiles": [
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("phone", sa.String(20), nullable=False, comment="Номер телефона"),
+            sa.Column("password_hash", sa.String(255), nullable=False, comment="Зашифрованный пароль"),
+            sa.Column("city", sa.String(100), comment="Город"),
+            sa.Column("purchase_count", sa.Integer(), comment="Количество покупок"),
+            *_timestamps(),
+        ],
+        "table_versions": [
+            sa.Column("table_name", sa.String(50), primary_key=True, comment="Имя таблицы"),
+            sa.Column("version", sa.Integer(), nullable=False, comment="Счетчик изменений"),
+            sa.Column("updated_at", sa.DateTime(), nullable=False, comment="Время последнего изменения"),
+        ],
+        "catalog_stats": [
+            sa.Column("metric", sa.String(50), primary_key=True, comment="Метрика: products_by_type, price_bucket, ..."),
+            sa.Column("key", sa.String(255), primary_key=True, comment="Значение группы"),
+            sa.Column("count", sa.Integer(), nullable=False, comment="Количество строк в группе"),
+        ],
+    }
+
+
+def upgrade() -> None:
+    """Создает недостающие таблицы и индексы"""
+    inspector = sa.inspect(op.get_bind())
+    existing_tables = set(inspector.get_table_names())
+    for table, columns in _tables().items():
+        if table not in existing_tables:
+            op.create_table(table, *columns)
+    for table, indexes in INDEXES.items():
+        existing = {index["name"] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+        for name, columns, options in indexes:
+            if name not in existing:
+                op.create_index(name, table, columns, **options)
+
+
+def downgrade() -> None:
+    """Удаляет схему целиком"""
+    for table in reversed(list(_tables())):
+        op.drop_table(table)
@@ -0,0 +1,38 @@
+"""Таблица отозванных JWT токенов
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 17:25:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, Sequence[str], None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Создает revoked_tokens"""
+    op.create_table(
+        "revoked_tokens",
+        sa.Column("jti", sa.String(64), primary_key=True, comment="Идентификатор токена (claim jti)"),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False, comment="Владелец токена"),
+        sa.Column("expires_at", sa.DateTime(), nullable=False, comment="Время истечения токена (claim exp)"),
+        sa.Column("revoked_at", sa.DateTime(), nullable=False, comment="Время отзыва"),
+    )
+    op.create_index("ix_revoked_tokens_revoked_at", "revoked_tokens", ["revoked_at"])
+    op.create_index("ix_revoked_tokens_expires_at", "revoked_tokens", ["expires_at"])
+
+
+def downgrade() -> None:
+    """Удаляет revoked_tokens"""
+    op.drop_index("ix_revoked_tokens_expires_at", table_name="revoked_tokens")
+    op.drop_index("ix_revoked_tokens_revoked_at", table_name="revoked_tokens")
+    op.drop_table("revoked_tokens")
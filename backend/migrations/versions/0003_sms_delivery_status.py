@@ -0,0 +1,46 @@
+"""Статус доставки SMS кодов
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 17:40:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, Sequence[str], None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Добавляет колонки доставки в sms_codes; старые коды считаются отправленными"""
+    with op.batch_alter_table("sms_codes") as batch_op:
+        batch_op.add_column(sa.Column(
+            "delivery_status", sa.String(20), nullable=False, server_default="sent",
+            comment="queued / sending / sent / failed",
+        ))
+        batch_op.add_column(sa.Column(
+            "attempts", sa.Integer(), nullable=False, server_default="0", comment="Попыток отправки"
+        ))
+        batch_op.add_column(sa.Column("sent_at", sa.DateTime(), nullable=True, comment="Время успешной отправки"))
+        batch_op.add_column(sa.Column("last_error", sa.String(255), nullable=True, comment="Ошибка последней попытки"))
+    with op.batch_alter_table("sms_codes") as batch_op:
+        batch_op.alter_column("delivery_status", server_default=None)
+        batch_op.alter_column("attempts", server_default=None)
+        batch_op.create_index("ix_sms_codes_delivery", ["delivery_status", "expires_at"])
+
+
+def downgrade() -> None:
+    """Удаляет колонки доставки"""
+    with op.batch_alter_table("sms_codes") as batch_op:
+        batch_op.drop_index("ix_sms_codes_delivery")
+        batch_op.drop_column("last_error")
+        batch_op.drop_column("sent_at")
+        batch_op.drop_column("attempts")
+        batch_op.drop_column("delivery_status")
@@ -0,0 +1,36 @@
+"""Индексы каталога под фильтр продавца / типа с сортировкой по id и created_at
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 17:45:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, Sequence[str], None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = {
+    "ix_products_type_id": ["product_type", "id"],
+    "ix_products_type_created_at": ["product_type", "created_at", "id"],
+    "ix_products_seller_id": ["seller_id", "id"],
+    "ix_products_seller_created_at": ["seller_id", "created_at", "id"],
+}
+
+
+def upgrade() -> None:
+    """Создает индексы (filter, sort, id): без них сортировка шла через временное дерево"""
+    for name, columns in INDEXES.items():
+        op.create_index(name, "products", columns)
+
+
+def downgrade() -> None:
+    """Удаляет индексы"""
+    for name in INDEXES:
+        op.drop_index(name, table_name="products")
@@ -0,0 +1,53 @@
+"""Поисковые индексы: FTS5 таблицы (SQLite), search_vector + GIN индекс (PostgreSQL)
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 18:10:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, Sequence[str], None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Таблица -> (заголовок, описание), как search.SEARCH_FIELDS на момент миграции.
+# IF NOT EXISTS: в базах, где индексы уже создал search.init_search при запуске,
+# миграция ничего не меняет
+SEARCH_FIELDS = {
+    "products": ("name", "long_description"),
+    "vacancies": ("title", "long_description"),
+}
+
+
+def upgrade() -> None:
+    """Создает поисковые индексы; FTS5 таблицы заполняет search.init_search при запуске"""
+    dialect = op.get_context().dialect.name
+    for table, (title, description) in SEARCH_FIELDS.items():
+        if dialect == "sqlite":
+            op.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts USING fts5({title}, {description})")
+        elif dialect == "postgresql":
+            op.execute(
+                f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+                f"GENERATED ALWAYS AS ("
+                f"setweight(to_tsvector('russian', coalesce({title}, '')), 'A') || "
+                f"setweight(to_tsvector('russian', coalesce({description}, '')), 'B')"
+                f") STORED"
+            )
+            op.execute(f"CREATE INDEX IF NOT EXISTS ix_{table}_search ON {table} USING GIN (search_vector)")
+
+
+def downgrade() -> None:
+    """Удаляет поисковые индексы"""
+    dialect = op.get_context().dialect.name
+    for table in SEARCH_FIELDS:
+        if dialect == "sqlite":
+            op.execute(f"DROP TABLE IF EXISTS {table}_fts")
+        elif dialect == "postgresql":
+            op.execute(f"DROP INDEX IF EXISTS ix_{table}_search")
+            op.execute(f"ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector")
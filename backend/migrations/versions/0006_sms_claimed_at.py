@@ -0,0 +1,32 @@
+"""Время захвата SMS кода воркером отправки
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 18:30:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, Sequence[str], None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Добавляет sms_codes.claimed_at: по нему находятся коды, зависшие в статусе sending"""
+    with op.batch_alter_table("sms_codes") as batch_op:
+        batch_op.add_column(sa.Column(
+            "claimed_at", sa.DateTime(), nullable=True, comment="Начало последней попытки отправки"
+        ))
+
+
+def downgrade() -> None:
+    """Удаляет claimed_at"""
+    with op.batch_alter_table("sms_codes") as batch_op:
+        batch_op.drop_column("claimed_at")
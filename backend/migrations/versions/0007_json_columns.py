@@ -0,0 +1,80 @@
+"""JSON колонки товаров и вакансий: Text с JSON строкой -> JSON / JSONB
+
+Колонки products.images, vitamins, minerals, antioxidants и
+vacancies.additional_conditions в базах, созданных раньше через create_all,
+хранились как Text (миграция 0001 такие таблицы не меняет).
+
+PostgreSQL: тип меняется на JSONB (ALTER COLUMN ... USING ::jsonb), пустые
+строки становятся NULL.
+SQLite: пустые строки и невалидный JSON заменяются на NULL, тип колонки
+меняется на JSON через копию таблицы (значения и так хранятся текстом).
+Колонки, у которых тип уже JSON (база создана миграцией 0001), не трогаются.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 19:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0007"
+down_revision: Union[str, Sequence[str], None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+JSON_COLUMNS = {
+    "products": ["images", "vitamins", "minerals", "antioxidants"],
+    "vacancies": ["additional_conditions"],
+}
+
+
+def _text_columns(table: str, columns) -> list:
+    """Колонки таблицы, которые еще не JSON (в --sql режиме база недоступна: все)"""
+    if op.get_context().as_sql:
+        return list(columns)
+    types = {column["name"]: column["type"] for column in sa.inspect(op.get_bind()).get_columns(table)}
+    return [name for name in columns if not isinstance(types[name], (sa.JSON, postgresql.JSONB))]
+
+
+def upgrade() -> None:
+    """Переводит JSON колонки на нативный тип, невалидные значения - в NULL"""
+    dialect = op.get_context().dialect.name
+    for table, columns in JSON_COLUMNS.items():
+        columns = _text_columns(table, columns)
+        if not columns:
+            continue
+        if dialect == "postgresql":
+            for column in columns:
+                op.execute(
+                    f"ALTER TABLE {table} ALTER COLUMN {column} TYPE jsonb "
+                    f"USING NULLIF({column}, '')::jsonb"
+                )
+            continue
+        for column in columns:
+            op.execute(f"UPDATE {table} SET {column} = NULL WHERE {column} = '' OR json_valid({column}) = 0")
+        with op.batch_alter_table(table) as batch_op:
+            for column in columns:
+                batch_op.alter_column(
+                    column, type_=sa.JSON(none_as_null=True), existing_type=sa.Text(), existing_nullable=True
+                )
+
+
+def downgrade() -> None:
+    """Возвращает колонкам тип Text (значения остаются JSON строками)"""
+    dialect = op.get_context().dialect.name
+    for table, columns in JSON_COLUMNS.items():
+        if dialect == "postgresql":
+            for column in columns:
+                op.execute(f"ALTER TABLE {table} ALTER COLUMN {column} TYPE text USING {column}::text")
+            continue
+        with op.batch_alter_table(table) as batch_op:
+            for column in columns:
+                batch_op.alter_column(
+                    column, type_=sa.Text(), existing_type=sa.JSON(none_as_null=True), existing_nullable=True
+                )
@@ -1,10 +1,14 @@
-from sqlalchemy import Column, Integer, String, Text, Float, ForeignKey, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, Text, Float, ForeignKey, DateTime, Boolean, Index, JSON
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
 Base = declarative_base()
 
+# JSON колонка: JSONB в PostgreSQL, JSON (текст) в SQLite. None хранится как SQL NULL
+JSONType = JSON(none_as_null=True).with_variant(JSONB(none_as_null=True), "postgresql")
+
 class User(Base):
     """Модель пользователя для авторизации"""
     __tablename__ = "users"
@@ -29,8 +33,22 @@ class SMSCode(Base):
     expires_at = Column(DateTime, nullable=False, comment="Время истечения кода")
     created_at = Column(DateTime, default=datetime.utcnow)
     
+    # Доставка (фоновая отправка, sms_queue.py)
+    delivery_status = Column(String(20), nullable=False, default="queued", comment="queued / sending / sent / failed")
+    attempts = Column(Integer, nullable=False, default=0, comment="Попыток отправки")
+    claimed_at = Column(DateTime, nullable=True, comment="Начало последней попытки отправки")
+    sent_at = Column(DateTime, nullable=True, comment="Время успешной отправки")
+    last_error = Column(String(255), nullable=True, comment="Ошибка последней попытки")
+    
     # Связь с пользователем
     user = relationship("User", back_populates="sms_codes")
+    
+    # Поиск кода в verify_sms_code: все условия запроса в одном индексе.
+    # ix_sms_codes_delivery - неотправленные коды при запуске воркера
+    __table_args__ = (
+        Index("ix_sms_codes_lookup", "user_id", "code", "is_used", "expires_at"),
+        Index("ix_sms_codes_delivery", "delivery_status", "expires_at"),
+    )
 
 class Employee(Base):
     """Модель сотрудника"""
@@ -63,10 +81,15 @@ class Vacancy(Base):
     city = Column(String(100), nullable=False, comment="Город")
     schedule = Column(String(100), nullable=False, comment="График работы")
     salary = Column(String(100), nullable=False, comment="Зарплата")
-    additional_conditions = Column(Text, nullable=True, comment="Дополнительные условия (JSON список)")
+    additional_conditions = Column(JSONType, nullable=True, comment="Дополнительные условия (JSON список)")
     long_description = Column(Text, nullable=False, comment="Длинное описание")
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Группировка вакансий по городам (статистика каталога)
+    __table_args__ = (
+        Index("ix_vacancies_city", "city"),
+    )
 
 
 class Product(Base):
@@ -75,16 +98,16 @@ class Product(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(255), nullable=False, comment="Название товара")
-    images = Column(Text, nullable=True, comment="Список изображений (JSON)")
+    images = Column(JSONType, nullable=True, comment="Список изображений (JSON)")
     price = Column(Float, nullable=False, comment="Цена")
     product_type = Column(String(100), nullable=False, comment="Тип (мёд, чай, ягода, ягодный сбор и тд)")
     long_description = Column(Text, nullable=False, comment="Длинное описание")
     seller_id = Column(Integer, ForeignKey("employees.id"), nullable=False, comment="ID продавца")
     
     # Пищевая ценность
-    vitamins = Column(Text, nullable=True, comment="Витамины (JSON)")
-    minerals = Column(Text, nullable=True, comment="Минералы (JSON)")
-    antioxidants = Column(Text, nullable=True, comment="Антиоксиданты (JSON)")
+    vitamins = Column(JSONType, nullable=True, comment="Витамины (JSON)")
+    minerals = Column(JSONType, nullable=True, comment="Минералы (JSON)")
+    antioxidants = Column(JSONType, nullable=True, comment="Антиоксиданты (JSON)")
     energy_value = Column(String(100), nullable=True, comment="Энергетическая ценность")
     shelf_life = Column(String(100), nullable=True, comment="Срок годности")
     
@@ -93,6 +116,20 @@ class Product(Base):
     
     # Связь с сотрудником
     seller = relationship("Employee", back_populates="products")
+    
+    # Индексы под фильтры и сортировки каталога (GET /products).
+    # id в конце ключа нужен для keyset пагинации по (колонка сортировки, id)
+    __table_args__ = (
+        Index("ix_products_type_price", "product_type", "price", "id"),
+        Index("ix_products_type_id", "product_type", "id"),
+        Index("ix_products_type_created_at", "product_type", "created_at", "id"),
+        Index("ix_products_seller_price", "seller_id", "price", "id"),
+        Index("ix_products_seller_id", "seller_id", "id"),
+        Index("ix_products_seller_created_at", "seller_id", "created_at", "id"),
+        Index("ix_products_price", "price", "id"),
+        Index("ix_products_created_at", "created_at", "id"),
+        Index("ix_products_name", "name", postgresql_ops={"name": "text_pattern_ops"}),
+    )
 
 
 class Profile(Base):
@@ -105,4 +142,38 @@ class Profile(Base):
     city = Column(String(100), nullable=True, comment="Город")
     purchase_count = Column(Integer, default=0, comment="Количество покупок")
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
\ No newline at end of file
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class TableVersion(Base):
+    """Версия таблицы каталога для ETag / Last-Modified (меняется при каждой записи)"""
+    __tablename__ = "table_versions"
+    
+    table_name = Column(String(50), primary_key=True, comment="Имя таблицы")
+    version = Column(Integer, nullable=False, default=0, comment="Счетчик изменений")
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, comment="Время последнего изменения")
+
+
+class CatalogStat(Base):
+    """Счетчик группы для статистики каталога (обновляется вместе с товарами и вакансиями)"""
+    __tablename__ = "catalog_stats"
+    
+    metric = Column(String(50), primary_key=True, comment="Метрика: products_by_type, price_bucket, ...")
+    key = Column(String(255), primary_key=True, comment="Значение группы")
+    count = Column(Integer, nullable=False, default=0, comment="Количество строк в группе")
+
+
+class RevokedToken(Base):
+    """Отозванный JWT токен (выход из системы); строка удаляется после истечения токена"""
+    __tablename__ = "revoked_tokens"
+    
+    jti = Column(String(64), primary_key=True, comment="Идентификатор токена (claim jti)")
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, comment="Владелец токена")
+    expires_at = Column(DateTime, nullable=False, comment="Время истечения токена (claim exp)")
+    revoked_at = Column(DateTime, nullable=False, default=datetime.utcnow, comment="Время отзыва")
+    
+    # revoked_at - для догрузки новых отзывов воркерами, expires_at - для очистки
+    __table_args__ = (
+        Index("ix_revoked_tokens_revoked_at", "revoked_at"),
+        Index("ix_revoked_tokens_expires_at", "expires_at"),
+    )
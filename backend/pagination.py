@@ -0,0 +1,132 @@
+"""
+Keyset (cursor) пагинация для списковых endpoints
+"""
+import base64
+import json
+import os
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import HTTPException, Response
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ttl_cache import TTLCache
+
+# Заголовки, через которые клиент получает курсор и общее количество
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+TOTAL_COUNT_HEADER = "X-Total-Count"
+
+# Сколько секунд живет закэшированное приблизительное количество строк
+COUNT_CACHE_TTL = 30
+
+# Ключ включает фильтры из запроса (name_prefix и т.д.), поэтому размер ограничен:
+# клиент, перебирающий значения фильтров, вытесняет старые записи, а не копит их
+count_cache = TTLCache(maxsize=int(os.getenv("COUNT_CACHE_SIZE", "1024")), ttl=COUNT_CACHE_TTL)
+
+
+def encode_cursor(values: list, sort: str = "id") -> str:
+    """Кодирует значения ключа последней строки в непрозрачный курсор"""
+    payload = {
+        "s": sort,
+        "k": [v.isoformat() if isinstance(v, datetime) else v for v in values],
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, key_columns: list, sort: str = "id") -> list:
+    """
+    Декодирует курсор обратно в значения ключа
+
+    Raises:
+        HTTPException: Если курсор поврежден или выдан для другой сортировки
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values = payload["k"]
+        if payload["s"] != sort or len(values) != len(key_columns):
+            raise ValueError("cursor mismatch")
+        return [
+            datetime.fromisoformat(v) if column.type.python_type is datetime else v
+            for column, v in zip(key_columns, values)
+        ]
+    except (ValueError, KeyError, TypeError, NotImplementedError):
+        raise HTTPException(status_code=400, detail="Неверный курсор пагинации")
+
+
+async def get_cached_count(db: AsyncSession, stmt, count_key: str) -> int:
+    """
+    Возвращает количество строк запроса, закэшированное на COUNT_CACHE_TTL секунд
+
+    Значение приблизительное: вставки за время жизни кэша в нем не учитываются.
+    """
+    total = count_cache.get(count_key)
+    if total is not None:
+        return total
+
+    total = await db.scalar(select(func.count()).select_from(stmt.order_by(None).subquery()))
+    count_cache.set(count_key, total)
+    return total
+
+
+async def paginate(
+    db: AsyncSession,
+    stmt,
+    response: Response,
+    key_columns: list,
+    *,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    sort: str = "id",
+    descending: bool = False,
+    count_key: Optional[str] = None,
+) -> List:
+    """
+    Возвращает страницу результатов запроса
+
+    Если передан cursor, страница выбирается по ключу (key_columns) через
+    индекс, и глубина страницы не влияет на стоимость запроса. Без курсора
+    используется обычный offset (skip). В обоих режимах, если страница
+    заполнена, в заголовок X-Next-Cursor кладется курсор следующей страницы.
+
+    Args:
+        db: Асинхронная сессия базы данных
+        stmt: Запрос select() по модели
+        response: Ответ FastAPI для установки заголовков
+        key_columns: Колонки ключа сортировки, последней должна быть id
+        skip: Смещение (только без курсора)
+        limit: Размер страницы
+        cursor: Курсор из X-Next-Cursor предыдущей страницы
+        sort: Имя сортировки, зашивается в курсор
+        descending: Сортировка по убыванию
+        count_key: Если указан, в X-Total-Count отдается закэшированное количество
+
+    Returns:
+        Список строк страницы
+    """
+    if count_key is not None:
+        response.headers[TOTAL_COUNT_HEADER] = str(await get_cached_count(db, stmt, count_key))
+
+    key = tuple_(*key_columns) if len(key_columns) > 1 else key_columns[0]
+    order = [c.desc() if descending else c.asc() for c in key_columns]
+    stmt = stmt.order_by(*order)
+
+    if cursor:
+        values = decode_cursor(cursor, key_columns, sort)
+        bound = tuple_(*values) if len(values) > 1 else values[0]
+        stmt = stmt.where(key < bound if descending else key > bound)
+    elif skip:
+        stmt = stmt.offset(skip)
+
+    rows = (await db.execute(stmt.limit(limit))).scalars().all()
+
+    if rows and len(rows) == limit:
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(
+            [getattr(last, c.key) for c in key_columns], sort
+        )
+
+    return rows
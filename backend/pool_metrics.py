@@ -0,0 +1,137 @@
+"""
+Метрики пулов соединений с базой (GET /metrics/db)
+
+Для каждого движка (синхронного и асинхронного) считаются:
+- текущее состояние пула: выданные, свободные и overflow соединения;
+- события пула SQLAlchemy: новые соединения, выдачи, возвраты,
+  инвалидации и пиковое число одновременно выданных соединений;
+- время ожидания соединения: от запроса к пулу до получения соединения
+  (очередь, открытие нового соединения, pre-ping) и таймауты пула.
+
+По пиковому числу выданных соединений и ожиданию подбирается DB_POOL_SIZE и
+DB_MAX_OVERFLOW на один воркер. Счетчики свои у каждого процесса.
+"""
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+# Сколько последних ожиданий хранится для перцентилей
+WAIT_SAMPLES = 1000
+
+
+class PoolMetrics:
+    """Счетчики одного пула соединений"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.pool = None
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.checked_out_peak = 0
+        self._checked_out = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self._waits = deque(maxlen=WAIT_SAMPLES)
+
+    def on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.connects += 1
+
+    def on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self._lock:
+            self.checkouts += 1
+            self._checked_out += 1
+            self.checked_out_peak = max(self.checked_out_peak, self._checked_out)
+
+    def on_checkin(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.checkins += 1
+            self._checked_out = max(0, self._checked_out - 1)
+
+    def on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.invalidations += 1
+
+    def observe_wait(self, seconds: float, timed_out: bool = False):
+        """Время получения соединения из пула"""
+        with self._lock:
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            self._waits.append(seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def stats(self) -> dict:
+        """Состояние пула и счетчики"""
+        pool = self.pool
+        state = {"pool_class": type(pool).__name__ if pool is not None else None}
+        # QueuePool и AsyncAdaptedQueuePool; у пулов SQLite в памяти этих методов нет
+        if hasattr(pool, "checkedout"):
+            state.update({
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "idle": pool.checkedin(),
+                "overflow": max(0, pool.overflow()),
+                "max_overflow": pool._max_overflow,
+                "timeout_seconds": pool.timeout(),
+            })
+        with self._lock:
+            waits = sorted(self._waits)
+            requests = len(waits)
+            state.update({
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "invalidations": self.invalidations,
+                "timeouts": self.timeouts,
+                "checked_out_peak": self.checked_out_peak,
+                "wait_ms": {
+                    "total": round(self.wait_total * 1000, 3),
+                    "max": round(self.wait_max * 1000, 3),
+                    **{
+                        f"p{p}": round(waits[min(requests - 1, requests * p // 100)] * 1000, 3) if waits else None
+                        for p in (50, 95, 99)
+                    },
+                },
+            })
+        return state
+
+
+def timed_pool_class(base, metrics: PoolMetrics):
+    """
+    Подкласс пула, измеряющий ожидание соединения
+
+    У пула SQLAlchemy нет события "до выдачи соединения", поэтому время
+    connect() измеряется в подклассе. Класс создается на каждый движок:
+    пул, пересозданный после dispose() или разрыва соединений, сохраняет
+    свой класс и продолжает писать в те же метрики.
+    """
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = base.connect(self)
+        except PoolTimeoutError:
+            metrics.observe_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        metrics.observe_wait(time.perf_counter() - started)
+        metrics.pool = self
+        return connection
+
+    return type(f"Timed{base.__name__}", (base,), {"connect": connect})
+
+
+def instrument(engine, metrics: PoolMetrics):
+    """Подписывает метрики на события пула движка (sync_engine для асинхронного)"""
+    metrics.pool = engine.pool
+    event.listen(engine, "connect", metrics.on_connect)
+    event.listen(engine, "checkout", metrics.on_checkout)
+    event.listen(engine, "checkin", metrics.on_checkin)
+    event.listen(engine, "invalidate", metrics.on_invalidate)
@@ -0,0 +1,194 @@
+"""
+Планы запросов list / detail endpoint'ов до и после индексов частых запросов
+
+Для каждого запроса печатает EXPLAIN (EXPLAIN QUERY PLAN в SQLite) на
+текущей базе ("после") и на той же базе без индексов частых запросов из
+миграций 0001 и 0004 ("до"): индексы удаляются внутри транзакции, которая
+затем откатывается, поэтому база не меняется. Запросы строятся так же, как в endpoint'ах
+(сортировка и limit из pagination.paginate).
+
+Запуск (база должна быть на последней версии: python migrate.py):
+    python query_plans.py
+    python query_plans.py --output QUERY_PLANS.md
+"""
+import argparse
+from datetime import datetime
+
+from sqlalchemy import create_engine, event, func, select, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from database import DATABASE_URL
+from main import starts_with
+from models import Employee, Product, Profile, SMSCode, User, Vacancy
+
+# Индексы частых запросов из миграций 0001 и 0004 (для плана "до")
+HOT_INDEXES = [
+    "ix_sms_codes_lookup",
+    "ix_products_seller_price",
+    "ix_products_type_price",
+    "ix_vacancies_city",
+    "ix_products_type_id",
+    "ix_products_type_created_at",
+    "ix_products_seller_id",
+    "ix_products_seller_created_at",
+]
+
+PAGE = 100
+
+
+class Explain(Executable, ClauseElement):
+    """EXPLAIN для select() с параметрами, обработанными как в обычном запросе"""
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(Explain)
+def _compile_explain(element, compiler, **kw):
+    prefix = "EXPLAIN QUERY PLAN " if compiler.dialect.name == "sqlite" else "EXPLAIN "
+    return prefix + compiler.process(element.statement, **kw)
+
+
+def queries():
+    """Endpoint -> запрос, который он выполняет"""
+    now = datetime.utcnow()
+    return {
+        "GET /products": select(Product).order_by(Product.id).limit(PAGE),
+        "GET /products?product_type=мёд&sort=price": (
+            select(Product).where(Product.product_type == "мёд")
+            .order_by(Product.price, Product.id).limit(PAGE)
+        ),
+        "GET /products?seller_id=1&sort=price": (
+            select(Product).where(Product.seller_id == 1)
+            .order_by(Product.price, Product.id).limit(PAGE)
+        ),
+        "GET /products?seller_id=1": (
+            select(Product).where(Product.seller_id == 1).order_by(Product.id).limit(PAGE)
+        ),
+        "GET /products?product_type=мёд": (
+            select(Product).where(Product.product_type == "мёд").order_by(Product.id).limit(PAGE)
+        ),
+        "GET /products?seller_id=1&sort=created_at": (
+            select(Product).where(Product.seller_id == 1)
+            .order_by(Product.created_at, Product.id).limit(PAGE)
+        ),
+        "GET /products?name_prefix=Мёд": (
+            select(Product).where(starts_with(Product.name, "Мёд")).order_by(Product.id).limit(PAGE)
+        ),
+        "GET /products/{id}": select(Product).where(Product.id == 1),
+        "GET /employees": select(Employee).order_by(Employee.id).limit(PAGE),
+        "GET /employees/{id}": select(Employee).where(Employee.id == 1),
+        "GET /employees/{id}?include=products": select(Product).where(Product.seller_id.in_([1])),
+        "GET /vacancies": select(Vacancy).order_by(Vacancy.id).limit(PAGE),
+        "GET /vacancies/{id}": select(Vacancy).where(Vacancy.id == 1),
+        "GET /profiles": select(Profile).order_by(Profile.id).limit(PAGE),
+        "GET /profiles/{id}": select(Profile).where(Profile.id == 1),
+        "POST /auth/verify-code (пользователь)": select(User).where(User.phone == "+79990000000"),
+        "POST /auth/verify-code (код)": select(SMSCode).where(
+            SMSCode.user_id == 1,
+            SMSCode.code == "123456",
+            SMSCode.is_used == False,
+            SMSCode.expires_at > now,
+        ).limit(1),
+        "GET /stats (пересчет, вакансии по городам)": (
+            select(Vacancy.city, func.count()).group_by(Vacancy.city)
+        ),
+        "GET /stats (пересчет, товары по продавцам)": (
+            select(Product.seller_id, func.count()).group_by(Product.seller_id)
+        ),
+    }
+
+
+def make_engine(url: str):
+    if make_url(url).get_backend_name() != "sqlite":
+        return create_engine(url)
+    # Без кэша подготовленных выражений: иначе EXPLAIN после DROP INDEX в той же
+    # транзакции вернул бы план, подготовленный со старой схемой
+    engine = create_engine(url, connect_args={"cached_statements": 0})
+    # pysqlite сам открывает транзакцию только перед DML, и DROP INDEX
+    # применился бы сразу. Транзакцию открываем явно, тогда DDL откатывается
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _on_begin(connection):
+        connection.exec_driver_sql("BEGIN")
+
+    return engine
+
+
+def explain(connection, statement) -> str:
+    rows = connection.execute(Explain(statement)).all()
+    if connection.dialect.name != "sqlite":
+        return "\n".join(row[0] for row in rows)
+    # id, parent, notused, detail: отступ по вложенности
+    depth = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node_id] + detail)
+    return "\n".join(lines)
+
+
+def collect_plans(url: str) -> dict:
+    """Endpoint -> {"before": план, "after": план}"""
+    engine = make_engine(url)
+    plans = {name: {} for name in queries()}
+    try:
+        with engine.connect() as connection:
+            for name, statement in queries().items():
+                plans[name]["after"] = explain(connection, statement)
+            connection.rollback()
+
+            with connection.begin() as transaction:
+                for index in HOT_INDEXES:
+                    connection.execute(text(f"DROP INDEX IF EXISTS {index}"))
+                for name, statement in queries().items():
+                    plans[name]["before"] = explain(connection, statement)
+                transaction.rollback()
+    finally:
+        engine.dispose()
+    return plans
+
+
+def render_markdown(plans: dict, dialect: str) -> str:
+    lines = [
+        "# Планы запросов до и после индексов частых запросов",
+        "",
+        f"Сгенерировано `python query_plans.py --output QUERY_PLANS.md` ({dialect}).",
+        "",
+        "\"До\" - та же база без индексов " + ", ".join(f"`{name}`" for name in HOT_INDEXES) + ".",
+        "",
+    ]
+    for name, plan in plans.items():
+        lines.append(f"## {name}")
+        lines.append("")
+        if plan["before"] == plan["after"]:
+            lines += ["План не изменился:", "", "```", plan["after"], "```", ""]
+            continue
+        lines += ["До:", "", "```", plan["before"], "```", "", "После:", "", "```", plan["after"], "```", ""]
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Планы запросов до и после индексов")
+    parser.add_argument("--url", default=DATABASE_URL, help="База (по умолчанию DATABASE_URL)")
+    parser.add_argument("--output", help="Записать отчет в markdown файл")
+    args = parser.parse_args()
+
+    plans = collect_plans(args.url)
+    report = render_markdown(plans, make_url(args.url).get_dialect().name)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(report)
+        print(f"Отчет записан в {args.output}")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
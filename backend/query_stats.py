@@ -0,0 +1,184 @@
+"""
+SQL запросы каждого HTTP запроса: количество, время, медленные запросы, N+1
+
+События SQLAlchemy (before/after_cursor_execute на всех движках процесса)
+записывают каждый запрос в статистику текущего HTTP запроса. Статистика
+живет в contextvar, который выставляет QueryStatsMiddleware, поэтому в нее
+попадают и запросы из db.run_sync() и run_in_threadpool() (контекст
+копируется в поток). Запросы вне HTTP запроса (запуск, фоновые потоки)
+проверяются только на медленность.
+
+- Ответ получает заголовок Server-Timing: db;dur=<мс>;desc="<N> queries"
+  (видно во вкладке Network браузера).
+- Запрос дольше DB_SLOW_QUERY_MS логируется с маршрутом endpoint'а
+  (логгер query_stats, параметры запроса не пишутся - в них телефоны и коды).
+- Если одна и та же форма запроса (SQL без значений параметров) выполняется
+  за HTTP запрос больше DB_NPLUSONE_THRESHOLD раз, логируется
+  предупреждение; с DB_NPLUSONE_RAISE=true бросается NPlusOneError, чтобы
+  такой endpoint падал в тестах.
+- Суммы по маршрутам - GET /metrics/queries.
+"""
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine.interfaces import ExecuteStyle
+
+logger = logging.getLogger(__name__)
+
+DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "200"))
+DB_NPLUSONE_THRESHOLD = int(os.getenv("DB_NPLUSONE_THRESHOLD", "10"))
+DB_NPLUSONE_RAISE = os.getenv("DB_NPLUSONE_RAISE", "false").lower() == "true"
+
+# Список параметров "(?, ?, ?)" / "(%(p_1)s, ...)" / "($1, $2)" сводится к "(?)":
+# IN с разным числом значений - одна и та же форма запроса
+_PARAMS = re.compile(r"\(\s*(?:\?|%\(\w+\)s|\$\d+)(?:\s*,\s*(?:\?|%\(\w+\)s|\$\d+))*\s*\)")
+_SPACES = re.compile(r"\s+")
+
+
+class NPlusOneError(RuntimeError):
+    """Форма запроса повторилась за HTTP запрос больше DB_NPLUSONE_THRESHOLD раз"""
+
+
+def statement_shape(statement: str) -> str:
+    """SQL без значений параметров и лишних пробелов"""
+    return _PARAMS.sub("(?)", _SPACES.sub(" ", statement).strip())
+
+
+class RequestQueries:
+    """Запросы к базе одного HTTP запроса"""
+
+    def __init__(self, scope: dict):
+        self.scope = scope
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+        self._lock = threading.Lock()
+
+    @property
+    def route(self) -> str:
+        # Шаблон пути ("/products/{product_id}") известен после маршрутизации.
+        # Без маршрута (404) путь не подставляется, чтобы не плодить ключи в метриках
+        route = self.scope.get("route")
+        return f"{self.scope.get('method', '')} {getattr(route, 'path', None) or '<нет маршрута>'}"
+
+    def record(self, statement: str, duration: float, repeatable: bool) -> int:
+        """Добавляет запрос, возвращает сколько раз выполнялась его форма"""
+        with self._lock:
+            self.count += 1
+            self.duration += duration
+            if not repeatable:
+                return 0
+            shape = statement_shape(statement)
+            self.shapes[shape] += 1
+            return self.shapes[shape]
+
+
+_current: ContextVar[Optional[RequestQueries]] = ContextVar("request_queries", default=None)
+
+
+class RouteStats:
+    """Суммы по маршрутам для GET /metrics/queries"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def add(self, queries: RequestQueries):
+        with self._lock:
+            route = self._routes.setdefault(queries.route, {
+                "requests": 0, "queries": 0, "queries_max": 0, "db_ms_total": 0.0, "db_ms_max": 0.0,
+            })
+            route["requests"] += 1
+            route["queries"] += queries.count
+            route["queries_max"] = max(route["queries_max"], queries.count)
+            route["db_ms_total"] += queries.duration * 1000
+            route["db_ms_max"] = max(route["db_ms_max"], queries.duration * 1000)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                name: {
+                    **route,
+                    "queries_avg": round(route["queries"] / route["requests"], 2),
+                    "db_ms_avg": round(route["db_ms_total"] / route["requests"], 3),
+                    "db_ms_total": round(route["db_ms_total"], 3),
+                    "db_ms_max": round(route["db_ms_max"], 3),
+                }
+                for name, route in sorted(self._routes.items())
+            }
+
+
+route_stats = RouteStats()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info["query_started"] = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info.pop("query_started")
+    queries = _current.get()
+    route = queries.route if queries is not None else "-"
+
+    if DB_SLOW_QUERY_MS and duration * 1000 >= DB_SLOW_QUERY_MS:
+        logger.warning("Медленный запрос %.1f мс [%s]: %s", duration * 1000, route, statement_shape(statement))
+
+    if queries is None:
+        return
+    # Пачки executemany / insertmanyvalues - один запрос, а не N+1
+    repeatable = not executemany and (
+        context is None or context.execute_style is not ExecuteStyle.INSERTMANYVALUES
+    )
+    repeats = queries.record(statement, duration, repeatable)
+    if DB_NPLUSONE_THRESHOLD and repeats == DB_NPLUSONE_THRESHOLD + 1:
+        message = (
+            f"Возможный N+1 [{route}]: запрос выполнен больше {DB_NPLUSONE_THRESHOLD} раз: "
+            f"{statement_shape(statement)}"
+        )
+        if DB_NPLUSONE_RAISE:
+            raise NPlusOneError(message)
+        logger.warning(message)
+
+
+def server_timing(queries: RequestQueries) -> str:
+    return f'db;dur={queries.duration * 1000:.1f};desc="{queries.count} queries"'
+
+
+class QueryStatsMiddleware:
+    """ASGI middleware: статистика запросов к базе и заголовок Server-Timing"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        queries = RequestQueries(scope)
+        token = _current.set(queries)
+
+        async def send_with_timing(message):
+            # Запросы, выполненные при отдаче тела (StreamingResponse), в заголовок
+            # не попадают, но учитываются в /metrics/queries
+            if message["type"] == "http.response.start":
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"server-timing", server_timing(queries).encode()),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            route_stats.add(queries)
@@ -0,0 +1,34 @@
+"""
+Полный пересчет статистики каталога (таблица catalog_stats)
+
+Счетчики обновляются обработчиками записи инкрементально. Если данные
+менялись в обход API (ручные SQL запросы, восстановление из бэкапа),
+счетчики можно пересчитать с нуля:
+    python recompute_stats.py
+
+Схему скрипт не создает: база должна быть на последней версии (python migrate.py).
+"""
+import sys
+
+from database import SessionLocal
+import migrate
+import stats
+
+
+def main():
+    if not migrate.is_up_to_date():
+        sys.exit("Схема базы не на последней версии: выполните python migrate.py")
+    db = SessionLocal()
+    try:
+        stats.recompute(db)
+        db.commit()
+        result = stats.read_stats(db)
+    finally:
+        db.close()
+    print(f"Товаров: {result['products_total']}, типов: {len(result['products_by_type'])}, "
+          f"продавцов: {len(result['products_by_seller'])}")
+    print(f"Вакансий: {result['vacancies_total']}, городов: {len(result['vacancies_by_city'])}")
+
+
+if __name__ == "__main__":
+    main()
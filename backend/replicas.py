@@ -0,0 +1,243 @@
+"""
+Маршрутизация чтения на реплики базы
+
+Если задан DATABASE_REPLICA_URLS (URL через запятую, в том же формате, что
+DATABASE_URL), GET endpoint'ы получают сессию get_read_db(): ее запросы
+уходят на реплики по кругу, а запись и чтение после записи - на основную
+базу:
+
+- сессия чтения закрепляет за собой одну реплику на весь запрос;
+- любой flush или INSERT / UPDATE / DELETE переключает сессию на основную
+  базу до конца запроса;
+- клиент, чей запрос закоммитил запись на основную базу, получает cookie
+  db_primary и DB_REPLICA_STICKY секунд читает с основной базы: иначе
+  отстающая реплика показала бы ему данные без его же изменения. Коммиты
+  вне HTTP запросов (очередь SMS, фоновые потоки) и записи других клиентов
+  на чтение не влияют. Cookie ставится и без реплик: по нему nginx отдает
+  писавшему клиенту ответ backend'а, а не снимок каталога или proxy_cache;
+- реплики проверяются запросом SELECT 1 каждые DB_REPLICA_CHECK_INTERVAL
+  секунд и при разрыве соединения; недоступные пропускаются, а если
+  недоступны все, чтение идет с основной базы.
+
+Endpoint'ы записи по-прежнему используют get_async_db() (только основная база).
+Без DATABASE_REPLICA_URLS get_read_db() работает с основной базой.
+"""
+import itertools
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import List, Optional
+
+from fastapi import Request
+from sqlalchemy import Delete, Insert, Update, create_engine, event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from database import (
+    async_engine, async_read_engine, engine, engine_options, get_async_url, pool_metrics, read_engine
+)
+from pool_metrics import PoolMetrics, instrument
+
+logger = logging.getLogger(__name__)
+
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+DB_REPLICA_STICKY = float(os.getenv("DB_REPLICA_STICKY", "5"))
+DB_REPLICA_CHECK_INTERVAL = float(os.getenv("DB_REPLICA_CHECK_INTERVAL", "5"))
+# Cookie "читать с основной базы до <unix time>" клиента, который только что писал
+STICKY_COOKIE = "db_primary"
+
+
+class Replica:
+    """Реплика: синхронный движок (проверки, выгрузка) и асинхронный (endpoint'ы)"""
+
+    def __init__(self, number: int, url: str):
+        self.name = f"replica{number}"
+        self.url = make_url(url).render_as_string(hide_password=True)
+        async_url = get_async_url(url)
+        pool_metrics[self.name] = PoolMetrics(self.name)
+        pool_metrics[f"{self.name}_sync"] = PoolMetrics(f"{self.name}_sync")
+        self.engine = create_engine(url, **engine_options(url, QueuePool, pool_metrics[f"{self.name}_sync"]))
+        self.async_engine = create_async_engine(
+            async_url, **engine_options(async_url, AsyncAdaptedQueuePool, pool_metrics[self.name])
+        )
+        instrument(self.engine, pool_metrics[f"{self.name}_sync"])
+        instrument(self.async_engine.sync_engine, pool_metrics[self.name])
+        self.healthy = True
+        self.last_error: Optional[str] = None
+        for bind in (self.engine, self.async_engine.sync_engine):
+            event.listen(bind, "handle_error", self._on_error)
+
+    def _on_error(self, context):
+        if context.is_disconnect:
+            self.mark(False, str(context.original_exception).splitlines()[0])
+
+    def mark(self, healthy: bool, error: Optional[str] = None):
+        if healthy != self.healthy:
+            if healthy:
+                logger.info("Реплика %s снова доступна", self.url)
+            else:
+                logger.warning("Реплика %s недоступна, чтение идет с других баз: %s", self.url, error)
+        self.healthy = healthy
+        self.last_error = error
+
+    def check(self):
+        """SELECT 1 через синхронный движок"""
+        try:
+            with self.engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+        except Exception as e:
+            self.mark(False, str(e).splitlines()[0])
+        else:
+            self.mark(True)
+
+
+replicas: List[Replica] = [Replica(number, url) for number, url in enumerate(DATABASE_REPLICA_URLS, 1)]
+
+_round_robin = itertools.count()
+_monitor = None
+_monitor_lock = threading.Lock()
+
+# Коммиты на основную базу текущего HTTP запроса (выставляет ReadAfterWriteMiddleware;
+# копируется в run_in_threadpool и db.run_sync, как в query_stats)
+_request_commits: ContextVar[Optional[list]] = ContextVar("request_commits", default=None)
+
+
+def _on_primary_commit(connection):
+    commits = _request_commits.get()
+    if commits is not None:
+        commits.append(time.time())
+
+
+for _bind in (engine, async_engine.sync_engine):
+    event.listen(_bind, "commit", _on_primary_commit)
+
+
+def reads_primary(request: Request) -> bool:
+    """Клиент недавно писал (cookie db_primary еще действует)"""
+    try:
+        return float(request.cookies.get(STICKY_COOKIE, "0")) > time.time()
+    except ValueError:
+        return False
+
+
+class ReadAfterWriteMiddleware:
+    """ASGI middleware: cookie db_primary в ответ на запрос, закоммитивший запись"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        # Без реплик cookie тоже нужна: по ней nginx обходит снимки и proxy_cache
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        commits = []
+        token = _request_commits.set(commits)
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and commits:
+                until = time.time() + DB_REPLICA_STICKY
+                cookie = (
+                    f"{STICKY_COOKIE}={until:.0f}; Max-Age={DB_REPLICA_STICKY:.0f}; "
+                    f"Path=/; HttpOnly; SameSite=Lax"
+                )
+                message["headers"] = [*message.get("headers", []), (b"set-cookie", cookie.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_cookie)
+        finally:
+            _request_commits.reset(token)
+
+
+def pick_replica() -> Optional[Replica]:
+    """Следующая доступная реплика по кругу (None - читать с основной базы)"""
+    if not replicas:
+        return None
+    start = next(_round_robin)
+    for offset in range(len(replicas)):
+        replica = replicas[(start + offset) % len(replicas)]
+        if replica.healthy:
+            return replica
+    return None
+
+
+class RoutingSession(Session):
+    """Сессия чтения: запросы на реплику, запись и все после нее - на основную базу"""
+
+    def primary_bind(self):
+        return engine
+
+    def primary_read_bind(self):
+        # В рабочем режиме SQLite - соединения чтения основной базы
+        return read_engine
+
+    def replica_bind(self, replica: Replica):
+        return replica.engine
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._flushing or isinstance(clause, (Insert, Update, Delete)):
+            self.info["primary"] = True
+        if self.info.get("primary"):
+            return self.primary_bind()
+        if "replica" not in self.info:
+            self.info["replica"] = pick_replica()
+        replica = self.info["replica"]
+        return self.replica_bind(replica) if replica is not None else self.primary_read_bind()
+
+
+class AsyncRoutingSession(RoutingSession):
+    """Синхронная часть AsyncSession: те же правила, асинхронные движки"""
+
+    def primary_bind(self):
+        return async_engine.sync_engine
+
+    def primary_read_bind(self):
+        return async_read_engine.sync_engine
+
+    def replica_bind(self, replica: Replica):
+        return replica.async_engine.sync_engine
+
+
+ReadSessionLocal = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False)
+
+AsyncReadSessionLocal = async_sessionmaker(
+    class_=AsyncSession, sync_session_class=AsyncRoutingSession, autoflush=False, expire_on_commit=False
+)
+
+
+async def get_read_db(request: Request):
+    """Dependency для endpoint'ов чтения: сессия с маршрутизацией на реплики"""
+    async with AsyncReadSessionLocal() as db:
+        if reads_primary(request):
+            # Чтение после своей записи - с основной базы
+            db.sync_session.info["replica"] = None
+        yield db
+
+
+def _monitor_loop():
+    while True:
+        for replica in replicas:
+            replica.check()
+        time.sleep(DB_REPLICA_CHECK_INTERVAL)
+
+
+def start_health_checks():
+    """Запускает фоновую проверку реплик (один поток на процесс)"""
+    global _monitor
+    with _monitor_lock:
+        if replicas and _monitor is None:
+            _monitor = threading.Thread(target=_monitor_loop, name="replica-health", daemon=True)
+            _monitor.start()
+
+
+def status() -> list:
+    """Состояние реплик для GET /metrics/db"""
+    return [
+        {"name": r.name, "url": r.url, "healthy": r.healthy, "last_error": r.last_error}
+        for r in replicas
+    ]
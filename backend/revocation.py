@@ -0,0 +1,141 @@
+"""
+Отзыв JWT токенов (POST /auth/logout)
+
+Каждый токен получает claim jti. Отозванные токены хранятся в таблице
+revoked_tokens, а проверка при запросе идет по словарю в памяти воркера
+(jti -> время истечения), без обращения к базе:
+
+- при запуске загружаются все еще не истекшие отзывы;
+- фоновый поток каждые REVOCATION_SYNC_INTERVAL секунд догружает отзывы,
+  сделанные другими воркерами (по revoked_at с запасом на время транзакции),
+  поэтому в другом воркере отозванный токен перестает работать не позже
+  чем через этот интервал; в своем воркере - сразу;
+- истекшие записи убираются из памяти при каждой синхронизации и из базы
+  раз в REVOCATION_PRUNE_INTERVAL секунд: истекший токен и так отклоняется
+  при проверке подписи.
+"""
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from database import engine, read_engine
+from models import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+REVOCATION_SYNC_INTERVAL = float(os.getenv("REVOCATION_SYNC_INTERVAL", "2"))
+REVOCATION_PRUNE_INTERVAL = float(os.getenv("REVOCATION_PRUNE_INTERVAL", "3600"))
+# Отзыв, закоммиченный позже, чем начался предыдущий опрос, может иметь
+# revoked_at раньше него: опрос перечитывает это окно повторно
+SYNC_OVERLAP = timedelta(seconds=30)
+
+
+class Denylist:
+    """Отозванные jti воркера: проверка - поиск в словаре"""
+
+    def __init__(self):
+        self._tokens: Dict[str, datetime] = {}
+        self._lock = threading.Lock()
+        self.synced_at: Optional[datetime] = None
+
+    def __contains__(self, jti: str) -> bool:
+        return jti in self._tokens
+
+    def __len__(self) -> int:
+        return len(self._tokens)
+
+    def add(self, jti: str, expires_at: datetime):
+        with self._lock:
+            self._tokens[jti] = expires_at
+
+    def prune(self, now: datetime) -> int:
+        """Убирает истекшие токены, возвращает сколько убрано"""
+        with self._lock:
+            expired = [jti for jti, expires_at in self._tokens.items() if expires_at <= now]
+            for jti in expired:
+                del self._tokens[jti]
+        return len(expired)
+
+    def sync(self, db: Session):
+        """Загружает отзывы, появившиеся с прошлой синхронизации (при первой - все действующие)"""
+        started = datetime.utcnow()
+        stmt = select(RevokedToken.jti, RevokedToken.expires_at).where(RevokedToken.expires_at > started)
+        if self.synced_at is not None:
+            stmt = stmt.where(RevokedToken.revoked_at >= self.synced_at - SYNC_OVERLAP)
+        rows = db.execute(stmt).all()
+        with self._lock:
+            self._tokens.update(rows)
+        self.synced_at = started
+        self.prune(started)
+
+
+denylist = Denylist()
+
+_sync_thread = None
+_sync_lock = threading.Lock()
+
+
+def is_revoked(jti: str) -> bool:
+    return jti in denylist
+
+
+async def revoke(db: AsyncSession, jti: str, user_id: int, expires_at: datetime):
+    """Отзывает токен: запись в базу и сразу в словарь этого воркера"""
+    db.add(RevokedToken(jti=jti, user_id=user_id, expires_at=expires_at))
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Токен уже отозван (повторный выход)
+        await db.rollback()
+    denylist.add(jti, expires_at)
+
+
+def prune_database() -> int:
+    """Удаляет из базы отзывы истекших токенов"""
+    with Session(engine) as db:
+        result = db.execute(delete(RevokedToken).where(RevokedToken.expires_at <= datetime.utcnow()))
+        db.commit()
+    return result.rowcount
+
+
+def _sync_loop():
+    next_prune = time.monotonic() + REVOCATION_PRUNE_INTERVAL
+    while True:
+        time.sleep(REVOCATION_SYNC_INTERVAL)
+        try:
+            with Session(read_engine) as db:
+                denylist.sync(db)
+            if time.monotonic() >= next_prune:
+                next_prune = time.monotonic() + REVOCATION_PRUNE_INTERVAL
+                prune_database()
+        except Exception:
+            logger.exception("Не удалось синхронизировать отозванные токены")
+
+
+def start():
+    """Загружает отозванные токены и запускает синхронизацию (один поток на процесс)"""
+    global _sync_thread
+    with _sync_lock:
+        if _sync_thread is not None:
+            return
+        with Session(read_engine) as db:
+            denylist.sync(db)
+        _sync_thread = threading.Thread(target=_sync_loop, name="token-revocation", daemon=True)
+        _sync_thread.start()
+
+
+def status() -> dict:
+    """Состояние списка отзыва для GET /metrics/cache"""
+    return {
+        "size": len(denylist),
+        "synced_at": denylist.synced_at.isoformat() if denylist.synced_at else None,
+        "sync_interval_seconds": REVOCATION_SYNC_INTERVAL,
+    }
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, validator
-from typing import Optional
+from typing import Optional, List, Dict
 from datetime import datetime
 import re
 
@@ -123,6 +123,94 @@ class ProductResponse(ProductBase):
     class Config:
         from_attributes = True
 
+# ========== BULK SCHEMAS ==========
+
+class EmployeePatch(EmployeeUpdate):
+    """Изменение сотрудника в пакетном запросе"""
+    id: int = Field(..., gt=0, description="ID сотрудника")
+
+class VacancyPatch(VacancyUpdate):
+    """Изменение вакансии в пакетном запросе"""
+    id: int = Field(..., gt=0, description="ID вакансии")
+
+class ProductPatch(ProductUpdate):
+    """Изменение товара в пакетном запросе"""
+    id: int = Field(..., gt=0, description="ID товара")
+
+class EmployeeBulkRequest(BaseModel):
+    """Пакет изменений сотрудников"""
+    create: List[EmployeeCreate] = Field(default_factory=list, description="Новые сотрудники")
+    update: List[EmployeePatch] = Field(default_factory=list, description="Изменения (только переданные поля)")
+    delete: List[int] = Field(default_factory=list, description="ID удаляемых сотрудников")
+
+class VacancyBulkRequest(BaseModel):
+    """Пакет изменений вакансий"""
+    create: List[VacancyCreate] = Field(default_factory=list, description="Новые вакансии")
+    update: List[VacancyPatch] = Field(default_factory=list, description="Изменения (только переданные поля)")
+    delete: List[int] = Field(default_factory=list, description="ID удаляемых вакансий")
+
+class ProductBulkRequest(BaseModel):
+    """Пакет изменений товаров"""
+    create: List[ProductCreate] = Field(default_factory=list, description="Новые товары")
+    update: List[ProductPatch] = Field(default_factory=list, description="Изменения (только переданные поля)")
+    delete: List[int] = Field(default_factory=list, description="ID удаляемых товаров")
+
+class BulkItemResult(BaseModel):
+    """Результат одной операции пакетного запроса"""
+    action: str = Field(..., description="create, update или delete")
+    index: int = Field(..., description="Позиция элемента в своем списке запроса")
+    id: Optional[int] = Field(None, description="ID объекта")
+    status: str = Field(..., description="ok, not_found или duplicate")
+
+class BulkResponse(BaseModel):
+    """Ответ пакетного запроса"""
+    created: int
+    updated: int
+    deleted: int
+    failed: int
+    results: List[BulkItemResult]
+
+class ImportRowError(BaseModel):
+    """Ошибка строки импорта"""
+    row: int = Field(..., description="Номер записи в файле (с 1, без заголовка CSV)")
+    errors: List[str] = Field(..., description="Сообщения об ошибках")
+
+class ImportReport(BaseModel):
+    """Отчет потокового импорта"""
+    inserted: int = Field(..., description="Сколько строк добавлено")
+    failed: int = Field(..., description="Сколько строк пропущено с ошибкой")
+    errors: List[ImportRowError] = Field(..., description="Ошибки строк (не больше MAX_REPORTED_ERRORS)")
+
+# ========== STATS SCHEMAS ==========
+
+class SellerStat(BaseModel):
+    """Количество товаров продавца"""
+    seller_id: int
+    name: Optional[str] = Field(None, description="Имя продавца (None, если сотрудник удален)")
+    count: int
+
+class PriceStats(BaseModel):
+    """Статистика цен товаров"""
+    min: Optional[float] = None
+    max: Optional[float] = None
+    percentiles: Dict[str, float] = Field(default_factory=dict, description="Оценки p25, p50, p75, p90, p99")
+
+class CatalogStatsResponse(BaseModel):
+    """Схема ответа статистики каталога"""
+    products_total: int
+    products_by_type: Dict[str, int]
+    products_by_seller: List[SellerStat]
+    price: PriceStats
+    vacancies_total: int
+    vacancies_by_city: Dict[str, int]
+
+# ========== SEARCH SCHEMAS ==========
+
+class SearchResponse(BaseModel):
+    """Схема ответа полнотекстового поиска"""
+    products: List[ProductResponse] = Field(default_factory=list, description="Найденные товары")
+    vacancies: List[VacancyResponse] = Field(default_factory=list, description="Найденные вакансии")
+
 # ========== PROFILE SCHEMAS ==========
 
 class ProfileBase(BaseModel):
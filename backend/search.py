@@ -0,0 +1,198 @@
+"""
+Полнотекстовый поиск по товарам и вакансиям
+
+SQLite: виртуальные таблицы FTS5 (products_fts, vacancies_fts) с rowid = id
+строки. В FTS5 нет русского стеммера, поэтому текст приводится к основам
+словоформ (snowball) в Python перед записью в индекс и перед поиском.
+Индекс обновляется из обработчиков создания/изменения/удаления в main.py.
+Таблицы создает миграция 0005; при запуске init_search только заполняет
+пустой индекс (например, после init_db.py).
+
+PostgreSQL: генерируемая колонка search_vector (tsvector, конфигурация
+russian) с GIN индексом. Она пересчитывается самой базой, поэтому функции
+синхронизации индекса для PostgreSQL ничего не делают. Колонка и индекс
+тоже создаются миграцией 0005 и не описаны в models.py (см. migrations/env.py).
+"""
+import re
+from functools import lru_cache
+from typing import List, Tuple
+
+import snowballstemmer
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from models import Product, Vacancy
+
+_stemmer = snowballstemmer.stemmer("russian")
+_word_re = re.compile(r"\w+")
+
+# Индексируемые поля: таблица -> (модель, колонки). Первая колонка весит больше
+SEARCH_FIELDS = {
+    "products": (Product, ("name", "long_description")),
+    "vacancies": (Vacancy, ("title", "long_description")),
+}
+
+# Вес заголовка относительно описания в bm25
+TITLE_WEIGHT = 10.0
+
+
+def _is_sqlite(bind) -> bool:
+    return bind.dialect.name == "sqlite"
+
+
+# Словарь каталога небольшой, поэтому основы слов кэшируются: snowball на
+# чистом Python - самая дорогая часть индексации при массовом импорте
+@lru_cache(maxsize=100_000)
+def _stem(word: str) -> str:
+    return word if word.isdigit() else _stemmer.stemWord(word)
+
+
+def stem_words(value: str) -> List[str]:
+    """Разбивает текст на слова и приводит их к основам"""
+    return [_stem(word) for word in _word_re.findall((value or "").lower())]
+
+
+def init_search(engine):
+    """Заполняет пустые поисковые индексы SQLite (сами индексы создает миграция 0005)"""
+    with engine.begin() as conn:
+        if not _is_sqlite(conn):
+            return
+        for table, (model, (title, description)) in SEARCH_FIELDS.items():
+            indexed = conn.execute(text(f"SELECT count(*) FROM {table}_fts")).scalar()
+            if not indexed:
+                _rebuild_sqlite(conn, table, model, title, description)
+
+
+def rebuild_search(engine):
+    """Перестраивает поисковые индексы SQLite целиком (после массовой загрузки данных)"""
+    with engine.begin() as conn:
+        if not _is_sqlite(conn):
+            return
+        for table, (model, (title, description)) in SEARCH_FIELDS.items():
+            _rebuild_sqlite(conn, table, model, title, description)
+
+
+def _rebuild_sqlite(conn, table, model, title, description):
+    """Полностью перестраивает FTS5 индекс таблицы"""
+    conn.execute(text(f"DELETE FROM {table}_fts"))
+    rows = conn.execute(text(f"SELECT id, {title}, {description} FROM {table}"))
+    params = [
+        {"id": row[0], "title": " ".join(stem_words(row[1])), "description": " ".join(stem_words(row[2]))}
+        for row in rows
+    ]
+    if params:
+        conn.execute(text(
+            f"INSERT INTO {table}_fts(rowid, {title}, {description}) "
+            f"VALUES (:id, :title, :description)"
+        ), params)
+
+
+def _index_row(db: Session, table: str, row):
+    if not _is_sqlite(db.get_bind()):
+        return
+    _, (title, description) = SEARCH_FIELDS[table]
+    db.execute(text(f"DELETE FROM {table}_fts WHERE rowid = :id"), {"id": row.id})
+    db.execute(
+        text(f"INSERT INTO {table}_fts(rowid, {title}, {description}) VALUES (:id, :title, :description)"),
+        {
+            "id": row.id,
+            "title": " ".join(stem_words(getattr(row, title))),
+            "description": " ".join(stem_words(getattr(row, description))),
+        }
+    )
+
+
+def _remove_row(db: Session, table: str, row_id: int):
+    if not _is_sqlite(db.get_bind()):
+        return
+    db.execute(text(f"DELETE FROM {table}_fts WHERE rowid = :id"), {"id": row_id})
+
+
+def index_product(db: Session, product: Product):
+    """Добавляет или обновляет товар в поисковом индексе (до commit)"""
+    _index_row(db, "products", product)
+
+
+def remove_product(db: Session, product_id: int):
+    """Удаляет товар из поискового индекса (до commit)"""
+    _remove_row(db, "products", product_id)
+
+
+def index_vacancy(db: Session, vacancy: Vacancy):
+    """Добавляет или обновляет вакансию в поисковом индексе (до commit)"""
+    _index_row(db, "vacancies", vacancy)
+
+
+def remove_vacancy(db: Session, vacancy_id: int):
+    """Удаляет вакансию из поискового индекса (до commit)"""
+    _remove_row(db, "vacancies", vacancy_id)
+
+
+def index_ids(db: Session, table: str, ids: List[int]):
+    """Переиндексирует строки таблицы по списку id одним проходом (до commit)"""
+    if not ids or not _is_sqlite(db.get_bind()):
+        return
+    model, (title, description) = SEARCH_FIELDS[table]
+    rows = db.query(model.id, getattr(model, title), getattr(model, description)).filter(model.id.in_(ids)).all()
+    remove_ids(db, table, ids)
+    index_rows(db, table, rows)
+
+
+def index_rows(db: Session, table: str, rows: List[Tuple[int, str, str]]):
+    """Добавляет в поисковый индекс новые строки (id, заголовок, описание) без чтения таблицы"""
+    if not rows or not _is_sqlite(db.get_bind()):
+        return
+    _, (title, description) = SEARCH_FIELDS[table]
+    db.execute(
+        text(f"INSERT INTO {table}_fts(rowid, {title}, {description}) VALUES (:id, :title, :description)"),
+        [
+            {"id": row[0], "title": " ".join(stem_words(row[1])), "description": " ".join(stem_words(row[2]))}
+            for row in rows
+        ]
+    )
+
+
+def remove_ids(db: Session, table: str, ids: List[int]):
+    """Удаляет строки из поискового индекса по списку id (до commit)"""
+    if not ids or not _is_sqlite(db.get_bind()):
+        return
+    db.execute(text(f"DELETE FROM {table}_fts WHERE rowid = :id"), [{"id": row_id} for row_id in ids])
+
+
+def search_ids(db: Session, table: str, query: str, limit: int) -> List[Tuple[int, float]]:
+    """
+    Ищет строки таблицы по запросу
+
+    Returns:
+        Список (id, релевантность), отсортированный по убыванию релевантности
+    """
+    if _is_sqlite(db.get_bind()):
+        stems = stem_words(query)
+        if not stems:
+            return []
+        # Каждое слово ищется как префикс основы, все слова обязательны
+        match = " ".join(f'"{stem}"*' for stem in stems)
+        rows = db.execute(text(
+            f"SELECT rowid, bm25({table}_fts, {TITLE_WEIGHT}, 1.0) AS rank "
+            f"FROM {table}_fts WHERE {table}_fts MATCH :match "
+            f"ORDER BY rank LIMIT :limit"
+        ), {"match": match, "limit": limit})
+        # bm25 возвращает отрицательные значения: чем меньше, тем релевантнее
+        return [(row[0], -row[1]) for row in rows]
+
+    rows = db.execute(text(
+        f"SELECT id, ts_rank(search_vector, q) AS rank "
+        f"FROM {table}, websearch_to_tsquery('russian', :query) q "
+        f"WHERE search_vector @@ q ORDER BY rank DESC LIMIT :limit"
+    ), {"query": query, "limit": limit})
+    return [(row[0], row[1]) for row in rows]
+
+
+def search(db: Session, table: str, query: str, limit: int) -> list:
+    """Возвращает найденные объекты модели в порядке релевантности"""
+    model, _ = SEARCH_FIELDS[table]
+    ids = [row_id for row_id, _ in search_ids(db, table, query, limit)]
+    if not ids:
+        return []
+    rows = {row.id: row for row in db.query(model).filter(model.id.in_(ids)).all()}
+    return [rows[row_id] for row_id in ids if row_id in rows]
@@ -0,0 +1,35 @@
+"""
+Быстрая сериализация ответов каталога
+
+Обычный путь FastAPI для списка товаров: словарь на строку
+(convert_product_response) -> повторная валидация каждого словаря по
+response_model -> JSON кодирование. Данные каталога берутся из нашей же
+базы и уже соответствуют схеме, поэтому для них валидация пропускается:
+словари сразу кодируются orjson в байты и отдаются готовым Response.
+response_model у endpoint'ов остается для документации OpenAPI.
+
+Сравнение стоимости на странице из 1000 товаров: python bench_serialization.py
+"""
+import orjson
+from fastapi import Response
+
+
+def dumps(payload) -> bytes:
+    """Кодирует словари/списки из convert_*_response в JSON (datetime -> ISO 8601)"""
+    return orjson.dumps(payload)
+
+
+def json_response(body: bytes, response: Response, status_code: int = 200) -> Response:
+    """
+    Собирает ответ из готового JSON
+
+    Заголовки, выставленные endpoint'ом на response (курсор, ETag и т.д.),
+    переносятся в итоговый ответ: FastAPI не объединяет их сам, если
+    endpoint возвращает Response.
+    """
+    return Response(
+        content=body,
+        status_code=status_code,
+        media_type="application/json",
+        headers=dict(response.headers),
+    )
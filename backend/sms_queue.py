@@ -0,0 +1,205 @@
+"""
+Фоновая отправка SMS кодов
+
+POST /auth/send-code сохраняет код со статусом queued, кладет его в очередь и
+сразу отвечает; медленный или недоступный провайдер больше не держит
+запрос. Отправкой занимаются SMS_DISPATCH_WORKERS задач воркера:
+
+- перед отправкой код "захватывается" UPDATE ... WHERE delivery_status =
+  'queued' (статус sending, attempts + 1), поэтому один код не отправят два
+  воркера, а истекший код не отправляется вовсе;
+- при ошибке код возвращается в queued и повторяется через
+  SMS_RETRY_DELAY * 2^(попытка - 1) секунд (с разбросом, не больше
+  SMS_RETRY_MAX_DELAY), после SMS_MAX_ATTEMPTS попыток - failed;
+- результат (sent / failed, sent_at, last_error) пишется в строку SMSCode;
+- очередь в памяти, но коды остаются в базе: при запуске воркер заново
+  ставит в очередь неистекшие коды со статусом queued (после перезапуска
+  или переполнения очереди повторов);
+- код, захваченный (claimed_at) больше SMS_SENDING_TIMEOUT секунд назад и
+  все еще sending, принадлежал остановленному процессу: при запуске он
+  возвращается в queued и тоже ставится в очередь.
+"""
+import asyncio
+import logging
+import os
+import random
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, List, Optional
+
+from sqlalchemy import or_, select, update
+
+from database import AsyncSessionLocal
+from models import SMSCode, User
+from sms_service import SMS_PROVIDER_TIMEOUT, SMS_PROVIDERS, sms_service
+
+logger = logging.getLogger(__name__)
+
+SMS_DISPATCH_WORKERS = int(os.getenv("SMS_DISPATCH_WORKERS", "4"))
+SMS_QUEUE_SIZE = int(os.getenv("SMS_QUEUE_SIZE", "1000"))
+SMS_MAX_ATTEMPTS = int(os.getenv("SMS_MAX_ATTEMPTS", "4"))
+SMS_RETRY_DELAY = float(os.getenv("SMS_RETRY_DELAY", "1"))
+SMS_RETRY_MAX_DELAY = float(os.getenv("SMS_RETRY_MAX_DELAY", "30"))
+# Дольше одна попытка идти не может (все провайдеры по SMS_PROVIDER_TIMEOUT, с запасом)
+SMS_SENDING_TIMEOUT = float(os.getenv(
+    "SMS_SENDING_TIMEOUT", str(2 * SMS_PROVIDER_TIMEOUT * max(1, len(SMS_PROVIDERS)))
+))
+
+
+def retry_delay(attempt: int) -> float:
+    """Пауза перед следующей попыткой после attempt неудачных"""
+    delay = min(SMS_RETRY_MAX_DELAY, SMS_RETRY_DELAY * 2 ** (attempt - 1))
+    return delay * random.uniform(0.75, 1.25)
+
+
+class SMSDispatcher:
+    """Очередь и задачи отправки SMS одного воркера"""
+
+    def __init__(self, send: Callable[[str, str], Awaitable[bool]]):
+        # send(phone, code) -> True, если провайдер принял сообщение
+        self.send = send
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SMS_QUEUE_SIZE)
+        self._workers: List[asyncio.Task] = []
+        self._retries = set()
+        self.enqueued = 0
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+
+    def is_full(self) -> bool:
+        return self.queue.full()
+
+    def enqueue(self, sms_code_id: int, phone: str, code: str, attempt: int = 1) -> bool:
+        """Ставит код в очередь; False, если очередь переполнена (код останется queued)"""
+        try:
+            self.queue.put_nowait((sms_code_id, phone, code, attempt))
+        except asyncio.QueueFull:
+            logger.warning("Очередь SMS переполнена, код %s отправится после перезапуска", sms_code_id)
+            return False
+        self.enqueued += 1
+        return True
+
+    async def start(self):
+        """Запускает задачи отправки и ставит в очередь неотправленные коды"""
+        if self._workers:
+            return
+        # Очередь привязывается к циклу событий, в котором запущено приложение;
+        # коды, поставленные до запуска, вернет recover() из базы
+        self.queue = asyncio.Queue(maxsize=SMS_QUEUE_SIZE)
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"sms-dispatch-{number}")
+            for number in range(SMS_DISPATCH_WORKERS)
+        ]
+        await self.recover()
+
+    async def stop(self):
+        """Останавливает отправку; коды из очереди остаются queued в базе"""
+        for handle in self._retries:
+            handle.cancel()
+        self._retries.clear()
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def recover(self):
+        """Ставит в очередь неотправленные коды из базы, зависшие в sending - заново"""
+        now = datetime.utcnow()
+        async with AsyncSessionLocal() as db:
+            # claimed_at IS NULL - коды в sending, захваченные до миграции 0006
+            await db.execute(
+                update(SMSCode)
+                .where(
+                    SMSCode.delivery_status == "sending",
+                    SMSCode.expires_at > now,
+                    or_(
+                        SMSCode.claimed_at.is_(None),
+                        SMSCode.claimed_at < now - timedelta(seconds=SMS_SENDING_TIMEOUT),
+                    ),
+                )
+                .values(delivery_status="queued")
+            )
+            await db.commit()
+            rows = (await db.execute(
+                select(SMSCode.id, User.phone, SMSCode.code, SMSCode.attempts)
+                .join(User, User.id == SMSCode.user_id)
+                .where(SMSCode.delivery_status == "queued", SMSCode.expires_at > datetime.utcnow())
+            )).all()
+        for sms_code_id, phone, code, attempts in rows:
+            self.enqueue(sms_code_id, phone, code, attempts + 1)
+
+    async def _worker(self):
+        while True:
+            item = await self.queue.get()
+            try:
+                await self._deliver(*item)
+            except Exception:
+                logger.exception("Ошибка отправки SMS кода %s", item[0])
+            finally:
+                self.queue.task_done()
+
+    async def _set_status(self, sms_code_id: int, **values) -> int:
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(update(SMSCode).where(SMSCode.id == sms_code_id).values(**values))
+            await db.commit()
+            return result.rowcount
+
+    async def _claim(self, sms_code_id: int) -> bool:
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                update(SMSCode)
+                .where(
+                    SMSCode.id == sms_code_id,
+                    SMSCode.delivery_status == "queued",
+                    SMSCode.expires_at > datetime.utcnow(),
+                )
+                .values(delivery_status="sending", attempts=SMSCode.attempts + 1, claimed_at=datetime.utcnow())
+            )
+            await db.commit()
+            return result.rowcount == 1
+
+    async def _deliver(self, sms_code_id: int, phone: str, code: str, attempt: int):
+        if not await self._claim(sms_code_id):
+            return
+        error: Optional[str] = None
+        try:
+            delivered = await self.send(phone, code)
+            if not delivered:
+                error = "Провайдер не принял сообщение"
+        except Exception as e:
+            error = str(e)[:255]
+
+        if error is None:
+            await self._set_status(sms_code_id, delivery_status="sent", sent_at=datetime.utcnow(), last_error=None)
+            self.sent += 1
+        elif attempt < SMS_MAX_ATTEMPTS:
+            await self._set_status(sms_code_id, delivery_status="queued", last_error=error)
+            self.retried += 1
+            self._schedule_retry(sms_code_id, phone, code, attempt + 1, retry_delay(attempt))
+        else:
+            await self._set_status(sms_code_id, delivery_status="failed", last_error=error)
+            self.failed += 1
+            logger.warning("SMS код %s не отправлен после %s попыток: %s", sms_code_id, attempt, error)
+
+    def _schedule_retry(self, sms_code_id: int, phone: str, code: str, attempt: int, delay: float):
+        def retry():
+            self._retries.discard(handle)
+            self.enqueue(sms_code_id, phone, code, attempt)
+
+        handle = asyncio.get_running_loop().call_later(delay, retry)
+        self._retries.add(handle)
+
+    def stats(self) -> dict:
+        """Счетчики для GET /metrics/sms"""
+        return {
+            "queued": self.queue.qsize(),
+            "queue_size": SMS_QUEUE_SIZE,
+            "workers": len(self._workers),
+            "waiting_retry": len(self._retries),
+            "enqueued": self.enqueued,
+            "sent": self.sent,
+            "retried": self.retried,
+            "failed": self.failed,
+        }
+
+
+dispatcher = SMSDispatcher(sms_service.send_sms)
@@ -1,165 +1,338 @@
 """
-Сервис для отправки SMS через SMS.RU API
-Документация: https://sms.ru/api
+Сервис для отправки SMS через SMS.RU и SMSC.RU
+Документация: https://sms.ru/api, https://smsc.ru/api/
+
+Провайдеры опрашиваются по порядку из SMS_PROVIDERS (по умолчанию
+"smsru,smsc"; провайдеры без логина / ключа пропускаются):
+
+- все запросы идут через один httpx.AsyncClient с пулом keep-alive
+  соединений: DNS, TCP и TLS оплачиваются один раз, а не на каждое SMS;
+- ошибка провайдера или ответ дольше SMS_PROVIDER_TIMEOUT секунд - сразу
+  попытка через следующего провайдера в том же вызове;
+- у каждого провайдера свой предохранитель (circuit breaker): после
+  SMS_BREAKER_FAILURES ошибок подряд (медленный ответ дольше
+  SMS_PROVIDER_SLOW_MS тоже считается ошибкой, хотя SMS и отправлена)
+  провайдер пропускается SMS_BREAKER_RESET секунд, затем получает одно
+  пробное сообщение;
+- если недоступны все провайдеры, send_sms возвращает False и код
+  повторяется очередью отправки (sms_queue.py);
+- задержки и ошибки по провайдерам - GET /metrics/sms.
 """
-import requests
-import random
+import asyncio
+import logging
 import os
-from typing import Optional
+import random
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Dict, List, Optional
+
 from dotenv import load_dotenv
 
 load_dotenv()
 
-class SMSService:
-    """Сервис для отправки SMS кодов через SMS.RU"""
-    
+logger = logging.getLogger(__name__)
+
+SMS_PROVIDERS = [name.strip() for name in os.getenv("SMS_PROVIDERS", "smsru,smsc").split(",") if name.strip()]
+SMS_PROVIDER_TIMEOUT = float(os.getenv("SMS_PROVIDER_TIMEOUT", "5"))
+SMS_PROVIDER_SLOW_MS = float(os.getenv("SMS_PROVIDER_SLOW_MS", "2000"))
+SMS_BREAKER_FAILURES = int(os.getenv("SMS_BREAKER_FAILURES", "5"))
+SMS_BREAKER_RESET = float(os.getenv("SMS_BREAKER_RESET", "30"))
+SMS_HTTP_MAX_CONNECTIONS = int(os.getenv("SMS_HTTP_MAX_CONNECTIONS", "20"))
+# Сколько последних задержек хранить для перцентилей в /metrics/sms
+LATENCY_WINDOW = 500
+
+
+class ProviderError(Exception):
+    """Провайдер не принял сообщение"""
+
+
+class CircuitBreaker:
+    """Предохранитель провайдера: closed -> open (пропуск) -> half_open (одна проба)"""
+
+    def __init__(self, name: str, failures: int = SMS_BREAKER_FAILURES, reset: float = SMS_BREAKER_RESET):
+        self.name = name
+        self.failure_threshold = failures
+        self.reset_timeout = reset
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opened_count = 0
+        self._probe = False
+
+    def allow(self) -> bool:
+        """Можно ли отправлять через провайдера сейчас"""
+        if self.state == "closed":
+            return True
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = "half_open"
+            self._probe = False
+        # half_open: пропускается одно пробное сообщение, пока оно не завершится
+        if self._probe:
+            return False
+        self._probe = True
+        return True
+
+    def success(self):
+        if self.state != "closed":
+            logger.info("SMS провайдер %s снова доступен", self.name)
+        self.state = "closed"
+        self.failures = 0
+        self._probe = False
+
+    def failure(self, error: str):
+        self.failures += 1
+        self._probe = False
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                logger.warning(
+                    "SMS провайдер %s отключен на %.0f с после %s ошибок: %s",
+                    self.name, self.reset_timeout, self.failures, error,
+                )
+                self.opened_count += 1
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+
+class ProviderStats:
+    """Задержки и ошибки провайдера для GET /metrics/sms"""
+
     def __init__(self):
+        self.sent = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.slow = 0
+        self.skipped = 0
+        self.last_error: Optional[str] = None
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] * 1000, 1)
+
+    def as_dict(self) -> dict:
+        return {
+            "sent": self.sent,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "slow": self.slow,
+            "skipped": self.skipped,
+            "last_error": self.last_error,
+            "latency_ms_p50": self.percentile(0.5),
+            "latency_ms_p95": self.percentile(0.95),
+            "latency_ms_max": round(max(self.latencies) * 1000, 1) if self.latencies else None,
+        }
+
+
+class SMSProvider(ABC):
+    """Провайдер SMS: формирует запрос и разбирает ответ своего API"""
+
+    name = ""
+
+    def __init__(self):
+        self.breaker = CircuitBreaker(self.name)
+        self.stats = ProviderStats()
+
+    @abstractmethod
+    def is_configured(self) -> bool:
+        """Заданы ли ключи доступа к API"""
+
+    @abstractmethod
+    async def send(self, client, phone: str, message: str):
+        """Отправляет сообщение; при отказе провайдера бросает ProviderError"""
+
+
+class SMSRUProvider(SMSProvider):
+    """SMS.RU"""
+
+    name = "smsru"
+
+    def __init__(self):
+        super().__init__()
         self.api_id = os.getenv("SMSRU_API_ID", "")
-        self.api_url = "https://sms.ru/sms/send"
+        # SMSRU_API_URL - например, локальный fake_sms_provider.py для нагрузочных тестов
+        self.api_url = os.getenv("SMSRU_API_URL", "https://sms.ru/sms/send")
+
+    def is_configured(self) -> bool:
+        return bool(self.api_id)
+
+    async def send(self, client, phone: str, message: str):
+        # Убираем + из номера для SMS.RU API
+        params = {'api_id': self.api_id, 'to': phone.replace('+', ''), 'msg': message, 'json': 1}
+        response = await client.get(self.api_url, params=params)
+        response.raise_for_status()
+        result = response.json()
+        if not isinstance(result, dict):
+            raise ProviderError(f"Неожиданный ответ: {str(result)[:100]}")
+        if result.get('status') != 'OK':
+            raise ProviderError(f"{result.get('status_code')} - {result.get('status_text', 'Неизвестная ошибка')}")
+
+
+class SMSCProvider(SMSProvider):
+    """SMSC.RU"""
+
+    name = "smsc"
+
+    def __init__(self):
+        super().__init__()
+        self.login = os.getenv("SMSC_LOGIN", "")
+        self.password = os.getenv("SMSC_PASSWORD", "")
+        self.api_url = os.getenv("SMSC_API_URL", "https://smsc.ru/sys/send.php")
+
+    def is_configured(self) -> bool:
+        return bool(self.login and self.password)
+
+    async def send(self, client, phone: str, message: str):
+        params = {
+            'login': self.login,
+            'psw': self.password,
+            'phones': phone.replace('+', ''),
+            'mes': message,
+            'fmt': 3  # JSON формат ответа
+        }
+        response = await client.get(self.api_url, params=params)
+        response.raise_for_status()
+        result = response.json()
+        if not isinstance(result, dict):
+            raise ProviderError(f"Неожиданный ответ: {str(result)[:100]}")
+        if 'id' not in result:
+            raise ProviderError(str(result.get('error', 'Неизвестная ошибка')))
+
+
+PROVIDER_CLASSES = {provider.name: provider for provider in (SMSRUProvider, SMSCProvider)}
+
+
+class SMSService:
+    """Отправка SMS кодов с переключением между провайдерами"""
+
+    def __init__(self, provider_names: List[str] = SMS_PROVIDERS):
+        unknown = [name for name in provider_names if name not in PROVIDER_CLASSES]
+        if unknown:
+            raise ValueError(f"Неизвестные SMS провайдеры в SMS_PROVIDERS: {', '.join(unknown)}")
+        self.providers: List[SMSProvider] = [PROVIDER_CLASSES[name]() for name in provider_names]
         self.test_mode = os.getenv("SMS_TEST_MODE", "true").lower() == "true"
-    
+        self.failovers = 0
+        self._client = None
+
     def generate_code(self) -> str:
         """Генерирует 6-значный код"""
         return str(random.randint(100000, 999999))
-    
-    def send_sms(self, phone: str, code: str) -> bool:
+
+    def get_client(self):
+        """Общий HTTP клиент с пулом соединений (создается при первой отправке)"""
+        if self._client is None:
+            # httpx загружается при первой реальной отправке, а не при запуске
+            import httpx
+
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(SMS_PROVIDER_TIMEOUT, connect=min(SMS_PROVIDER_TIMEOUT, 3.0)),
+                limits=httpx.Limits(
+                    max_connections=SMS_HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=SMS_HTTP_MAX_CONNECTIONS,
+                ),
+            )
+        return self._client
+
+    async def aclose(self):
+        """Закрывает соединения с провайдерами (lifespan)"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _send_via(self, provider: SMSProvider, phone: str, message: str) -> bool:
+        client = self.get_client()
+        import httpx
+
+        started = time.perf_counter()
+        error: Optional[str] = None
+        try:
+            # wait_for ограничивает время всего запроса, а не только каждого чтения
+            await asyncio.wait_for(provider.send(client, phone, message), SMS_PROVIDER_TIMEOUT)
+        except (asyncio.TimeoutError, httpx.TimeoutException):
+            provider.stats.timeouts += 1
+            error = f"нет ответа за {SMS_PROVIDER_TIMEOUT:g} с"
+        except (ProviderError, httpx.HTTPError, ValueError) as e:
+            # ValueError - ответ не JSON
+            error = str(e)[:255] or type(e).__name__
+        except Exception as e:
+            # Любая другая ошибка тоже сбой провайдера: иначе пробное сообщение
+            # half_open не завершилось бы и предохранитель остался бы открытым
+            logger.exception("Ошибка SMS провайдера %s", provider.name)
+            error = f"{type(e).__name__}: {e}"[:255]
+
+        if error is not None:
+            provider.stats.errors += 1
+            provider.stats.last_error = error
+            provider.breaker.failure(error)
+            logger.warning("SMS провайдер %s не отправил сообщение: %s", provider.name, error)
+            return False
+
+        latency = time.perf_counter() - started
+        provider.stats.sent += 1
+        provider.stats.latencies.append(latency)
+        if SMS_PROVIDER_SLOW_MS and latency * 1000 >= SMS_PROVIDER_SLOW_MS:
+            # Сообщение ушло, но медленный провайдер отключается так же, как сбойный
+            provider.stats.slow += 1
+            provider.breaker.failure(f"ответ за {latency * 1000:.0f} мс")
+        else:
+            provider.breaker.success()
+        return True
+
+    async def send_sms(self, phone: str, code: str) -> bool:
         """
         Отправляет SMS с кодом на указанный номер
-        
+
         Args:
             phone: Номер телефона в формате +7XXXXXXXXXX
             code: 6-значный код
-            
+
         Returns:
-            True если SMS отправлена успешно, False в противном случае
+            True если SMS отправлена успешно, False если ее не принял ни один провайдер
         """
         # В тестовом режиме просто выводим код в консоль
         if self.test_mode:
             print(f"📱 [TEST MODE] SMS код для {phone}: {code}")
             return True
-        
-        # Проверяем наличие API ключа
-        if not self.api_id:
-            print("⚠️ SMSRU_API_ID не настроен! Используйте тестовый режим или добавьте API ключ в .env")
+
+        providers = [provider for provider in self.providers if provider.is_configured()]
+        # Проверяем наличие ключей хотя бы у одного провайдера
+        if not providers:
+            print("⚠️ SMS провайдеры не настроены (SMSRU_API_ID или SMSC_LOGIN / SMSC_PASSWORD)! "
+                  "Используйте тестовый режим или добавьте ключи в .env")
             print(f"📱 SMS код для {phone}: {code}")
             return True
-        
-        # Убираем + из номера для SMS.RU API
-        phone_clean = phone.replace('+', '')
-        
-        # Формируем текст сообщения
+
         message = f"Ваш код подтверждения: {code}"
-        
-        # Параметры запроса к SMS.RU
-        params = {
-            'api_id': self.api_id,
-            'to': phone_clean,
-            'msg': message,
-            'json': 1  # Получаем ответ в JSON формате
-        }
-        
-        try:
-            response = requests.get(self.api_url, params=params, timeout=10)
-            response.raise_for_status()
-            
-            result = response.json()
-            
-            # Проверяем статус отправки
-            if result.get('status') == 'OK':
-                print(f"✅ SMS успешно отправлена на {phone}")
+        for number, provider in enumerate(providers):
+            if not provider.breaker.allow():
+                provider.stats.skipped += 1
+                continue
+            if number > 0:
+                self.failovers += 1
+            if await self._send_via(provider, phone, message):
                 return True
-            else:
-                error_code = result.get('status_code')
-                error_text = result.get('status_text', 'Неизвестная ошибка')
-                print(f"❌ Ошибка отправки SMS: {error_code} - {error_text}")
-                return False
-                
-        except requests.exceptions.RequestException as e:
-            print(f"❌ Ошибка при отправке SMS: {str(e)}")
-            return False
-    
-    def send_code(self, phone: str) -> Optional[str]:
-        """
-        Генерирует и отправляет SMS код
-        
-        Args:
-            phone: Номер телефона
-            
-        Returns:
-            Код если отправка успешна, None в противном случае
-        """
-        code = self.generate_code()
-        
-        if self.send_sms(phone, code):
-            return code
-        
-        return None
-
-
-# Альтернативный сервис для SMSC.RU (если нужен)
-class SMSCService:
-    """Сервис для отправки SMS через SMSC.RU"""
-    
-    def __init__(self):
-        self.login = os.getenv("SMSC_LOGIN", "")
-        self.password = os.getenv("SMSC_PASSWORD", "")
-        self.api_url = "https://smsc.ru/sys/send.php"
-        self.test_mode = os.getenv("SMS_TEST_MODE", "true").lower() == "true"
-    
-    def generate_code(self) -> str:
-        """Генерирует 6-значный код"""
-        return str(random.randint(100000, 999999))
-    
-    def send_sms(self, phone: str, code: str) -> bool:
-        """Отправляет SMS через SMSC.RU"""
-        if self.test_mode:
-            print(f"📱 [TEST MODE] SMS код для {phone}: {code}")
-            return True
-        
-        if not self.login or not self.password:
-            print("⚠️ SMSC_LOGIN или SMSC_PASSWORD не настроены!")
-            print(f"📱 SMS код для {phone}: {code}")
-            return True
-        
-        phone_clean = phone.replace('+', '')
-        message = f"Ваш код подтверждения: {code}"
-        
-        params = {
-            'login': self.login,
-            'psw': self.password,
-            'phones': phone_clean,
-            'mes': message,
-            'fmt': 3  # JSON формат ответа
+        return False
+
+    def stats(self) -> Dict[str, dict]:
+        """Провайдеры для GET /metrics/sms: состояние предохранителя, задержки, ошибки"""
+        return {
+            "failovers": self.failovers,
+            "providers": {
+                provider.name: {
+                    "configured": provider.is_configured(),
+                    "state": provider.breaker.state,
+                    "consecutive_failures": provider.breaker.failures,
+                    "opened": provider.breaker.opened_count,
+                    **provider.stats.as_dict(),
+                }
+                for provider in self.providers
+            },
         }
-        
-        try:
-            response = requests.get(self.api_url, params=params, timeout=10)
-            response.raise_for_status()
-            
-            result = response.json()
-            
-            if 'id' in result:
-                print(f"✅ SMS успешно отправлена на {phone}")
-                return True
-            else:
-                error = result.get('error', 'Неизвестная ошибка')
-                print(f"❌ Ошибка отправки SMS: {error}")
-                return False
-                
-        except requests.exceptions.RequestException as e:
-            print(f"❌ Ошибка при отправке SMS: {str(e)}")
-            return False
-    
-    def send_code(self, phone: str) -> Optional[str]:
-        """Генерирует и отправляет SMS код"""
-        code = self.generate_code()
-        
-        if self.send_sms(phone, code):
-            return code
-        
-        return None
-
-
-# Создаем глобальный экземпляр сервиса
+
+
+# Глобальный экземпляр сервиса; порядок провайдеров - SMS_PROVIDERS
 sms_service = SMSService()
-# Или используйте SMSC: sms_service = SMSCService()
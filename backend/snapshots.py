@@ -0,0 +1,197 @@
+"""
+Статические снимки публичного каталога для раздачи через nginx
+
+Ответы GET /products, /vacancies и /employees без параметров одинаковы для
+всех анонимных пользователей. После записи в каталог backend (с задержкой
+SNAPSHOT_DEBOUNCE, чтобы серия изменений дала одну перезапись) сохраняет
+такой ответ в SNAPSHOT_DIR вместе со сжатыми копиями:
+
+    products.<версия>[.next-<курсор>]/page.json, .json.gz, .json.br
+                                        - каталог версии таблицы
+    products                            - ссылка на каталог текущей версии
+
+nginx отдает products/page.json через try_files (gzip_static / brotli_static
+выбирают сжатую копию), и такие запросы не доходят до Python. Ссылки
+переключаются атомарно и только на более новую версию, поэтому несколько
+воркеров не перезапишут свежий снимок старым.
+
+Снимок - первая страница списка (SNAPSHOT_PAGE_SIZE строк). Если строк
+больше, курсор следующей страницы записан в имени каталога версии: nginx
+берет его из $realpath_root (путь с раскрытыми ссылками) и отдает в
+заголовке X-Next-Cursor, как backend.
+
+Выключено, если SNAPSHOT_DIR не задан.
+"""
+import gzip
+import logging
+import os
+import shutil
+import threading
+import time
+from typing import Iterable, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from database import read_engine
+from fieldsets import pick_fields
+from pagination import encode_cursor
+from models import Employee, Product, TableVersion, Vacancy
+from schemas import EmployeeResponse, ProductResponse, VacancyResponse
+from serialization import dumps
+
+try:
+    import brotli
+except ImportError:  # brotli не обязателен: без него пишутся только json и gzip
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "")
+SNAPSHOT_DEBOUNCE = float(os.getenv("SNAPSHOT_DEBOUNCE", "2"))
+# Дольше этого снимок не откладывается даже при непрерывных записях
+SNAPSHOT_MAX_DELAY = float(os.getenv("SNAPSHOT_MAX_DELAY", "30"))
+
+# limit по умолчанию в GET /products, /vacancies и /employees
+SNAPSHOT_PAGE_SIZE = 100
+
+# Сколько предыдущих версий оставлять на диске (их может дочитывать nginx)
+KEEP_VERSIONS = 2
+
+# Таблица -> (модель, схема ответа списка)
+SNAPSHOT_TABLES = {
+    "products": (Product, ProductResponse),
+    "vacancies": (Vacancy, VacancyResponse),
+    "employees": (Employee, EmployeeResponse),
+}
+
+_pending = set()
+_first_pending_at = None
+_timer = None
+_lock = threading.Lock()
+
+
+def _first_page(db: Session, table: str) -> Tuple[list, Optional[str]]:
+    """
+    Первая страница списка, как в GET /<table> без параметров
+
+    Returns:
+        (строки страницы, курсор X-Next-Cursor или None, если страница последняя)
+    """
+    model, schema = SNAPSHOT_TABLES[table]
+    fields = tuple(dict.fromkeys(["id", *schema.model_fields]))
+    rows = db.query(model).order_by(model.id).limit(SNAPSHOT_PAGE_SIZE).all()
+    # Курсор тот же, что выдает pagination.paginate для заполненной страницы
+    next_cursor = encode_cursor([rows[-1].id]) if len(rows) == SNAPSHOT_PAGE_SIZE else None
+    return [pick_fields(row, fields) for row in rows], next_cursor
+
+
+def schedule(*tables: str):
+    """Отмечает таблицы измененными; снимки перепишутся после паузы в записях"""
+    global _timer, _first_pending_at
+    if not SNAPSHOT_DIR:
+        return
+    with _lock:
+        _pending.update(t for t in tables if t in SNAPSHOT_TABLES)
+        if not _pending:
+            return
+        now = time.monotonic()
+        if _first_pending_at is None:
+            _first_pending_at = now
+        delay = min(SNAPSHOT_DEBOUNCE, max(0.0, _first_pending_at + SNAPSHOT_MAX_DELAY - now))
+        if _timer is not None:
+            _timer.cancel()
+        _timer = threading.Timer(delay, _flush)
+        _timer.daemon = True
+        _timer.start()
+
+
+def _flush():
+    global _timer, _first_pending_at
+    with _lock:
+        tables = set(_pending)
+        _pending.clear()
+        _timer = None
+        _first_pending_at = None
+    try:
+        write_snapshots(tables)
+    except Exception:
+        logger.exception("Не удалось записать снимки каталога %s", sorted(tables))
+
+
+def _write_atomic(path: str, data: bytes):
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _link_atomic(target: str, link: str):
+    tmp_link = f"{link}.tmp{os.getpid()}"
+    if os.path.lexists(tmp_link):
+        os.remove(tmp_link)
+    os.symlink(target, tmp_link)
+    os.replace(tmp_link, link)
+
+
+def _current_version(table: str) -> int:
+    # products -> products.<версия>[.next-<курсор>]
+    try:
+        return int(os.readlink(os.path.join(SNAPSHOT_DIR, table)).split(".")[1])
+    except (OSError, ValueError, IndexError):
+        return -1
+
+
+def _version_dir(table: str, version: int, next_cursor: Optional[str]) -> str:
+    # Курсор - base64url без "=", допустим в имени файла и в регулярном выражении nginx
+    return f"{table}.{version}.next-{next_cursor}" if next_cursor else f"{table}.{version}"
+
+
+def _publish(table: str, version: int, body: bytes, next_cursor: Optional[str]):
+    files = {".json": body, ".json.gz": gzip.compress(body, compresslevel=9)}
+    if brotli is not None:
+        files[".json.br"] = brotli.compress(body)
+    name = _version_dir(table, version, next_cursor)
+    path = os.path.join(SNAPSHOT_DIR, name)
+    os.makedirs(path, exist_ok=True)
+    for suffix, data in files.items():
+        _write_atomic(os.path.join(path, f"page{suffix}"), data)
+    # Одна ссылка на каталог: страница, сжатые копии и курсор переключаются вместе
+    _link_atomic(name, os.path.join(SNAPSHOT_DIR, table))
+
+
+def _prune(table: str, version: int):
+    prefix = f"{table}."
+    for name in os.listdir(SNAPSHOT_DIR):
+        parts = name.split(".")
+        if name.startswith(prefix) and len(parts) >= 2 and parts[1].isdigit():
+            if int(parts[1]) <= version - KEEP_VERSIONS:
+                path = os.path.join(SNAPSHOT_DIR, name)
+                if os.path.isdir(path) and not os.path.islink(path):
+                    shutil.rmtree(path, ignore_errors=True)
+                else:
+                    os.remove(path)
+
+
+def write_snapshots(tables: Iterable[str] = None):
+    """Сразу записывает снимки таблиц (по умолчанию всех)"""
+    if not SNAPSHOT_DIR:
+        return
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    tables = [t for t in (tables or SNAPSHOT_TABLES) if t in SNAPSHOT_TABLES]
+
+    import fcntl  # только POSIX; без SNAPSHOT_DIR модуль импортируется и на Windows
+
+    # Блокировка на файл: воркеры и import_data.py пишут снимки по очереди
+    with open(os.path.join(SNAPSHOT_DIR, ".lock"), "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        db = Session(read_engine)
+        try:
+            for table in tables:
+                version = db.query(TableVersion.version).filter(TableVersion.table_name == table).scalar() or 0
+                if version <= _current_version(table):
+                    continue
+                page, next_cursor = _first_page(db, table)
+                _publish(table, version, dumps(page), next_cursor)
+                _prune(table, version)
+        finally:
+            db.close()
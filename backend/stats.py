@@ -0,0 +1,193 @@
+"""
+Статистика каталога для админ-панели (GET /stats)
+
+Вместо GROUP BY по products / vacancies на каждый запрос счетчики групп
+хранятся в таблице catalog_stats и обновляются в транзакции записи:
+обработчики в main.py, пакетные изменения (bulk.py) и импорт (importer.py)
+передают группы удаленных и добавленных строк в update(). Чтение статистики
+стоит O(число групп).
+
+Метрики:
+- products_by_type: товары по типу
+- products_by_seller: товары по продавцу (ключ - id сотрудника)
+- price_bucket: гистограмма цен с логарифмическими корзинами, по ней
+  оцениваются перцентили (погрешность - ширина корзины, PRICE_BUCKET_RATIO)
+- vacancies_by_city: вакансии по городам
+
+Минимум и максимум цены читаются по индексу ix_products_price.
+Если счетчики разошлись с данными, их пересчитывает recompute_stats.py.
+"""
+import math
+from collections import Counter
+from typing import Iterable, List, Tuple
+
+from sqlalchemy import delete, func, insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from models import CatalogStat, Employee, Product, Vacancy
+
+# Отношение границ соседних корзин цены: оценка перцентиля точна до 5%
+PRICE_BUCKET_RATIO = 1.05
+
+PERCENTILES = (25, 50, 75, 90, 99)
+
+# INSERT ... ON CONFLICT DO UPDATE по диалекту базы
+UPSERT_INSERTS = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
+
+# Таблица -> (модель, метрика -> колонка группы)
+STAT_TABLES = {
+    "products": (Product, {
+        "products_by_type": "product_type",
+        "products_by_seller": "seller_id",
+        "price_bucket": "price",
+    }),
+    "vacancies": (Vacancy, {
+        "vacancies_by_city": "city",
+    }),
+}
+
+
+def price_bucket(price: float) -> int:
+    """Номер корзины цены: [RATIO**n, RATIO**(n+1))"""
+    return math.floor(math.log(price) / math.log(PRICE_BUCKET_RATIO))
+
+
+def _group_key(metric: str, value) -> str:
+    if metric == "price_bucket":
+        return str(price_bucket(value))
+    return str(value)
+
+
+def keys_of(table: str, row) -> List[Tuple[str, str]]:
+    """Группы (метрика, ключ), в которые входит строка (ORM объект или словарь)"""
+    if table not in STAT_TABLES:
+        return []
+    _, metrics = STAT_TABLES[table]
+    get = row.get if isinstance(row, dict) else lambda name: getattr(row, name)
+    return [(metric, _group_key(metric, get(column))) for metric, column in metrics.items()]
+
+
+def keys_for_ids(db: Session, table: str, ids: Iterable[int]) -> List[Tuple[str, str]]:
+    """Группы строк таблицы по списку id (одним запросом)"""
+    ids = list(ids)
+    if table not in STAT_TABLES or not ids:
+        return []
+    model, metrics = STAT_TABLES[table]
+    columns = sorted(set(metrics.values()))
+    rows = db.query(*[getattr(model, c) for c in columns]).filter(model.id.in_(ids))
+    return [key for row in rows for key in keys_of(table, row._asdict())]
+
+
+def update(db: Session, removed: Iterable[Tuple[str, str]] = (), added: Iterable[Tuple[str, str]] = ()):
+    """
+    Применяет изменения счетчиков групп (до commit)
+
+    Args:
+        removed: Группы удаленных строк и старые группы измененных
+        added: Группы новых строк и новые группы измененных
+    """
+    delta = Counter(added)
+    delta.subtract(removed)
+    changes = [
+        {"metric": metric, "key": key, "count": value}
+        for (metric, key), value in delta.items() if value
+    ]
+    if not changes:
+        return
+
+    # Один upsert вместо UPDATE + SELECT + INSERT: параллельные транзакции,
+    # создающие одну и ту же группу, не падают на IntegrityError
+    statement = UPSERT_INSERTS[db.get_bind().dialect.name](CatalogStat)
+    statement = statement.on_conflict_do_update(
+        index_elements=[CatalogStat.metric, CatalogStat.key],
+        set_={"count": CatalogStat.count + statement.excluded["count"]},
+    )
+    db.execute(statement, changes)
+    db.execute(delete(CatalogStat).where(CatalogStat.count <= 0))
+
+
+def recompute(db: Session):
+    """Полностью пересчитывает счетчики GROUP BY запросами (до commit)"""
+    db.execute(delete(CatalogStat))
+    counts = Counter()
+    for model, metrics in STAT_TABLES.values():
+        for metric, column in metrics.items():
+            # Для price_bucket группируются точные цены и потом сводятся в корзины
+            for value, count in db.query(getattr(model, column), func.count()).group_by(getattr(model, column)):
+                counts[(metric, _group_key(metric, value))] += count
+    if counts:
+        db.execute(insert(CatalogStat), [
+            {"metric": metric, "key": key, "count": count} for (metric, key), count in counts.items()
+        ])
+
+
+def init_stats(engine):
+    """Заполняет catalog_stats при первом запуске (если таблица пуста)"""
+    with Session(engine) as db:
+        if db.query(CatalogStat.metric).first() is None:
+            recompute(db)
+            db.commit()
+
+
+def _percentiles(buckets: List[Tuple[int, int]], total: int, low: float, high: float) -> dict:
+    """Оценивает перцентили цены по гистограмме (середина корзины, в пределах min/max)"""
+    result = {}
+    cumulative = 0
+    position = 0
+    for p in PERCENTILES:
+        rank = p / 100 * total
+        while position < len(buckets) and cumulative + buckets[position][1] < rank:
+            cumulative += buckets[position][1]
+            position += 1
+        bucket = buckets[min(position, len(buckets) - 1)][0]
+        estimate = PRICE_BUCKET_RATIO ** (bucket + 0.5)
+        result[f"p{p}"] = round(min(max(estimate, low), high), 2)
+    return result
+
+
+def read_stats(db: Session) -> dict:
+    """Собирает ответ GET /stats из счетчиков групп"""
+    groups = {}
+    for row in db.query(CatalogStat.metric, CatalogStat.key, CatalogStat.count):
+        groups.setdefault(row.metric, {})[row.key] = row.count
+
+    by_type = groups.get("products_by_type", {})
+    by_seller = groups.get("products_by_seller", {})
+    by_city = groups.get("vacancies_by_city", {})
+    products_total = sum(by_type.values())
+
+    seller_ids = [int(key) for key in by_seller]
+    names = {}
+    if seller_ids:
+        names = {
+            row.id: f"{row.first_name} {row.last_name}"
+            for row in db.query(Employee.id, Employee.first_name, Employee.last_name)
+            .filter(Employee.id.in_(seller_ids))
+        }
+
+    price = {"min": None, "max": None, "percentiles": {}}
+    if products_total:
+        # Отдельные запросы: min() и max() в одном SELECT SQLite считает полным проходом
+        low = db.query(func.min(Product.price)).scalar()
+        high = db.query(func.max(Product.price)).scalar()
+        buckets = sorted((int(key), count) for key, count in groups.get("price_bucket", {}).items())
+        price = {"min": low, "max": high, "percentiles": _percentiles(buckets, products_total, low, high)}
+
+    return {
+        "products_total": products_total,
+        "products_by_type": dict(sorted(by_type.items(), key=lambda item: -item[1])),
+        "products_by_seller": sorted(
+            [
+                {"seller_id": int(key), "name": names.get(int(key)), "count": count}
+                for key, count in by_seller.items()
+            ],
+            key=lambda item: -item["count"]
+        ),
+        "price": price,
+        "vacancies_total": sum(by_city.values()),
+        "vacancies_by_city": dict(sorted(by_city.items(), key=lambda item: -item[1])),
+    }
@@ -0,0 +1,90 @@
+"""
+Общие фикстуры тестов backend'а
+
+Тесты работают с отдельной базой SQLite во временном каталоге: переменные
+окружения выставляются до импорта модулей приложения, схема создается
+миграциями, как в рабочем запуске.
+"""
+import itertools
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEST_DIR = tempfile.mkdtemp(prefix="forest_bar_tests_")
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(TEST_DIR, 'test.db')}"
+os.environ["DB_ECHO"] = "false"
+os.environ["SMS_TEST_MODE"] = "true"
+os.environ.pop("SNAPSHOT_DIR", None)
+os.environ.pop("DATABASE_REPLICA_URLS", None)
+sys.path.insert(0, BACKEND_DIR)
+
+_numbers = itertools.count(1)
+
+
+@pytest.fixture(scope="session")
+def client():
+    """Клиент приложения с выполненным lifespan (uploads создается в TEST_DIR)"""
+    import migrate
+    import main
+    from fastapi.testclient import TestClient
+
+    migrate.upgrade(configure_logger=False)
+    cwd = os.getcwd()
+    os.chdir(TEST_DIR)
+    try:
+        with TestClient(main.app) as test_client:
+            yield test_client
+    finally:
+        os.chdir(cwd)
+
+
+@pytest.fixture
+def seller(client):
+    """Сотрудник-продавец для товаров теста"""
+    number = next(_numbers)
+    response = client.post("/employees", json={
+        "first_name": "Иван",
+        "last_name": "Петров",
+        "city": "Москва",
+        "region": "Московская область",
+        "email": f"seller{number}@example.com",
+        "phone": f"+7999{number:07d}",
+        "address": "ул. Лесная 1",
+        "work_hours": "9:00-18:00",
+    })
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def create_product(client, seller_id: int, name: str = "Мед липовый", price: float = 500) -> dict:
+    response = client.post("/products", json={
+        "name": name,
+        "price": price,
+        "product_type": "мед",
+        "long_description": "Липовый мед из Подмосковья",
+        "seller_id": seller_id,
+    })
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+@contextmanager
+def count_queries():
+    """SQL запросы, выполненные внутри блока (на всех движках)"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(Engine, "before_cursor_execute", before_cursor_execute)
@@ -0,0 +1,19 @@
+"""Пакетные изменения: повтор id применяется и считается один раз"""
+from conftest import create_product
+
+
+def test_repeated_ids_are_reported_as_duplicates(client, seller):
+    first = create_product(client, seller["id"], name="Мед цветочный")
+    second = create_product(client, seller["id"], name="Мед луговой")
+
+    response = client.post("/products/bulk", json={
+        "update": [{"id": first["id"], "price": 610}, {"id": first["id"], "price": 620}],
+        "delete": [second["id"], second["id"]],
+    })
+    assert response.status_code == 200, response.text
+    body = response.json()
+
+    assert (body["updated"], body["deleted"], body["failed"]) == (1, 1, 2)
+    assert [item["status"] for item in body["results"]] == ["ok", "duplicate", "ok", "duplicate"]
+    # Применяется первое вхождение
+    assert client.get(f"/products/{first['id']}").json()["price"] == 610
@@ -0,0 +1,61 @@
+"""Условные GET: ETag и кэш ответов после записи мимо этого воркера"""
+from sqlalchemy import text
+
+import database
+import versions
+from versions import bump_version
+from conftest import count_queries, create_product
+
+
+def write_outside_app(product_id: int, price: float):
+    """Запись, о которой кэш ответов этого воркера не знает (другой воркер, скрипт)"""
+    with database.SessionLocal() as db:
+        db.execute(text("UPDATE products SET price = :price WHERE id = :id"), {"price": price, "id": product_id})
+        bump_version(db, "products")
+        db.commit()
+
+
+def test_write_elsewhere_changes_etag_and_body(client, seller, monkeypatch):
+    # Запись вне воркера видна после VERSION_CACHE_TTL: здесь версии не кэшируются
+    monkeypatch.setattr(versions, "VERSION_CACHE_TTL", 0)
+    product = create_product(client, seller["id"], price=999)
+
+    first = client.get(f"/products/{product['id']}")
+    assert first.json()["price"] == 999
+    listed = client.get("/products", params={"seller_id": seller["id"]})
+    assert [p["price"] for p in listed.json()] == [999]
+
+    write_outside_app(product["id"], 12345)
+
+    detail = client.get(f"/products/{product['id']}", headers={"If-None-Match": first.headers["etag"]})
+    assert detail.status_code == 200
+    assert detail.headers["etag"] != first.headers["etag"]
+    assert detail.json()["price"] == 12345
+
+    relisted = client.get("/products", params={"seller_id": seller["id"]},
+                          headers={"If-None-Match": listed.headers["etag"]})
+    assert relisted.status_code == 200
+    assert [p["price"] for p in relisted.json()] == [12345]
+
+    # Новый ETag соответствует новому телу
+    again = client.get(f"/products/{product['id']}", headers={"If-None-Match": detail.headers["etag"]})
+    assert again.status_code == 304
+
+
+def test_cache_hit_skips_database(client, seller, monkeypatch):
+    monkeypatch.setattr(versions, "VERSION_CACHE_TTL", 60)
+    product = create_product(client, seller["id"], price=321)
+    first = client.get(f"/products/{product['id']}")
+
+    with count_queries() as statements:
+        cached = client.get(f"/products/{product['id']}")
+        not_modified = client.get(f"/products/{product['id']}", headers={"If-None-Match": first.headers["etag"]})
+    assert (cached.status_code, not_modified.status_code) == (200, 304)
+    assert statements == []
+
+    # Запись этого воркера сбрасывает версии сразу, не дожидаясь TTL
+    response = client.put(f"/products/{product['id']}", json={"price": 654})
+    assert response.status_code == 200, response.text
+    updated = client.get(f"/products/{product['id']}", headers={"If-None-Match": first.headers["etag"]})
+    assert updated.status_code == 200
+    assert updated.json()["price"] == 654
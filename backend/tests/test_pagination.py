@@ -0,0 +1,14 @@
+"""X-Total-Count: кэш количеств ограничен по размеру"""
+import pagination
+from ttl_cache import TTLCache
+
+
+def test_count_cache_is_bounded(client, monkeypatch):
+    monkeypatch.setattr(pagination, "count_cache", TTLCache(maxsize=10, ttl=pagination.COUNT_CACHE_TTL))
+    for number in range(30):
+        response = client.get("/products", params={"name_prefix": f"нет-{number}", "with_total": "true"})
+        assert response.headers["x-total-count"] == "0"
+
+    stats = pagination.count_cache.stats()
+    assert stats["size"] == 10
+    assert stats["evictions"] == 20
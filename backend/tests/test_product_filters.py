@@ -0,0 +1,19 @@
+"""Фильтры каталога: name_prefix ищется диапазоном по индексу ix_products_name"""
+import pytest
+
+from conftest import create_product
+
+
+@pytest.mark.parametrize("prefix, expected", [
+    ("Мёд", ["Мёд акациевый", "Мёд гречишный", "Мёдовуха"]),
+    ("Мёд г", ["Мёд гречишный"]),
+    ("100%", ["100% иван-чай"]),
+    ("мёд", []),
+])
+def test_name_prefix(client, seller, prefix, expected):
+    for name in ["Мёд акациевый", "Мёд гречишный", "Мёдовуха", "Чай", "100% иван-чай", "100 г ягод"]:
+        create_product(client, seller["id"], name=name)
+
+    response = client.get("/products", params={"seller_id": seller["id"], "name_prefix": prefix})
+    assert response.status_code == 200
+    assert sorted(p["name"] for p in response.json()) == expected
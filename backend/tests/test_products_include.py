@@ -0,0 +1,34 @@
+"""GET /products?include=seller: число SQL запросов не зависит от размера страницы"""
+import versions
+from conftest import count_queries
+
+
+def test_include_seller_query_count_is_constant(client, monkeypatch):
+    # Версии таблиц читаются на каждый запрос, чтобы оба замера были одинаковыми
+    monkeypatch.setattr(versions, "VERSION_CACHE_TTL", 0)
+    # У каждого товара свой продавец: ленивая загрузка дала бы запрос на товар
+    product_type = "include-test"
+    count = 6
+    for number in range(count):
+        owner = client.post("/employees", json={
+            "first_name": "Продавец", "last_name": str(number), "city": "Тула", "region": "Тульская",
+            "email": f"include{number}@example.com", "phone": f"+7988{number:07d}",
+            "address": "ул. Лесная 1", "work_hours": "9:00-18:00",
+        }).json()
+        response = client.post("/products", json={
+            "name": f"Мед {number}", "price": 100, "product_type": product_type,
+            "long_description": "Мед для проверки include", "seller_id": owner["id"],
+        })
+        assert response.status_code == 200, response.text
+
+    def queries_for(limit: int) -> int:
+        with count_queries() as statements:
+            response = client.get("/products", params={
+                "include": "seller", "product_type": product_type, "limit": limit,
+            })
+        assert response.status_code == 200
+        assert len(response.json()) == limit
+        assert all(item["seller"] for item in response.json())
+        return len(statements)
+
+    assert queries_for(2) == queries_for(count)
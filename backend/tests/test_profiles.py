@@ -0,0 +1,20 @@
+"""Пароль профиля хешируется, пока соединение писателя не занято"""
+import database
+import main
+
+
+def test_password_hashed_outside_write_session(client, monkeypatch):
+    checked_out = []
+
+    # Проверяется только момент вызова: сам bcrypt тесту не нужен
+    def tracking_hash_password(password):
+        checked_out.append(database.async_engine.pool.checkedout())
+        return f"hashed:{password}"
+
+    monkeypatch.setattr(main, "hash_password", tracking_hash_password)
+    response = client.post("/profiles", json={"phone": "+79005550001", "city": "Тула", "password": "secret1"})
+    assert response.status_code == 200, response.text
+
+    response = client.put(f"/profiles/{response.json()['id']}", json={"password": "secret2"})
+    assert response.status_code == 200, response.text
+    assert checked_out == [0, 0]
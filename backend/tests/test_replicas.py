@@ -0,0 +1,63 @@
+"""Чтение после записи: на основную базу переключается только писавший клиент"""
+import pytest
+
+import database
+import replicas
+from versions import bump_version
+
+
+@pytest.fixture
+def replica(client, monkeypatch):
+    # Реплика - та же тестовая база: проверяется маршрутизация, а не данные
+    replica = replicas.Replica(1, database.DATABASE_URL)
+    monkeypatch.setattr(replicas, "replicas", [replica])
+    picked = []
+    pick_replica = replicas.pick_replica
+
+    def tracking_pick_replica():
+        picked.append(pick_replica())
+        return picked[-1]
+
+    monkeypatch.setattr(replicas, "pick_replica", tracking_pick_replica)
+    client.cookies.clear()
+    yield picked
+    client.cookies.clear()
+
+
+def test_writer_reads_primary(client, seller, replica):
+    response = client.post("/products", json={
+        "name": "Мед гречишный", "price": 700, "product_type": "мед",
+        "long_description": "Темный гречишный мед", "seller_id": seller["id"],
+    })
+    assert replicas.STICKY_COOKIE in response.cookies
+
+    client.get("/products")
+    assert replica == []
+
+    client.cookies.clear()
+    client.get("/products", params={"limit": 5})
+    assert replica and replica[-1] is not None
+
+
+def test_background_commits_do_not_pin_reads(client, replica):
+    # Как очередь SMS или фоновый поток: commit вне HTTP запроса
+    with database.SessionLocal() as db:
+        bump_version(db, "products")
+        db.commit()
+
+    response = client.get("/products", params={"limit": 7})
+    assert replicas.STICKY_COOKIE not in response.cookies
+    assert replica and replica[-1] is not None
+
+
+def test_writer_cookie_without_replicas(client, seller):
+    # По cookie nginx отдает писавшему клиенту backend вместо снимка и proxy_cache
+    assert replicas.replicas == []
+    client.cookies.clear()
+    response = client.put(f"/employees/{seller['id']}", json={"city": "Тверь"})
+    assert response.status_code == 200, response.text
+    assert replicas.STICKY_COOKIE in response.cookies
+
+    response = client.get("/employees", params={"limit": 3})
+    assert replicas.STICKY_COOKIE not in response.headers.get("set-cookie", "")
+    client.cookies.clear()
@@ -0,0 +1,18 @@
+"""Поиск работает на схеме из миграций: FTS5 таблицы создает миграция 0005"""
+from sqlalchemy import inspect
+
+from conftest import create_product
+from database import engine
+
+
+def test_search_tables_come_from_migrations(client):
+    tables = inspect(engine).get_table_names()
+    assert "products_fts" in tables
+    assert "vacancies_fts" in tables
+
+
+def test_search_finds_created_product(client, seller):
+    product = create_product(client, seller["id"], name="Медовуха клюквенная")
+    response = client.get("/search", params={"q": "клюквенной медовухи"})
+    assert response.status_code == 200
+    assert product["id"] in [item["id"] for item in response.json()["products"]]
@@ -0,0 +1,47 @@
+"""Коды, зависшие в sending после остановки процесса, снова отправляются"""
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import Session
+
+import sms_queue
+from database import engine
+from models import SMSCode, User
+
+
+def _sending_code(db: Session, phone: str, claimed_ago: float) -> int:
+    now = datetime.utcnow()
+    user = User(phone=phone)
+    db.add(user)
+    db.flush()
+    code = SMSCode(
+        user_id=user.id, code="123456", expires_at=now + timedelta(minutes=5),
+        delivery_status="sending", attempts=1, claimed_at=now - timedelta(seconds=claimed_ago),
+    )
+    db.add(code)
+    db.flush()
+    return code.id
+
+
+def _status(code_id: int) -> str:
+    with Session(engine) as db:
+        return db.get(SMSCode, code_id).delivery_status
+
+
+def test_recover_requeues_stale_sending_codes(client):
+    with Session(engine) as db:
+        stale = _sending_code(db, "+79000000001", sms_queue.SMS_SENDING_TIMEOUT + 60)
+        fresh = _sending_code(db, "+79000000002", 0)
+        db.commit()
+
+    client.portal.call(sms_queue.dispatcher.recover)
+    for _ in range(100):
+        if _status(stale) == "sent":
+            break
+        time.sleep(0.05)
+
+    assert _status(stale) == "sent"
+    # Свежий захват может принадлежать работающему процессу
+    assert _status(fresh) == "sending"
+    with Session(engine) as db:
+        assert db.get(SMSCode, stale).attempts == 2
@@ -0,0 +1,49 @@
+"""Любой сбой провайдера учитывается предохранителем"""
+import asyncio
+
+import httpx
+import pytest
+
+from sms_service import SMSCProvider, SMSRUProvider, SMSService
+
+
+def make_service(provider_name: str, body: bytes) -> SMSService:
+    service = SMSService([provider_name])
+    service.test_mode = False
+    provider = service.providers[0]
+    provider.api_id = provider.login = provider.password = "test"
+    service._client = httpx.AsyncClient(transport=httpx.MockTransport(
+        lambda request: httpx.Response(200, content=body, headers={"content-type": "application/json"})
+    ))
+    return service
+
+
+@pytest.mark.parametrize("provider_name", [SMSRUProvider.name, SMSCProvider.name])
+@pytest.mark.parametrize("body", [b"null", b"42", b'"OK"', b"[]"])
+def test_unexpected_json_is_provider_error(provider_name, body):
+    service = make_service(provider_name, body)
+    provider = service.providers[0]
+
+    assert asyncio.run(service.send_sms("+79990000000", "123456")) is False
+    assert provider.stats.errors == 1
+    assert provider.breaker.failures == 1
+
+
+def test_half_open_probe_is_released_after_unexpected_error(monkeypatch):
+    service = make_service(SMSRUProvider.name, b'{"status": "OK"}')
+    provider = service.providers[0]
+    provider.breaker.state = "open"
+    provider.breaker.opened_at = 0.0
+
+    async def broken_send(client, phone, message):
+        raise RuntimeError("сбой разбора ответа")
+
+    monkeypatch.setattr(provider, "send", broken_send)
+    assert asyncio.run(service.send_sms("+79990000000", "123456")) is False
+    assert provider.breaker.state == "open"
+
+    # После паузы предохранителя провайдер снова получает пробное сообщение
+    monkeypatch.undo()
+    provider.breaker.opened_at = 0.0
+    assert asyncio.run(service.send_sms("+79990000000", "123456")) is True
+    assert provider.breaker.state == "closed"
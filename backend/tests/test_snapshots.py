@@ -0,0 +1,24 @@
+"""Снимки каталога для nginx: первая страница и курсор следующей"""
+import json
+import os
+import re
+
+import snapshots
+from conftest import create_product
+
+
+def test_large_catalog_snapshot_has_first_page_and_cursor(client, seller, tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshots, "SNAPSHOT_DIR", str(tmp_path))
+    for number in range(snapshots.SNAPSHOT_PAGE_SIZE + 5):
+        create_product(client, seller["id"], name=f"Мед {number}")
+
+    snapshots.write_snapshots(["products"])
+
+    api = client.get("/products")
+    link = os.readlink(tmp_path / "products")
+    # То же выражение, что в map $realpath_root в nginx.conf
+    match = re.search(r"\.next-([A-Za-z0-9_-]+)$", link)
+    assert match and match.group(1) == api.headers["x-next-cursor"]
+    with open(tmp_path / "products" / "page.json", "rb") as f:
+        assert json.load(f) == api.json()
+    assert (tmp_path / "products" / "page.json.gz").exists()
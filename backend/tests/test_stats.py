@@ -0,0 +1,34 @@
+"""Счетчики catalog_stats обновляются одним upsert"""
+from sqlalchemy.orm import Session
+
+import stats
+from database import engine
+from models import CatalogStat
+
+
+def _count(metric: str, key: str):
+    with Session(engine) as db:
+        row = db.get(CatalogStat, (metric, key))
+        return row.count if row is not None else None
+
+
+def test_update_creates_increments_and_removes_groups(client):
+    group = ("products_by_type", "тест-upsert")
+    for _ in range(2):
+        # Каждая сессия создает или увеличивает группу, не зная о другой
+        with Session(engine) as db:
+            stats.update(db, added=[group, group])
+            db.commit()
+    assert _count(*group) == 4
+
+    with Session(engine) as db:
+        stats.update(db, removed=[group] * 3, added=[("products_by_type", "тест-upsert-2")])
+        db.commit()
+    assert _count(*group) == 1
+    assert _count("products_by_type", "тест-upsert-2") == 1
+
+    with Session(engine) as db:
+        stats.update(db, removed=[group, ("products_by_type", "тест-upsert-2")])
+        db.commit()
+    assert _count(*group) is None
+    assert _count("products_by_type", "тест-upsert-2") is None
@@ -0,0 +1,29 @@
+"""Загрузка изображений: файл пишется на диск вне транзакции записи"""
+import database
+import main
+from conftest import create_product
+
+
+def test_upload_saves_file_before_write_transaction(client, seller, monkeypatch):
+    product = create_product(client, seller["id"])
+    save_upload = main.save_upload
+    checked_out = []
+
+    async def tracking_save_upload(file, file_path):
+        checked_out.append(database.async_engine.pool.checkedout())
+        await save_upload(file, file_path)
+
+    monkeypatch.setattr(main, "save_upload", tracking_save_upload)
+    response = client.post(
+        f"/products/{product['id']}/upload-image",
+        files={"file": ("honey.png", b"\x89PNG" + b"0" * 1024, "image/png")},
+    )
+
+    assert response.status_code == 200, response.text
+    assert checked_out == [0]
+    assert client.get(f"/products/{product['id']}").json()["images"] == [response.json()["image_url"]]
+
+
+def test_upload_for_missing_product(client):
+    response = client.post("/products/999999/upload-image", files={"file": ("a.png", b"x", "image/png")})
+    assert response.status_code == 404
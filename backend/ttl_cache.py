@@ -0,0 +1,77 @@
+"""
+Потокобезопасный LRU кэш с временем жизни записей
+
+Общий для кэшей процесса: ответы каталога (cache.py), пользователи
+(auth_utils.py), количества строк для X-Total-Count (pagination.py).
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable
+
+
+class TTLCache:
+    """Потокобезопасный LRU кэш с ограничением размера и временем жизни записей"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable):
+        """Возвращает значение или None, если записи нет или она устарела"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            value, expires_at = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value):
+        """Сохраняет значение, вытесняя самые старые записи при переполнении"""
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: Hashable):
+        """Удаляет одну запись, если она есть"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def invalidate(self, prefix: tuple):
+        """Удаляет все записи, ключ которых начинается с prefix"""
+        size = len(prefix)
+        with self._lock:
+            for key in [k for k in self._data if k[:size] == prefix]:
+                del self._data[key]
+
+    def clear(self):
+        """Удаляет все записи"""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        """Счетчики попаданий, промахов и вытеснений"""
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
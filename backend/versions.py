@@ -0,0 +1,175 @@
+"""
+Версии таблиц каталога и условные GET запросы (ETag / Last-Modified)
+
+Для каждой таблицы каталога в table_versions хранится счетчик изменений
+и время последней записи. Обработчики записи в main.py увеличивают его
+в той же транзакции (bump_version), поэтому версия одинакова для всех
+воркеров. ETag ответа считается из версий таблиц и URL запроса, так что
+проверка If-None-Match стоит одного чтения по первичному ключу и не
+трогает сами строки.
+
+Прочитанные версии check_not_modified возвращает вместе с ответом 304:
+они входят в ключ кэша ответов (cache.py), иначе воркер, не видевший
+записи другого воркера, отдал бы под новым ETag старое тело из своего
+кэша, а клиент потом получал бы на него 304.
+
+Сами версии воркер держит в памяти VERSION_CACHE_TTL секунд, поэтому
+попадание в кэш ответов и 304 обходятся без запроса к базе. Записи этого
+воркера сбрасывают версии сразу после commit (forget_versions из
+cache.invalidate); запись в другом воркере или вне приложения видна не
+позже чем через VERSION_CACHE_TTL секунд. VERSION_CACHE_TTL=0 - версии
+читаются из базы на каждый запрос.
+"""
+import hashlib
+import os
+import time
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+
+from fastapi import Request, Response
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from models import TableVersion, Employee, Product, Vacancy
+
+# Таблицы, для которых ведутся версии
+VERSIONED_TABLES = {
+    "employees": Employee,
+    "products": Product,
+    "vacancies": Vacancy,
+}
+
+# Клиент и nginx могут хранить ответ, но обязаны перепроверять его перед использованием
+CACHE_CONTROL = "no-cache"
+
+# Сколько секунд воркер использует прочитанные версии таблиц без запроса к базе
+VERSION_CACHE_TTL = float(os.getenv("VERSION_CACHE_TTL", "1"))
+
+# Таблица -> (версия, время изменения, когда прочитано по time.monotonic())
+_version_cache: Dict[str, Tuple[int, datetime, float]] = {}
+# Растет при каждом forget_versions: чтение, начатое до записи, не попадет в кэш
+_version_generation = 0
+
+
+def init_versions(engine):
+    """Создает недостающие записи версий: счетчик = число строк, время = max(updated_at)"""
+    with Session(engine) as db:
+        existing = {v.table_name for v in db.query(TableVersion).all()}
+        for table, model in VERSIONED_TABLES.items():
+            if table in existing:
+                continue
+            count, last_update = db.query(func.count(model.id), func.max(model.updated_at)).one()
+            db.add(TableVersion(
+                table_name=table,
+                version=count,
+                updated_at=last_update or datetime.utcnow()
+            ))
+        db.commit()
+
+
+def bump_version(db: Session, table: str):
+    """Отмечает изменение таблицы. Вызывается до commit в транзакции записи"""
+    result = db.execute(
+        text(
+            "UPDATE table_versions SET version = version + 1, updated_at = :now "
+            "WHERE table_name = :table"
+        ),
+        {"now": datetime.utcnow(), "table": table}
+    )
+    if result.rowcount == 0:
+        db.add(TableVersion(table_name=table, version=1, updated_at=datetime.utcnow()))
+
+
+def forget_versions(*tables: str):
+    """Сбрасывает версии таблиц, закэшированные воркером (после commit записи)"""
+    global _version_generation
+    _version_generation += 1
+    for table in tables:
+        _version_cache.pop(table, None)
+
+
+async def _read_versions(db: AsyncSession, tables) -> Dict[str, Tuple[int, datetime]]:
+    """Версии таблиц: из памяти воркера, если они моложе VERSION_CACHE_TTL, иначе из базы"""
+    now = time.monotonic()
+    cached = [_version_cache.get(table) for table in tables]
+    if all(entry is not None and now - entry[2] < VERSION_CACHE_TTL for entry in cached):
+        return {table: entry[:2] for table, entry in zip(tables, cached)}
+
+    generation = _version_generation
+    rows = (await db.execute(select(TableVersion).where(TableVersion.table_name.in_(tables)))).scalars().all()
+    versions = {row.table_name: (row.version, row.updated_at) for row in rows}
+    if generation == _version_generation:
+        for table, (version, updated_at) in versions.items():
+            _version_cache[table] = (version, updated_at, now)
+    return versions
+
+
+def _parse_http_date(value: str) -> Optional[datetime]:
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    # If-None-Match сравнивается слабо: префикс W/ не учитывается
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+async def check_not_modified(
+    request: Request, response: Response, db: AsyncSession, *tables: str
+) -> Tuple[Optional[Response], tuple]:
+    """
+    Проставляет ETag / Last-Modified и проверяет условный запрос
+
+    Args:
+        request: Входящий запрос
+        response: Ответ FastAPI для установки заголовков
+        db: Асинхронная сессия базы данных
+        tables: Таблицы, от которых зависит ответ
+
+    Returns:
+        (ответ 304, если у клиента актуальная версия, иначе None;
+         версии таблиц ((таблица, версия), ...) для ключа кэша ответов)
+    """
+    versions = await _read_versions(db, tables)
+
+    table_versions = tuple(
+        (table, versions[table][0] if table in versions else 0) for table in sorted(tables)
+    )
+    fingerprint = ";".join(f"{table}:{version}" for table, version in table_versions)
+    digest = hashlib.sha1(f"{request.url.path}?{request.url.query}|{fingerprint}".encode()).hexdigest()
+    etag = f'"{digest[:32]}"'
+
+    last_modified = max((updated_at for _, updated_at in versions.values()), default=datetime.utcnow())
+    last_modified = last_modified.replace(tzinfo=timezone.utc, microsecond=0)
+
+    headers = {
+        "ETag": etag,
+        "Last-Modified": format_datetime(last_modified, usegmt=True),
+        "Cache-Control": CACHE_CONTROL,
+    }
+    response.headers.update(headers)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if _etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers), table_versions
+        return None, table_versions
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None:
+        since = _parse_http_date(if_modified_since)
+        if since is not None and last_modified <= since:
+            return Response(status_code=304, headers=headers), table_versions
+
+    return None, table_versions